@@ -0,0 +1,42 @@
+"""Compare requests per second for dsaps.Client with and without pooled,
+keep-alive connections against the local DSpace stand-in server.
+
+    python -m benchmarks.bench_connection_pool --requests 2000
+"""
+
+import argparse
+import time
+
+from benchmarks.dspace_server import server_url, start_server
+from dsaps.models import Client
+
+
+def run(url, requests, keep_alive):
+    client = Client(url, keep_alive=keep_alive)
+    client.authenticate("bench@example.com", "bench")
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get_uuid_from_handle("1721.1/1")
+    elapsed = time.perf_counter() - start
+    client.close()
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    server = start_server()
+    url = server_url(server)
+    try:
+        without_pool = run(url, args.requests, keep_alive=False)
+        with_pool = run(url, args.requests, keep_alive=True)
+    finally:
+        server.shutdown()
+    print(f"new connection per call: {without_pool:8.1f} req/s")
+    print(f"pooled keep-alive:       {with_pool:8.1f} req/s")
+    print(f"speedup:                 {with_pool / without_pool:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
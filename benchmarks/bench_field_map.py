@@ -0,0 +1,144 @@
+"""Measure the rate at which CSV rows are converted to items and the memory each
+item takes, compared with the previous per-row walk of the field map into
+dict-backed records.
+
+    python -m benchmarks.bench_field_map --rows 1000000
+"""
+
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import attr
+
+from dsaps import models
+
+
+@attr.s
+class DictMetadataEntry:
+    key = attr.ib(default=None)
+    value = attr.ib(default=None)
+    language = attr.ib(default=None)
+
+
+@attr.s
+class DictItem:
+    metadata = attr.ib(default=[])
+    file_identifier = attr.ib(default=None)
+    source_system_identifier = attr.ib(default=None)
+
+
+def walk_field_map(row, field_map):
+    """The per-row field map walk that Item.metadata_from_csv_row used before the
+    field map was compiled."""
+    metadata = []
+    for f in field_map:
+        field = row[field_map[f]["csv_field_name"]]
+        if f == "file_identifier":
+            file_identifier = field
+            continue
+        if f == "source_system_identifier":
+            source_system_identifier = field
+            continue
+        delimiter = field_map[f]["delimiter"]
+        language = field_map[f]["language"]
+        if delimiter:
+            metadata.extend(
+                [
+                    DictMetadataEntry(key=f, value=v, language=language)
+                    for v in field.split(delimiter)
+                ]
+            )
+        else:
+            metadata.append(DictMetadataEntry(key=f, value=field, language=language))
+    return DictItem(
+        metadata=metadata,
+        file_identifier=file_identifier,
+        source_system_identifier=source_system_identifier,
+    )
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(
+            [
+                "uri",
+                "title",
+                "file_identifier",
+                "author",
+                "description",
+                "rights_statement",
+                "rights_uri",
+            ]
+        )
+        for i in range(rows):
+            writer.writerow(
+                [
+                    f"/repo/0/ao/{i}",
+                    f"Item {i}",
+                    f"mit_{i:08d}",
+                    "Smith, John|Smith, Jane",
+                    f"More info at /repo/0/ao/{i}",
+                    "Totally Free",
+                    "http://free.gov",
+                ]
+            )
+
+
+def rows_per_second(path, convert):
+    with open(path, newline="") as csvfile:
+        start = time.perf_counter()
+        rows = 0
+        for row in csv.DictReader(csvfile):
+            convert(row)
+            rows += 1
+        return rows / (time.perf_counter() - start)
+
+
+def bytes_per_item(path, convert, sample):
+    with open(path, newline="") as csvfile:
+        reader = csv.DictReader(csvfile)
+        rows = [next(reader) for _ in range(sample)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = [convert(row) for row in rows]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del items
+    return size / sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=10000,
+        help="The number of items kept in memory to measure bytes per item.",
+    )
+    parser.add_argument("--field-map", default="config/aspace_mapping.json")
+    args = parser.parse_args()
+    with open(args.field_map) as jsonfile:
+        field_map = json.load(jsonfile)
+    implementations = [
+        ("compiled", models.Item.compile_field_map(field_map)),
+        ("per-row walk", lambda row: walk_field_map(row, field_map)),
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "metadata.csv")
+        write_csv(path, args.rows)
+        print(f"{'implementation':>14} {'rows':>9} {'rows/s':>10} {'bytes/item':>11}")
+        for name, convert in implementations:
+            rate = rows_per_second(path, convert)
+            size = bytes_per_item(path, convert, min(args.sample, args.rows))
+            print(f"{name:>14} {args.rows:>9} {rate:10.0f} {size:11.0f}")
+
+
+if __name__ == "__main__":
+    main()
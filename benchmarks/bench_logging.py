@@ -0,0 +1,98 @@
+"""Measure how much logging costs the throughput of posting items to the local
+DSpace stand-in server, with the log file written synchronously or through the
+background queue, with high-volume events sampled, and with INFO events turned
+off. A write delay imitates a slow or network filesystem.
+
+    python -m benchmarks.bench_logging --items 2000 --workers 8 --write-delay 0.002
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.bench_workloads import FIELD_MAP, create_dataset
+from benchmarks.dspace_server import server_url, start_server
+from dsaps.log import configure_logging
+from dsaps.models import Client, Collection
+
+HOT_EVENTS = ["Item posted", "Bitstream posted", "Bitstream uploaded"]
+
+MODES = [
+    ("sync", {"asynchronous": False}),
+    ("async", {"asynchronous": True}),
+    ("sync, sampled", {"asynchronous": False, "sample_rates": 100}),
+    ("sync, WARNING", {"asynchronous": False, "level": "WARNING"}),
+]
+
+
+class SlowFileHandler(logging.FileHandler):
+    """File handler that waits before each write, like a slow filesystem."""
+
+    def __init__(self, path, delay):
+        super().__init__(path, "w")
+        self.delay = delay
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        super().emit(record)
+
+
+def post_items(url, metadata_csv, content_directory, workers):
+    """Post the items of a dataset and return the number posted per second."""
+    client = Client(url)
+    with open(metadata_csv) as csvfile, open(FIELD_MAP) as jsonfile:
+        collection = Collection.stream_items_from_csv(
+            csv.DictReader(csvfile), json.load(jsonfile), content_directory
+        )
+        collection.uuid = "c3d4"
+        start = time.perf_counter()
+        count = sum(1 for _ in collection.post_items(client, workers))
+        elapsed = time.perf_counter() - start
+    client.close()
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--file-size", type=int, default=1024)
+    parser.add_argument(
+        "--write-delay",
+        type=float,
+        default=0.002,
+        help="Seconds each log write waits for, imitating a slow filesystem.",
+    )
+    args = parser.parse_args()
+    server = start_server()
+    url = f"{server_url(server)}/rest"
+    with tempfile.TemporaryDirectory() as directory:
+        metadata_csv, content_directory = create_dataset(
+            directory, args.items, args.file_size
+        )
+        print(f"{'logging':>14} {'items':>7} {'items/s':>9} {'log lines':>10}")
+        for name, options in MODES:
+            options = dict(options)
+            sample_rate = options.pop("sample_rates", None)
+            if sample_rate:
+                options["sample_rates"] = {e: sample_rate for e in HOT_EVENTS}
+            log_path = os.path.join(directory, f"{name}.log")
+            stop = configure_logging(
+                log_path, handler=SlowFileHandler(log_path, args.write_delay), **options
+            )
+            try:
+                rate = post_items(url, metadata_csv, content_directory, args.workers)
+            finally:
+                stop()
+            with open(log_path) as log_file:
+                lines = sum(1 for _ in log_file)
+            print(f"{name:>14} {args.items:>7} {rate:9.1f} {lines:>10}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
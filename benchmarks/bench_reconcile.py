@@ -0,0 +1,72 @@
+"""Measure how the reconcile matching functions scale with the number of files
+and metadata IDs, compared with the previous nested-loop implementation.
+
+    python -m benchmarks.bench_reconcile --scales 1000 10000 100000 200000
+"""
+
+import argparse
+import random
+import time
+
+from dsaps import helpers
+
+
+def nested_loop_matches(file_list, metadata_ids):
+    """The nested-loop matching that helpers used before the prefix engine."""
+    file_matches = [f for m in metadata_ids for f in file_list if f.startswith(m)]
+    metadata_matches = [m for f in file_list for m in metadata_ids if f.startswith(m)]
+    return file_matches, metadata_matches
+
+
+def prefix_matches(file_list, metadata_ids):
+    return (
+        helpers.match_files_to_metadata(file_list, metadata_ids),
+        helpers.match_metadata_to_files(file_list, metadata_ids),
+    )
+
+
+def generate(files, seed=0):
+    """Generate file names with two files for most IDs, plus unmatched entries
+    on both sides."""
+    rng = random.Random(seed)
+    metadata_ids = [f"mit_{i:08d}" for i in range(files // 2)]
+    file_list = [f"{m}_{n:02d}.pdf" for m in metadata_ids for n in (1, 2)]
+    file_list = file_list[: int(files * 0.9)] + [
+        f"orphan_{i:08d}.pdf" for i in range(files - int(files * 0.9))
+    ]
+    rng.shuffle(file_list)
+    rng.shuffle(metadata_ids)
+    return file_list, metadata_ids
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=[1000, 10000, 100000, 200000]
+    )
+    parser.add_argument(
+        "--max-nested-loop",
+        type=int,
+        default=10000,
+        help="The largest number of files to time the nested-loop matching on.",
+    )
+    args = parser.parse_args()
+    print(f"{'files':>9} {'ids':>9} {'prefix (s)':>11} {'nested loop (s)':>16}")
+    for files in args.scales:
+        file_list, metadata_ids = generate(files)
+        prefix = timed(prefix_matches, file_list, metadata_ids)
+        if files <= args.max_nested_loop:
+            nested = f"{timed(nested_loop_matches, file_list, metadata_ids):16.3f}"
+        else:
+            nested = f"{'skipped':>16}"
+        print(f"{files:>9} {len(metadata_ids):>9} {prefix:11.3f} {nested}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Run the additems, reconcile and search commands at several scales against the
+local DSpace stand-in server and report their throughput and peak memory.
+
+    python -m benchmarks.bench_workloads --scales 1000 10000 100000 --latency 0.01
+
+Each command runs in its own process so that its peak resident set size can be
+measured.
+"""
+
+import argparse
+import csv
+import os
+import subprocess  # nosec
+import sys
+import tempfile
+import time
+
+from benchmarks.dspace_server import server_url, start_server
+
+FIELD_MAP = os.path.abspath("config/aspace_mapping.json")
+COMMAND = "from dsaps.cli import main; main()"
+
+
+def create_dataset(directory, items, file_size, files_per_directory=1000):
+    """Create a metadata CSV of items and one PDF per item, spread over
+    subdirectories, and return the CSV's path and the content directory."""
+    content_directory = os.path.join(directory, "files")
+    payload = os.urandom(file_size)
+    metadata_csv = os.path.join(directory, "metadata.csv")
+    with open(metadata_csv, "w") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(
+            [
+                "uri",
+                "title",
+                "file_identifier",
+                "author",
+                "description",
+                "rights_statement",
+                "rights_uri",
+            ]
+        )
+        for i in range(items):
+            file_identifier = f"item_{i:08d}"
+            subdirectory = os.path.join(
+                content_directory, f"{i // files_per_directory:04d}"
+            )
+            if i % files_per_directory == 0:
+                os.makedirs(subdirectory)
+            with open(os.path.join(subdirectory, f"{file_identifier}.pdf"), "wb") as f:
+                f.write(payload)
+            writer.writerow(
+                [
+                    f"/repo/0/ao/{i}",
+                    f"Item {i}",
+                    file_identifier,
+                    "Smith, John|Smith, Jane",
+                    f"More info at /repo/0/ao/{i}",
+                    "Totally Free",
+                    "http://free.gov",
+                ]
+            )
+    return metadata_csv, content_directory + "/"
+
+
+def run_command(url, args, cwd):
+    """Run a dsaps command in a subprocess and return its wall time in seconds and
+    peak resident set size in MB."""
+    env = dict(
+        os.environ,
+        DSPACE_EMAIL="bench@example.com",
+        DSPACE_PASSWORD="bench",
+        PYTHONPATH=os.getcwd(),
+    )
+    start = time.perf_counter()
+    process = subprocess.Popen(  # nosec
+        [sys.executable, "-c", COMMAND, "--url", url] + args,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    _, status, rusage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"{args[0]} failed: {process.stderr.read().decode()}")
+    peak_mb = rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return elapsed, peak_mb
+
+
+def workloads(metadata_csv, content_directory, output_directory, workers):
+    yield "additems", [
+        "additems",
+        "--metadata-csv",
+        metadata_csv,
+        "--field-map",
+        FIELD_MAP,
+        "--content-directory",
+        content_directory,
+        "--collection-handle",
+        "1721.1/1",
+        "--workers",
+        str(workers),
+    ]
+    yield "reconcile", [
+        "reconcile",
+        "--metadata-csv",
+        metadata_csv,
+        "--output-directory",
+        output_directory,
+        "--content-directory",
+        content_directory,
+    ]
+    yield "search", [
+        "search",
+        "--field",
+        "*",
+        "--query-type",
+        "exists",
+        "--output",
+        os.path.join(output_directory, "results.jsonl"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--file-size", type=int, default=1024)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float)
+    parser.add_argument(
+        "--workloads",
+        nargs="+",
+        default=["additems", "reconcile", "search"],
+        choices=["additems", "reconcile", "search"],
+    )
+    args = parser.parse_args()
+    print(
+        f"{'workload':<10} {'items':>8} {'seconds':>9} {'items/s':>10} {'peak MB':>9}"
+    )
+    for items in args.scales:
+        server = start_server(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            bandwidth=args.bandwidth,
+            search_items=items,
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                metadata_csv, content_directory = create_dataset(
+                    directory, items, args.file_size
+                )
+                output_directory = os.path.join(directory, "output") + "/"
+                os.mkdir(output_directory)
+                for name, command in workloads(
+                    metadata_csv, content_directory, output_directory, args.workers
+                ):
+                    if name not in args.workloads:
+                        continue
+                    elapsed, peak_mb = run_command(
+                        server_url(server), command, directory
+                    )
+                    print(
+                        f"{name:<10} {items:>8} {elapsed:9.2f} "
+                        f"{items / elapsed:10.1f} {peak_mb:9.1f}"
+                    )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""A local stand-in for the DSpace 6 REST endpoints used by dsaps.Client, with
+configurable latency, error rate, bandwidth cap and session lifetime.
+
+    python -m benchmarks.dspace_server --port 8080 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DSpaceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        latency=0.0,
+        error_rate=0.0,
+        bandwidth=None,
+        search_items=0,
+        session_ttl=None,
+    ):
+        super().__init__(address, DSpaceHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.search_items = search_items
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self.random = random.Random(0)  # nosec
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def count(self, endpoint):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def open_session(self):
+        session = uuid.uuid4().hex
+        with self.lock:
+            self.sessions[session] = time.monotonic()
+        return session
+
+    def session_valid(self, cookie_header):
+        """Return whether a request's session cookie is live, if sessions expire."""
+        if self.session_ttl is None:
+            return True
+        cookies = dict(
+            c.strip().split("=", 1) for c in cookie_header.split(";") if "=" in c
+        )
+        with self.lock:
+            opened = self.sessions.get(cookies.get("JSESSIONID"))
+        return opened is not None and time.monotonic() - opened < self.session_ttl
+
+    def should_fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+class DSpaceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body, status=200, cookies=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (cookies or {}).items():
+            self.send_header("Set-Cookie", f"{name}={value}; Path=/")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self._write(payload)
+
+    def _throttle(self, start, transferred):
+        """Sleep for as long as keeps a transfer under the bandwidth cap."""
+        if self.server.bandwidth:
+            ahead = transferred / self.server.bandwidth - (time.monotonic() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def _write(self, payload):
+        start = time.monotonic()
+        for offset in range(0, len(payload), CHUNK_SIZE):
+            chunk = payload[offset : offset + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            self._throttle(start, offset + len(chunk))
+
+    def _read_chunks(self):
+        """Yield the request body in chunks, whether it is sent with a
+        Content-Length or with chunked transfer encoding."""
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return
+                yield self.rfile.read(size)
+                self.rfile.readline()
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining:
+            chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    def _read_body(self):
+        """Read the request body under the bandwidth cap and return its size and
+        MD5 checksum."""
+        start = time.monotonic()
+        size = 0
+        md5 = hashlib.md5()  # nosec
+        for chunk in self._read_chunks():
+            md5.update(chunk)
+            size += len(chunk)
+            self._throttle(start, size)
+        return size, md5.hexdigest()
+
+    def _respond(self, method):
+        url = urlparse(self.path)
+        size, checksum = self._read_body() if method == "POST" else (0, None)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if not url.path.endswith("/login") and not self.server.session_valid(
+            self.headers.get("Cookie", "")
+        ):
+            self.server.count("unauthorized")
+            self._send_json({"error": "Unauthorized"}, status=401)
+            return
+        if self.server.should_fail():
+            self.server.count("error")
+            self._send_json({"error": "Service Unavailable"}, status=503)
+            return
+        handler = getattr(self, f"_{method.lower()}", None)
+        body = handler(url.path, parse_qs(url.query), size, checksum)
+        if body is None:
+            body = ({}, 404)
+        elif not isinstance(body, tuple):
+            body = (body,)
+        self._send_json(*body)
+
+    def do_GET(self):
+        self._respond("GET")
+
+    def do_POST(self):
+        self._respond("POST")
+
+    def _get(self, path, query, size, checksum):
+        if path.endswith("/status"):
+            self.server.count("status")
+            return {"fullname": "Benchmark User", "authenticated": True}
+        if "/handle/" in path:
+            self.server.count("handle")
+            handle = path.split("/handle/", 1)[1]
+            return {"uuid": str(uuid.uuid5(uuid.NAMESPACE_URL, handle))}
+        if path.endswith("/filtered-items"):
+            self.server.count("search_page")
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", ["100"])[0])
+            end = min(offset + limit, self.server.search_items)
+            return {
+                "items": [
+                    {
+                        "uuid": str(uuid.uuid5(uuid.NAMESPACE_URL, str(i))),
+                        "name": f"Item {i}",
+                        "handle": f"1721.1/{i}",
+                        "link": f"/rest/items/{i}",
+                        "type": "item",
+                    }
+                    for i in range(offset, end)
+                ]
+            }
+        return None
+
+    def _post(self, path, query, size, checksum):
+        if path.endswith("/login"):
+            self.server.count("login")
+            return {}, 200, {"JSESSIONID": self.server.open_session()}
+        if path.endswith("/items") or path.endswith("/collections"):
+            self.server.count(
+                "item_post" if path.endswith("/items") else "collection_post"
+            )
+            record_uuid = str(uuid.uuid4())
+            return {"uuid": record_uuid, "handle": f"1721.1/{record_uuid[:8]}"}
+        if path.endswith("/bitstreams"):
+            self.server.count("bitstream_post")
+            return {
+                "uuid": str(uuid.uuid4()),
+                "name": query.get("name", [""])[0],
+                "sizeBytes": size,
+                "checkSum": {"value": checksum, "checkSumAlgorithm": "MD5"},
+            }
+        return None
+
+
+def start_server(host="127.0.0.1", port=0, **config):
+    """Start the stand-in server in a daemon thread and return it."""
+    server = DSpaceServer((host, port), **config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def server_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to each response."
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        help="The fraction of requests answered with 503 Service Unavailable.",
+    )
+    parser.add_argument(
+        "--bandwidth",
+        type=float,
+        help="The bytes per second each connection may send or receive.",
+    )
+    parser.add_argument(
+        "--search-items",
+        type=int,
+        default=1000,
+        help="The number of items the filtered items endpoint finds.",
+    )
+    parser.add_argument(
+        "--session-ttl",
+        type=float,
+        help="Seconds after which a login session expires, never by default.",
+    )
+    args = parser.parse_args()
+    server = DSpaceServer(
+        (args.host, args.port),
+        latency=args.latency,
+        error_rate=args.error_rate,
+        bandwidth=args.bandwidth,
+        search_items=args.search_items,
+        session_ttl=args.session_ttl,
+    )
+    print(f"Serving on {server_url(server)}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class RecordCache:
+    """Cache of API records with least-recently-used eviction from memory and
+    time-to-live expiry, optionally backed by a SQLite file so that records are
+    reused across runs. If bypass is set, records are refreshed from the API but
+    never served from the cache."""
+
+    def __init__(self, maxsize=4096, ttl=3600, path=None, bypass=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.connection = None
+        if path:
+            self.connection = sqlite3.connect(
+                path, check_same_thread=False, isolation_level=None
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS records "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "DELETE FROM records WHERE expires <= ?", (time.time(),)
+            )
+
+    def get(self, key):
+        """Return the cached record for a key, or None if it is missing or expired."""
+        with self.lock:
+            record = None if self.bypass else self._get(key)
+            if record is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return record
+
+    def _get(self, key):
+        now = time.time()
+        if key in self.entries:
+            expires, record = self.entries[key]
+            if expires > now:
+                self.entries.move_to_end(key)
+                return record
+            del self.entries[key]
+        if self.connection:
+            row = self.connection.execute(
+                "SELECT value, expires FROM records WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] > now:
+                record = json.loads(row[0])
+                self._remember(key, row[1], record)
+                return record
+        return None
+
+    def set(self, key, record):
+        """Cache a record for the cache's time to live."""
+        expires = time.time() + self.ttl
+        with self.lock:
+            self._remember(key, expires, record)
+            if self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?)",
+                    (key, json.dumps(record), expires),
+                )
+
+    def _remember(self, key, expires, record):
+        self.entries[key] = (expires, record)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Remove a record, or every record if no key is given, from the cache."""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+            if self.connection:
+                if key is None:
+                    self.connection.execute("DELETE FROM records")
+                else:
+                    self.connection.execute("DELETE FROM records WHERE key = ?", (key,))
+
+    def close(self):
+        """Log the cache's hit and miss counts and close its SQLite file."""
+        logger.info(f"Cache hits: {self.hits}, misses: {self.misses}")
+        with self.lock:
+            if self.connection:
+                self.connection.close()
+                self.connection = None
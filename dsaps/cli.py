@@ -1,18 +1,22 @@
 import csv
 import datetime
 import json
-import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
 
 import click
 import structlog
 
 from dsaps import helpers
-from dsaps.models import Client, Collection
+from dsaps.log import configure_logging, parse_sample_rates
 
 logger = structlog.get_logger()
 
+BYTE_UNITS = {"K": 1e3, "M": 1e6, "G": 1e9}
+
 
 def validate_path(ctx, param, value):
     """Validates the formatting of the submitted path"""
@@ -22,59 +26,398 @@ def validate_path(ctx, param, value):
         raise click.BadParameter("Include / at the end of the path.")
 
 
+def validate_sample_rates(ctx, param, value):
+    """Parse the EVENT=N log sampling options."""
+    try:
+        return parse_sample_rates(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def report_metrics(metrics, metrics_file, metrics_format):
+    """Log the summary of the run's API calls and write it to the metrics file."""
+    metrics.log_summary()
+    if metrics_file:
+        metrics.write(metrics_file, metrics_format)
+
+
 @click.group(chain=True)
 @click.option(
     "--url",
     envvar="DSPACE_URL",
-    required=True,
+    help="The URL of the DSpace REST API. Required by every command but reconcile "
+    "and plan.",
 )
 @click.option(
     "-e",
     "--email",
     envvar="DSPACE_EMAIL",
-    required=True,
     help="The email of the user for authentication.",
 )
 @click.option(
     "-p",
     "--password",
     envvar="DSPACE_PASSWORD",
-    required=True,
     hide_input=True,
     help="The password for authentication.",
 )
+@click.option(
+    "--pool-connections",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="The number of per-host connection pools to keep.",
+)
+@click.option(
+    "--pool-maxsize",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="The maximum number of connections kept open to each host.",
+)
+@click.option(
+    "--pool-block/--no-pool-block",
+    default=False,
+    show_default=True,
+    help="Wait for a free connection instead of opening an extra one when a "
+    "host's pool is exhausted.",
+)
+@click.option(
+    "--keep-alive/--no-keep-alive",
+    default=True,
+    show_default=True,
+    help="Reuse connections to DSpace between API calls.",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Cache handle lookups and records fetched from DSpace.",
+)
+@click.option(
+    "--cache-file",
+    type=click.Path(dir_okay=False),
+    help="The path of a SQLite file that keeps cached records between runs.",
+)
+@click.option(
+    "--cache-ttl",
+    type=click.IntRange(min=0),
+    default=3600,
+    show_default=True,
+    help="The number of seconds a cached record is used for.",
+)
+@click.option(
+    "--refresh-cache",
+    is_flag=True,
+    help="Fetch every record from DSpace instead of the cache, updating the cache.",
+)
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    help="Remove every record from the cache file before running.",
+)
+@click.option(
+    "--retries",
+    type=click.IntRange(min=0),
+    default=5,
+    show_default=True,
+    help="The number of times a failed idempotent API call is retried.",
+)
+@click.option(
+    "--backoff",
+    type=click.FloatRange(min=0),
+    default=0.5,
+    show_default=True,
+    help="The base delay in seconds of the jittered exponential backoff between "
+    "retries.",
+)
+@click.option(
+    "--timeout",
+    type=click.FloatRange(min=0, min_open=True),
+    default=300,
+    show_default=True,
+    help="The number of seconds to wait for DSpace to respond to an API call.",
+)
+@click.option(
+    "--max-concurrency",
+    type=click.IntRange(min=1),
+    default=32,
+    show_default=True,
+    help="The maximum number of API calls in flight, reduced automatically while "
+    "DSpace returns errors or responds slowly.",
+)
+@click.option(
+    "--max-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    help="The maximum number of API calls started per second, unlimited by "
+    "default. The rate is also reduced automatically while DSpace is overloaded.",
+)
+@click.option(
+    "--target-latency",
+    type=click.FloatRange(min=0, min_open=True),
+    default=5,
+    show_default=True,
+    help="The response time in seconds above which DSpace is treated as overloaded.",
+)
+@click.option(
+    "--metrics-file",
+    type=click.Path(dir_okay=False),
+    help="The path of a file the timing and throughput of the run's API calls are "
+    "written to.",
+)
+@click.option(
+    "--metrics-format",
+    type=click.Choice(["json", "prometheus"]),
+    default="json",
+    show_default=True,
+    help="Write the metrics file as JSON or as a Prometheus textfile.",
+)
+@click.option(
+    "--log-level",
+    type=click.Choice(["DEBUG", "INFO", "WARNING", "ERROR"], case_sensitive=False),
+    default="INFO",
+    show_default=True,
+    help="The lowest level of the events written to the log file.",
+)
+@click.option(
+    "--async-logging/--no-async-logging",
+    default=True,
+    show_default=True,
+    help="Hand log events to a background thread that writes them to the log file, "
+    "so that slow disks do not hold up requests.",
+)
+@click.option(
+    "--log-sample",
+    multiple=True,
+    metavar="EVENT=N",
+    callback=validate_sample_rates,
+    help="Log only one in every N occurrences of an event, e.g. "
+    '"Bitstream posted=100". May be repeated.',
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Profile the run with cProfile, writing the profile and a report of the "
+    "slowest functions next to the log file.",
+)
+@click.option(
+    "--trace-memory",
+    is_flag=True,
+    help="Trace the run's memory with tracemalloc, writing a report of the top "
+    "allocation sites at the largest sampled size next to the log file.",
+)
+@click.option(
+    "--profile-top",
+    type=click.IntRange(min=1),
+    default=25,
+    show_default=True,
+    help="The number of functions and allocation sites in the profiling reports.",
+)
 @click.pass_context
-def main(ctx, url, email, password):
+def main(
+    ctx,
+    url,
+    email,
+    password,
+    pool_connections,
+    pool_maxsize,
+    pool_block,
+    keep_alive,
+    cache,
+    cache_file,
+    cache_ttl,
+    refresh_cache,
+    clear_cache,
+    retries,
+    backoff,
+    timeout,
+    max_concurrency,
+    max_rate,
+    target_latency,
+    metrics_file,
+    metrics_format,
+    log_level,
+    async_logging,
+    log_sample,
+    profile,
+    trace_memory,
+    profile_top,
+):
     ctx.obj = {}
     if os.path.isdir("logs") is False:
         os.mkdir("logs")
     dt = datetime.datetime.utcnow().isoformat(timespec="seconds")
     log_suffix = f"{dt}.log"
-    structlog.configure(
-        processors=[
-            structlog.stdlib.filter_by_level,
-            structlog.stdlib.add_log_level,
-            structlog.stdlib.PositionalArgumentsFormatter(),
-            structlog.processors.TimeStamper(fmt="iso"),
-            structlog.processors.JSONRenderer(),
-        ],
-        context_class=dict,
-        logger_factory=structlog.stdlib.LoggerFactory(),
-    )
-    logging.basicConfig(
-        format="%(message)s",
-        handlers=[logging.FileHandler(f"logs/log-{log_suffix}", "w")],
-        level=logging.INFO,
+    ctx.call_on_close(
+        configure_logging(
+            f"logs/log-{log_suffix}",
+            level=log_level,
+            asynchronous=async_logging,
+            sample_rates=log_sample,
+        )
     )
     logger.info("Application start")
-    client = Client(url)
-    client.authenticate(email, password)
-    start_time = time.time()
-    ctx.obj["client"] = client
-    ctx.obj["start_time"] = start_time
+    if profile or trace_memory:
+        from dsaps.profiling import Profiler
+
+        profiler = Profiler(
+            f"logs/profile-{dt}",
+            profile=profile,
+            trace_memory=trace_memory,
+            top=profile_top,
+        )
+        profiler.start()
+        ctx.call_on_close(profiler.stop)
+
+    def create_client():
+        # Imported here so that commands that never call the API start quickly and
+        # work offline.
+        from dsaps.cache import RecordCache
+        from dsaps.metrics import RequestMetrics
+        from dsaps.models import Client
+        from dsaps.scheduler import RequestScheduler
+
+        for option, value in [
+            ("--url", url),
+            ("--email", email),
+            ("--password", password),
+        ]:
+            if not value:
+                raise click.UsageError(f"Missing option '{option}'.", ctx)
+        record_cache = None
+        if cache:
+            record_cache = RecordCache(
+                ttl=cache_ttl, path=cache_file, bypass=refresh_cache
+            )
+            ctx.call_on_close(record_cache.close)
+            if clear_cache:
+                record_cache.invalidate()
+        client = Client(
+            url,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            keep_alive=keep_alive,
+            cache=record_cache,
+            scheduler=RequestScheduler(
+                max_concurrency=max_concurrency,
+                max_rate=max_rate,
+                target_latency=target_latency,
+            ),
+            retries=retries,
+            backoff=backoff,
+            timeout=timeout,
+            metrics=RequestMetrics(),
+        )
+        ctx.call_on_close(client.close)
+        ctx.call_on_close(
+            partial(report_metrics, client.metrics, metrics_file, metrics_format)
+        )
+        client.authenticate(email, password)
+        return client
+
+    ctx.obj["create_client"] = create_client
+    ctx.obj["start_time"] = time.time()
     ctx.obj["log_suffix"] = log_suffix
 
 
+def ingest(
+    client,
+    collection_uuid,
+    metadata_csv=None,
+    field_map=None,
+    content_directory=None,
+    file_type="*",
+    workers=1,
+    journal=None,
+    hasher=None,
+    lookahead=None,
+    report_name=None,
+    plan=None,
+):
+    """Post the items of a metadata CSV and their files to a collection, writing an
+    ingest report if a report name is given, and return the number of items
+    posted. If a plan is given, the items and their files are read from it instead
+    of the CSV and the content directory. If any items fail to post, they are
+    written to a failure report beside the ingest report and a ClickException is
+    raised."""
+    from dsaps.models import Collection
+
+    with ExitStack() as stack:
+        if plan:
+            from dsaps.plan import read_plan_items
+
+            collection = Collection(items=read_plan_items(plan))
+        else:
+            csvfile = stack.enter_context(open(metadata_csv, "r"))
+            with open(field_map, "r") as jsonfile:
+                mapping = json.load(jsonfile)
+            collection = Collection.stream_items_from_csv(
+                csv.DictReader(csvfile), mapping, content_directory, file_type
+            )
+        collection.uuid = collection_uuid
+        failures = []
+        items = collection.post_items(
+            client, workers, journal, hasher, lookahead, failures
+        )
+        if report_name:
+            posted = helpers.create_ingest_report(items, report_name)
+        else:
+            posted = sum(1 for item in items)
+    if failures:
+        message = f"{len(failures)} items failed to post, see the log."
+        if report_name:
+            failure_report = f"{os.path.splitext(report_name)[0]}-failed.csv"
+            helpers.create_failure_report(failures, failure_report)
+            message = f"{len(failures)} items failed to post, see {failure_report}."
+        raise click.ClickException(message)
+    return posted
+
+
+def get_client(ctx):
+    """Return the run's authenticated client, creating it when a command first
+    needs it."""
+    if "client" not in ctx.obj:
+        ctx.obj["client"] = ctx.obj["create_client"]()
+    return ctx.obj["client"]
+
+
+def validate_byte_count(ctx, param, value):
+    """Parse a number of bytes, or of bytes per second, with an optional K, M or G
+    suffix."""
+    if value is None:
+        return None
+    multiplier = BYTE_UNITS.get(value[-1:].upper(), 1)
+    number = value[:-1] if value[-1:].upper() in BYTE_UNITS else value
+    try:
+        rate = float(number) * multiplier
+    except ValueError:
+        raise click.BadParameter(f"{value} is not a number of bytes, e.g. 50M.")
+    if rate <= 0:
+        raise click.BadParameter(f"{value} is not a positive number of bytes.")
+    return rate
+
+
+def validate_journal_field_map(field_map):
+    """Check that a field map gives items the source_system_identifier that a
+    journal records them by."""
+    with open(field_map) as jsonfile:
+        if "source_system_identifier" not in json.load(jsonfile):
+            raise click.UsageError(
+                f"A journal requires the field map {field_map} to map "
+                "source_system_identifier, which items are journaled by."
+            )
+
+
+def validate_content_location(ctx, param, value):
+    """Check that a content location is a URL or an existing directory."""
+    if value is None or helpers.is_url(value):
+        return value
+    return click.Path(exists=True, dir_okay=True, file_okay=False).convert(
+        value, param, ctx
+    )
+
+
 @main.command()
 @click.option(
     "-m",
@@ -94,9 +437,73 @@ def main(ctx, url, email, password):
     "-d",
     "--content-directory",
     required=True,
-    type=click.Path(exists=True, dir_okay=True, file_okay=False),
+    callback=validate_content_location,
     help="The full path to the content, either a directory of files "
-    "or a URL for the storage location.",
+    "or the URL of a manifest or index page listing the files.",
+)
+@click.option(
+    "-t",
+    "--file-type",
+    help="The file type to be uploaded, if limited to one file type.",
+    default="*",
+)
+@click.option(
+    "-o",
+    "--output-file",
+    type=click.Path(dir_okay=False),
+    help="The path of the plan file. Defaults to the metadata CSV's path with "
+    "-plan.jsonl in place of .csv.",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The number of threads checking files. Defaults to a number based on the "
+    "number of CPUs.",
+)
+@click.pass_context
+def plan(
+    ctx, metadata_csv, field_map, content_directory, file_type, output_file, workers
+):
+    """Check a metadata CSV, a field mapping file and the content for problems
+    without calling the DSpace API, and write a plan of the items, their files
+    and sizes that additems can post from."""
+    from dsaps.plan import create_plan
+
+    start_time = ctx.obj["start_time"]
+    output_file = output_file or f"{os.path.splitext(metadata_csv)[0]}-plan.jsonl"
+    problems = create_plan(
+        metadata_csv, field_map, content_directory, output_file, file_type, workers
+    )
+    elapsed_time = datetime.timedelta(seconds=time.time() - start_time)
+    logger.info(f"Total runtime : {elapsed_time}")
+    if problems:
+        raise click.ClickException(
+            f"{len(problems)} problems found and no plan written, see the log. "
+            f"First problem: {problems[0]}"
+        )
+
+
+@main.command()
+@click.option(
+    "-m",
+    "--metadata-csv",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    help="The path to the CSV file of metadata for the items.",
+)
+@click.option(
+    "-f",
+    "--field-map",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    help="The path to JSON field mapping file.",
+)
+@click.option(
+    "-d",
+    "--content-directory",
+    callback=validate_content_location,
+    help="The full path to the content, either a directory of files "
+    "or the URL of a manifest or index page listing the files.",
 )
 @click.option(
     "-t",
@@ -116,6 +523,68 @@ def main(ctx, url, email, password):
     help="The handle of the collection to which items are being " "added.",
     default=None,
 )
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="The number of items and of bitstreams to post concurrently. Items "
+    "that fail to post are logged and skipped when greater than 1.",
+)
+@click.option(
+    "-j",
+    "--journal",
+    type=click.Path(dir_okay=False),
+    help="The path of a SQLite journal recording each posted item and bitstream.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Resume an interrupted run from its journal, skipping the items and "
+    "bitstreams already posted.",
+)
+@click.option(
+    "--skip-unchanged",
+    is_flag=True,
+    help="Re-run an ingest from its journal, comparing the checksums of the files "
+    "of items already posted with their bitstreams in DSpace and uploading only "
+    "new or changed files.",
+)
+@click.option(
+    "--hash-workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The number of processes hashing files for --skip-unchanged. Defaults to "
+    "the number of CPUs.",
+)
+@click.option(
+    "--lookahead",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The number of items posted ahead of the oldest unfinished item when "
+    "--workers is greater than 1, whose bitstreams are uploaded largest first. "
+    "Defaults to twice the number of workers.",
+)
+@click.option(
+    "--max-upload-rate",
+    callback=validate_byte_count,
+    help="The bytes per second all uploads together may send, e.g. 50M. "
+    "Unlimited by default.",
+)
+@click.option(
+    "--max-worker-upload-rate",
+    callback=validate_byte_count,
+    help="The bytes per second each upload worker may send, e.g. 10M. Unlimited "
+    "by default.",
+)
+@click.option(
+    "--plan",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    help="The path of a plan written by the plan command, whose items and files "
+    "are posted instead of those of a metadata CSV, field map and content "
+    "directory.",
+)
 @click.pass_context
 def additems(
     ctx,
@@ -125,35 +594,330 @@ def additems(
     file_type,
     ingest_report,
     collection_handle,
+    workers,
+    journal,
+    resume,
+    skip_unchanged,
+    hash_workers,
+    lookahead,
+    max_upload_rate,
+    max_worker_upload_rate,
+    plan,
 ):
     """Add items to a specified collection from a metadata CSV, a field
-    mapping file, and a directory of files. May be run in conjunction with the
-    newcollection CLI command."""
-    client = ctx.obj["client"]
+    mapping file, and a directory of files, or from a plan. May be run in
+    conjunction with the newcollection CLI command."""
     start_time = ctx.obj["start_time"]
+    if plan:
+        if metadata_csv or field_map or content_directory:
+            raise click.UsageError(
+                "--plan replaces --metadata-csv, --field-map and --content-directory."
+            )
+        from dsaps.plan import PlanError, read_plan_header
+
+        try:
+            read_plan_header(plan)
+        except PlanError as e:
+            raise click.UsageError(str(e))
+    elif not (metadata_csv and field_map and content_directory):
+        raise click.UsageError(
+            "--metadata-csv, --field-map and --content-directory are required "
+            "unless items are posted from a --plan."
+        )
+    if journal and field_map:
+        validate_journal_field_map(field_map)
+    if resume and journal is None:
+        raise click.UsageError("--resume requires the --journal of the run to resume.")
+    if skip_unchanged and journal is None:
+        raise click.UsageError(
+            "--skip-unchanged requires the --journal of the run to compare with."
+        )
+    if skip_unchanged and content_directory and helpers.is_url(content_directory):
+        raise click.UsageError("--skip-unchanged requires a local content directory.")
+    from dsaps.hashing import FileHasher
+    from dsaps.journal import Journal
+
+    hasher = None
+    if journal:
+        journal = Journal(journal)
+        ctx.call_on_close(journal.close)
+        if skip_unchanged:
+            hasher = FileHasher(journal, hash_workers)
+            ctx.call_on_close(hasher.close)
+        if journal.item_count() and not (resume or skip_unchanged):
+            raise click.UsageError(
+                f"Journal {journal.path} already records posted items, use --resume "
+                "to continue that run or choose another journal."
+            )
     if "collection_uuid" not in ctx.obj and collection_handle is None:
         raise click.UsageError(
             "collection_handle option must be used or "
             "additems must be run after newcollection "
             "command."
         )
-    elif "collection_uuid" in ctx.obj:
+    client = get_client(ctx)
+    if "collection_uuid" in ctx.obj:
         collection_uuid = ctx.obj["collection_uuid"]
     else:
         collection_uuid = client.get_uuid_from_handle(collection_handle)
+    report_name = None
+    if ingest_report and plan:
+        report_name = f"{os.path.splitext(plan)[0]}-ingest.csv"
+    elif ingest_report:
+        report_name = f"{os.path.splitext(metadata_csv)[0]}-ingest.csv"
+    client.set_upload_limits(max_upload_rate, max_worker_upload_rate)
+    ingest(
+        client,
+        collection_uuid,
+        metadata_csv,
+        field_map,
+        content_directory,
+        file_type,
+        workers=workers,
+        journal=journal,
+        hasher=hasher,
+        lookahead=lookahead,
+        report_name=report_name,
+        plan=plan,
+    )
+    elapsed_time = datetime.timedelta(seconds=time.time() - start_time)
+    logger.info(f"Total runtime : {elapsed_time}")
+
+
+@main.command()
+@click.option(
+    "-m",
+    "--metadata-csv",
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    help="The path to the CSV file of corrected metadata for the items.",
+)
+@click.option(
+    "-f",
+    "--field-map",
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    help="The path to JSON field mapping file.",
+)
+@click.option(
+    "-k",
+    "--key-column",
+    default="handle",
+    show_default=True,
+    help="The CSV column identifying the item each row updates.",
+)
+@click.option(
+    "--key-type",
+    type=click.Choice(["handle", "uuid"]),
+    default="handle",
+    show_default=True,
+    help="Whether the key column holds the items' handles or UUIDs.",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="The number of items to update concurrently.",
+)
+@click.pass_context
+def updateitems(ctx, metadata_csv, field_map, key_column, key_type, workers):
+    """Update the metadata of existing items from a metadata CSV keyed by handle or
+    UUID and a field mapping file, sending only the fields whose values differ from
+    the items' current metadata. Fields whose mapped columns the CSV does not have
+    are left unchanged."""
+    start_time = ctx.obj["start_time"]
     with open(metadata_csv, "r") as csvfile, open(field_map, "r") as jsonfile:
         metadata = csv.DictReader(csvfile)
-        mapping = json.load(jsonfile)
-        collection = Collection.create_metadata_for_items_from_csv(metadata, mapping)
-    for item in collection.items:
-        item.bitstreams_in_directory(content_directory, file_type)
-    collection.uuid = collection_uuid
-    items = collection.post_items(client)
-    if ingest_report:
-        report_name = metadata_csv.replace(".csv", "-ingest.csv")
-        helpers.create_ingest_report(items, report_name)
+        if key_column not in metadata.fieldnames:
+            raise click.UsageError(f"{metadata_csv} has no {key_column} column.")
+        mapping = {
+            key: field
+            for key, field in json.load(jsonfile).items()
+            if field["csv_field_name"] in metadata.fieldnames
+        }
+        if not mapping:
+            raise click.UsageError(
+                f"{metadata_csv} has none of the columns mapped by {field_map}."
+            )
+        client = get_client(ctx)
+        from dsaps.models import Item
+
+        transform = Item.compile_field_map(mapping)
+
+        def items():
+            for row in metadata:
+                item = transform(row)
+                setattr(item, key_type, row[key_column])
+                yield item
+
+        updated = unchanged = 0
+        failures = []
+        for item, changed_fields in client.update_items(items(), workers, failures):
+            if changed_fields:
+                updated += 1
+            else:
+                unchanged += 1
+    logger.info(
+        f"Items updated: {updated}, unchanged: {unchanged}, failed: {len(failures)}"
+    )
     elapsed_time = datetime.timedelta(seconds=time.time() - start_time)
     logger.info(f"Total runtime : {elapsed_time}")
+    if failures:
+        raise click.ClickException(
+            f"{len(failures)} items failed to update, see the log."
+        )
+
+
+def batch_report_name(job):
+    """Return the path of a batch job's ingest report, by default its metadata
+    CSV's path with -ingest.csv in place of the extension."""
+    return (
+        job.get("ingest_report")
+        or f"{os.path.splitext(job['metadata_csv'])[0]}-ingest.csv"
+    )
+
+
+def validate_batch_job(job):
+    """Check that a batch job names its files and its collection."""
+    name = job.get("name") or job.get("metadata_csv")
+    missing = [
+        key
+        for key in ("metadata_csv", "field_map", "content_directory")
+        if not job.get(key)
+    ]
+    if missing:
+        raise click.UsageError(f"Batch job {name} has no {', '.join(missing)}.")
+    for key in ("metadata_csv", "field_map"):
+        if not os.path.isfile(job[key]):
+            raise click.UsageError(f"Batch job {name} {key} {job[key]} does not exist.")
+    if not helpers.is_url(job["content_directory"]) and not os.path.isdir(
+        job["content_directory"]
+    ):
+        raise click.UsageError(
+            f"Batch job {name} content_directory {job['content_directory']} does not "
+            "exist."
+        )
+    if not job.get("collection_handle") and not (
+        job.get("community_handle") and job.get("collection_name")
+    ):
+        raise click.UsageError(
+            f"Batch job {name} needs a collection_handle, or a community_handle and "
+            "collection_name for a new collection."
+        )
+    if os.path.realpath(batch_report_name(job)) == os.path.realpath(
+        job["metadata_csv"]
+    ):
+        raise click.UsageError(
+            f"Batch job {name} ingest_report would overwrite its metadata_csv."
+        )
+    if job.get("journal"):
+        validate_journal_field_map(job["field_map"])
+
+
+def run_batch_job(client, job, workers):
+    """Run one job of a batch manifest and return the number of items posted. A
+    job's journal, if it has one, is resumed, and the collection a journal records
+    is reused rather than created again."""
+    from dsaps.journal import Journal
+
+    journal = Journal(job["journal"]) if job.get("journal") else None
+    try:
+        collection_uuid = journal.collection_uuid() if journal else None
+        if collection_uuid is None and job.get("collection_handle"):
+            collection_uuid = client.get_uuid_from_handle(job["collection_handle"])
+        elif collection_uuid is None:
+            collection_uuid = client.post_coll_to_comm(
+                job["community_handle"], job["collection_name"]
+            )
+        return ingest(
+            client,
+            collection_uuid,
+            job["metadata_csv"],
+            job["field_map"],
+            job["content_directory"],
+            job.get("file_type", "*"),
+            workers=job.get("workers", workers),
+            journal=journal,
+            lookahead=job.get("lookahead"),
+            report_name=batch_report_name(job),
+        )
+    finally:
+        if journal:
+            journal.close()
+
+
+@main.command()
+@click.option(
+    "-b",
+    "--manifest",
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    help="The path to a YAML or JSON manifest of ingest jobs.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="The number of jobs run at the same time.",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="The number of items and of bitstreams each job posts concurrently, "
+    "unless the job sets its own workers.",
+)
+@click.option(
+    "--max-upload-rate",
+    callback=validate_byte_count,
+    help="The bytes per second the uploads of all jobs together may send, e.g. "
+    "50M. Unlimited by default.",
+)
+@click.option(
+    "--max-worker-upload-rate",
+    callback=validate_byte_count,
+    help="The bytes per second each upload worker may send, e.g. 10M. Unlimited "
+    "by default.",
+)
+@click.pass_context
+def batch(ctx, manifest, jobs, workers, max_upload_rate, max_worker_upload_rate):
+    """Run the ingest jobs of a manifest in one process, sharing one authenticated
+    client, its connection pool and its limits on concurrent API calls, and write
+    an ingest report for each job."""
+    start_time = ctx.obj["start_time"]
+    try:
+        batch_jobs = helpers.load_batch_manifest(manifest)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    for job in batch_jobs:
+        validate_batch_job(job)
+    client = get_client(ctx)
+    client.set_upload_limits(max_upload_rate, max_worker_upload_rate)
+    failed = 0
+    with ThreadPoolExecutor(jobs) as executor:
+        futures = [
+            (job, executor.submit(run_batch_job, client, job, workers))
+            for job in batch_jobs
+        ]
+        for job, future in futures:
+            name = job.get("name") or job["metadata_csv"]
+            try:
+                logger.info("Batch job completed", job=name, items=future.result())
+            except Exception as e:
+                failed += 1
+                logger.error("Batch job failed", job=name, error=repr(e))
+    elapsed_time = datetime.timedelta(seconds=time.time() - start_time)
+    logger.info(f"Total runtime : {elapsed_time}")
+    if failed:
+        raise click.ClickException(
+            f"{failed} of {len(batch_jobs)} batch jobs failed, see the log."
+        )
 
 
 @main.command()
@@ -174,7 +938,7 @@ def newcollection(ctx, community_handle, collection_name):
     """Post a new collection to a specified community. Used in conjunction
     with the additems CLI command to populate the new collection with
     items."""
-    client = ctx.obj["client"]
+    client = get_client(ctx)
     collection_uuid = client.post_coll_to_comm(community_handle, collection_name)
     ctx.obj["collection_uuid"] = collection_uuid
 
@@ -199,8 +963,7 @@ def newcollection(ctx, community_handle, collection_name):
     "-d",
     "--content-directory",
     required=True,
-    help="The full path to the content, either a directory of files "
-    "or a URL for the storage location.",
+    help="The full path to the local directory of files.",
 )
 @click.option(
     "-t",
@@ -208,11 +971,43 @@ def newcollection(ctx, community_handle, collection_name):
     help="The file type to be uploaded, if limited to one file " "type.",
     default="*",
 )
-def reconcile(metadata_csv, output_directory, content_directory, file_type):
+@click.option(
+    "--memory-budget",
+    callback=validate_byte_count,
+    help="Reconcile in bounded memory, e.g. 500M, by sorting the files and the "
+    "metadata into temporary files and matching them in one pass. By default both "
+    "are held in memory.",
+)
+@click.option(
+    "--temp-directory",
+    type=click.Path(exists=True, file_okay=False),
+    help="The directory of the temporary files written with --memory-budget, "
+    "defaults to the system's temporary directory.",
+)
+def reconcile(
+    metadata_csv,
+    output_directory,
+    content_directory,
+    file_type,
+    memory_budget,
+    temp_directory,
+):
     """Run a reconciliation of the specified files and metadata to produce
     reports of files with no metadata, metadata with no files, metadata
     matched to files, and an updated version of the metadata CSV with only
     the records that have matching files."""
+    if helpers.is_url(content_directory):
+        raise click.UsageError("reconcile requires a local content directory.")
+    if memory_budget:
+        helpers.reconcile_sorted(
+            metadata_csv,
+            output_directory,
+            content_directory,
+            file_type,
+            memory_budget,
+            temp_directory,
+        )
+        return
     file_ids = helpers.create_file_list(content_directory, file_type)
     metadata_ids = helpers.create_metadata_id_list(metadata_csv)
     metadata_matches = helpers.match_metadata_to_files(file_ids, metadata_ids)
@@ -225,3 +1020,163 @@ def reconcile(metadata_csv, output_directory, content_directory, file_type):
         metadata_matches, f"{output_directory}metadata_matches"
     )
     helpers.update_metadata_csv(metadata_csv, output_directory, metadata_matches)
+
+
+@main.command()
+@click.option(
+    "-f",
+    "--field",
+    required=True,
+    help="The metadata field to search, e.g. dc.title, or * for any field.",
+)
+@click.option(
+    "-s",
+    "--string",
+    default="",
+    help="The value to search for.",
+)
+@click.option(
+    "-q",
+    "--query-type",
+    type=click.Choice(
+        [
+            "exists",
+            "doesnt_exist",
+            "equals",
+            "not_equals",
+            "like",
+            "not_like",
+            "contains",
+            "doesnt_contain",
+            "matches",
+            "doesnt_match",
+        ]
+    ),
+    default="contains",
+    show_default=True,
+    help="The type of comparison of the field to the search value.",
+)
+@click.option(
+    "-c",
+    "--collection-uuid",
+    default="",
+    help="The UUID of a collection to limit the search to.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="The path of the file the results are written to, defaults to stdout.",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(["jsonl", "csv"]),
+    default="jsonl",
+    show_default=True,
+    help="Write the full JSON of each item per line, or a CSV of item identifiers.",
+)
+@click.option(
+    "--page-size",
+    type=click.IntRange(min=1),
+    default=200,
+    show_default=True,
+    help="The number of items requested per page.",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=0),
+    default=2,
+    show_default=True,
+    help="The number of pages requested concurrently ahead of the current page.",
+)
+@click.pass_context
+def search(
+    ctx,
+    field,
+    string,
+    query_type,
+    collection_uuid,
+    output,
+    output_format,
+    page_size,
+    prefetch,
+):
+    """Search for items with the filtered items endpoint and stream the results to
+    a JSON lines or CSV file as pages arrive."""
+    client = get_client(ctx)
+    items = client.search_items(
+        field,
+        string,
+        query_type,
+        collection_uuid,
+        page_size=page_size,
+        prefetch=prefetch,
+    )
+    count = helpers.write_records(
+        items, output, output_format, ["uuid", "handle", "name", "link"]
+    )
+    logger.info(f"Items found: {count}")
+
+
+@main.command()
+@click.option(
+    "-h",
+    "--handle",
+    required=True,
+    help="The handle of the community or collection to export.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="The path of the file the items are written to, defaults to stdout.",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(["jsonl", "csv"]),
+    default="jsonl",
+    show_default=True,
+    help="Write each item as a JSON line, or as a CSV row with its metadata and "
+    "bitstreams as JSON.",
+)
+@click.option(
+    "--page-size",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="The number of items requested per page.",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=0),
+    default=2,
+    show_default=True,
+    help="The number of pages requested concurrently ahead of the current page.",
+)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="The number of subcommunities fetched concurrently when walking a "
+    "community.",
+)
+@click.pass_context
+def export(ctx, handle, output, output_format, page_size, prefetch, workers):
+    """Export the metadata and bitstream listing of every item in a community or
+    collection, streaming them to a JSON lines or CSV file as pages arrive."""
+    client = get_client(ctx)
+    uuid, record_type = client.resolve_handle(handle)
+    if record_type not in ("community", "collection"):
+        raise click.UsageError(f"{handle} is not a community or collection.")
+    items = client.export_items(uuid, record_type, page_size, prefetch, workers)
+    count = helpers.write_records(
+        items,
+        output,
+        output_format,
+        ["uuid", "handle", "name", "collection_uuid", "metadata", "bitstreams"],
+    )
+    logger.info(f"Items exported: {count}")
@@ -0,0 +1,50 @@
+import hashlib
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from dsaps import profiling
+
+
+def hash_file(file_path):
+    """Return the MD5 checksum of a file, read through a memory map."""
+    md5 = hashlib.md5()  # nosec
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                md5.update(mapped)
+    return md5.hexdigest()
+
+
+class FileHasher:
+    """Compute the MD5 checksums of local files in a pool of processes, keeping them
+    in the journal keyed on each file's path, size and modification time so that
+    unchanged files are never hashed again."""
+
+    def __init__(self, journal=None, workers=None):
+        self.journal = journal
+        self.executor = ProcessPoolExecutor(workers)
+
+    def close(self):
+        """Shut down the hashing processes."""
+        self.executor.shutdown()
+
+    @profiling.spanned
+    def md5(self, file_paths):
+        """Return a dict of the MD5 checksums of the files."""
+        checksums = {}
+        missing = []
+        for file_path in file_paths:
+            stat = os.stat(file_path)
+            key = (file_path, stat.st_size, stat.st_mtime_ns)
+            checksum = self.journal.get_file_hash(*key) if self.journal else None
+            if checksum:
+                checksums[file_path] = checksum
+            else:
+                missing.append(key)
+        hashed = self.executor.map(hash_file, [key[0] for key in missing])
+        for key, checksum in zip(missing, hashed):
+            checksums[key[0]] = checksum
+            if self.journal:
+                self.journal.record_file_hash(*key, checksum)
+        return checksums
@@ -1,6 +1,57 @@
+import bisect
 import csv
 import glob
+import heapq
+import json
 import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import unquote, urljoin, urlparse
+
+from dsaps import profiling
+
+_END = object()
+
+
+def buffered(iterable, maxsize):
+    """Iterate over an iterable in a background thread that hands its items over
+    through a queue of at most maxsize items. Chaining buffered generators builds a
+    pipeline whose stages run concurrently with bounded memory between them."""
+    handoff = queue.Queue(maxsize)
+    stopped = threading.Event()
+
+    def put(entry):
+        while not stopped.is_set():
+            try:
+                handoff.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for value in iterable:
+                if not put((value, None)):
+                    return
+        except BaseException as e:
+            put((_END, e))
+        else:
+            put((_END, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            value, error = handoff.get()
+            if value is _END:
+                if error is not None:
+                    raise error
+                return
+            yield value
+    finally:
+        stopped.set()
 
 
 def create_csv_from_list(list_name, output):
@@ -12,6 +63,7 @@ def create_csv_from_list(list_name, output):
             writer.writerow([item])
 
 
+@profiling.spanned
 def create_file_list(file_path, file_type):
     """Create a list of file names."""
     files = glob.glob(f"{file_path}/**/*.{file_type}", recursive=True)
@@ -19,9 +71,146 @@ def create_file_list(file_path, file_type):
     return file_list
 
 
+def _scan(directory):
+    """List the files and the non-hidden subdirectories of a directory."""
+    files = []
+    subdirectories = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.name.startswith("."):
+                    subdirectories.append(entry.path)
+            elif entry.is_file():
+                files.append((entry.name, entry.path))
+    return files, subdirectories
+
+
+@profiling.spanned
+def scan_directory(directory, workers=None):
+    """Walk a directory tree, scanning subdirectories in parallel, and yield a
+    (name, path) tuple for every file. Hidden subdirectories are skipped, as they
+    are by a recursive glob."""
+    with ThreadPoolExecutor(workers) as executor:
+        pending = {executor.submit(_scan, directory.rstrip("/") or "/")}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories = future.result()
+                pending.update(executor.submit(_scan, d) for d in subdirectories)
+                yield from files
+
+
+def is_url(location):
+    """Return whether a content location is a URL rather than a local path."""
+    return "://" in location
+
+
+@profiling.spanned
+def scan_url(url, session=None, timeout=300):
+    """Yield a (name, url) tuple for every file listed at a URL, either by a
+    manifest or by an index page. A manifest is a JSON list of file URLs or of
+    objects with url and optional name keys, or a text file of one URL per line,
+    and its URLs may be relative to it. The links of an index page to the
+    subdirectories below it are followed, as a directory walk would."""
+    # Imported here so that the local commands do not pay for them at startup.
+    import requests
+
+    session = session or requests.Session()
+    pending = [url]
+    seen = {url}
+    while pending:
+        page_url = pending.pop()
+        response = session.get(page_url, timeout=timeout)
+        response.raise_for_status()
+        content_type = response.headers.get("Content-Type", "")
+        if "html" in content_type:
+            for link in _index_links(page_url, response.content):
+                if link.endswith("/"):
+                    if link not in seen:
+                        seen.add(link)
+                        pending.append(link)
+                else:
+                    yield _url_name(link), link
+        elif "json" in content_type or urlparse(page_url).path.endswith(".json"):
+            for entry in response.json():
+                if isinstance(entry, str):
+                    entry = {"url": entry}
+                link = urljoin(page_url, entry["url"])
+                yield entry.get("name") or _url_name(link), link
+        else:
+            for line in response.text.splitlines():
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    link = urljoin(page_url, line)
+                    yield _url_name(link), link
+
+
+def _index_links(page_url, content):
+    """Return the links of an index page to the files and subdirectories below it,
+    leaving out links to parent directories and column sorting links."""
+    import lxml.html
+
+    links = []
+    for href in lxml.html.fromstring(content).xpath("//a/@href"):
+        link = urljoin(page_url, href)
+        parsed = urlparse(link)
+        if parsed.query or parsed.fragment or link == page_url:
+            continue
+        if link.startswith(page_url) and not _url_name(link).startswith("."):
+            links.append(link)
+    return links
+
+
+def _url_name(url):
+    """Return the decoded last segment of a URL's path."""
+    return unquote(urlparse(url).path.rstrip("/").rsplit("/", 1)[-1])
+
+
+BATCH_JOB_PATHS = (
+    "metadata_csv",
+    "field_map",
+    "content_directory",
+    "journal",
+    "ingest_report",
+)
+
+
+@profiling.spanned
+def load_batch_manifest(manifest_path):
+    """Return the jobs of a YAML or JSON batch manifest, with the manifest's
+    defaults applied to each job and relative paths resolved against the manifest's
+    directory. A manifest is either a list of jobs or a mapping with a list of jobs
+    and optional defaults."""
+    with open(manifest_path) as manifest_file:
+        if manifest_path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError(
+                    "Reading a YAML manifest requires PyYAML, install it or use a "
+                    "JSON manifest."
+                )
+            manifest = yaml.safe_load(manifest_file)
+        else:
+            manifest = json.load(manifest_file)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    defaults = manifest.get("defaults") or {}
+    directory = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for job in manifest.get("jobs") or []:
+        job = {**defaults, **job}
+        for key in BATCH_JOB_PATHS:
+            if isinstance(job.get(key), str) and not is_url(job[key]):
+                job[key] = os.path.join(directory, job[key])
+        jobs.append(job)
+    return jobs
+
+
 def create_ingest_report(items, file_name):
     """Create ingest report that matches external systems' identifiers with newly
-    created DSpace handles."""
+    created DSpace handles, and return the number of items in it."""
+    count = 0
     with open(f"{file_name}", "w") as writecsv:
         writer = csv.writer(writecsv)
         writer.writerow(["uri", "link"])
@@ -30,8 +219,23 @@ def create_ingest_report(items, file_name):
                 [item.source_system_identifier]
                 + [f"https://hdl.handle.net/{item.handle}"]
             )
+            count += 1
+    return count
+
+
+def create_failure_report(failures, file_name):
+    """Create a report of the items that failed to post and their errors, with the
+    uuid and handle of each item that was posted without all of its bitstreams."""
+    with open(file_name, "w") as writecsv:
+        writer = csv.writer(writecsv)
+        writer.writerow(["uri", "uuid", "handle", "error"])
+        for item, error in failures:
+            writer.writerow(
+                [item.source_system_identifier, item.uuid, item.handle, repr(error)]
+            )
 
 
+@profiling.spanned
 def create_metadata_id_list(metadata_csv):
     """Create list of IDs from a metadata CSV."""
     metadata_ids = []
@@ -43,30 +247,170 @@ def create_metadata_id_list(metadata_csv):
     return metadata_ids
 
 
+@profiling.spanned
 def match_files_to_metadata(file_list, metadata_ids):
     """Create list of files matched to metadata records."""
-    file_matches = [
-        file_id
-        for metadata_id in metadata_ids
-        for file_id in file_list
-        if file_id.startswith(metadata_id)
-    ]
+    order = sorted(range(len(file_list)), key=file_list.__getitem__)
+    sorted_files = [file_list[i] for i in order]
+    file_matches = []
+    for metadata_id in metadata_ids:
+        start = end = bisect.bisect_left(sorted_files, metadata_id)
+        while end < len(sorted_files) and sorted_files[end].startswith(metadata_id):
+            end += 1
+        file_matches.extend(file_list[i] for i in sorted(order[start:end]))
     return file_matches
 
 
+@profiling.spanned
 def match_metadata_to_files(file_list, metadata_ids):
     """Create list of metadata records matched to files."""
-    metadata_matches = [
-        metadata_id
-        for f in file_list
-        for metadata_id in metadata_ids
-        if f.startswith(metadata_id)
-    ]
+    positions = {}
+    for position, metadata_id in enumerate(metadata_ids):
+        positions.setdefault(metadata_id, []).append(position)
+    id_lengths = sorted({len(metadata_id) for metadata_id in positions})
+    metadata_matches = []
+    for f in file_list:
+        matched = []
+        for length in id_lengths:
+            if length > len(f):
+                break
+            matched.extend(positions.get(f[:length], ()))
+        metadata_matches.extend(metadata_ids[p] for p in sorted(matched))
     return metadata_matches
 
 
+@profiling.spanned
+def prefix_merge_join(sorted_files, sorted_metadata):
+    """Match sorted file names to the sorted (file_identifier, row) pairs of metadata
+    records whose identifiers are prefixes of them, in one pass over both. Yields
+    ("file", name, entries) for each file, where entries are the [identifier, rows,
+    matched] lists of the identifiers the name starts with, valid until the next
+    value is taken, and ("metadata", entry) for each distinct identifier once no
+    later file can start with it. The entries held at any time are a chain of
+    prefixes, so memory use depends on the length of the names, not their number."""
+    stack = []
+    merged = heapq.merge(
+        ((identifier, 0, row) for identifier, row in sorted_metadata),
+        ((name, 1) for name in sorted_files),
+    )
+    for value, kind, *row in merged:
+        while stack and not value.startswith(stack[-1][0]):
+            yield "metadata", stack.pop()
+        if kind == 1:
+            for entry in stack:
+                entry[2] = True
+            yield "file", value, stack
+        elif stack and stack[-1][0] == value:
+            stack[-1][1].append(row[0])
+        else:
+            stack.append([value, row, False])
+    while stack:
+        yield "metadata", stack.pop()
+
+
+@profiling.spanned
+def reconcile_sorted(
+    metadata_csv,
+    output_directory,
+    content_directory,
+    file_type,
+    memory_budget,
+    temp_directory=None,
+):
+    """Write the same reports as the reconcile command without holding the file
+    list or the metadata identifiers in memory. Both sides are sorted into temporary
+    run files within a memory budget, matched by a merge join and written out as
+    they are matched, so the reports other than the updated CSV are in sorted
+    order."""
+    from dsaps.sorting import ExternalSorter
+
+    budget = memory_budget / 3
+    with ExternalSorter(budget, temp_directory) as files, ExternalSorter(
+        budget, temp_directory
+    ) as metadata, ExternalSorter(budget, temp_directory) as matched_rows:
+        files.extend(
+            os.path.basename(file)
+            for file in glob.iglob(
+                f"{content_directory}/**/*.{file_type}", recursive=True
+            )
+        )
+        with open(metadata_csv) as csvfile:
+            metadata.extend(
+                (row["file_identifier"], position)
+                for position, row in enumerate(csv.DictReader(csvfile))
+                if row["file_identifier"] != ""
+            )
+        with open(f"{output_directory}no_metadata.csv", "w") as no_metadata, open(
+            f"{output_directory}no_files.csv", "w"
+        ) as no_files, open(
+            f"{output_directory}metadata_matches.csv", "w"
+        ) as metadata_matches:
+            no_metadata = csv.writer(no_metadata)
+            no_files = csv.writer(no_files)
+            metadata_matches = csv.writer(metadata_matches)
+            for writer in (no_metadata, no_files, metadata_matches):
+                writer.writerow(["id"])
+            last_unmatched = None
+            for event in prefix_merge_join(files, metadata):
+                if event[0] == "file":
+                    name, entries = event[1:]
+                    if entries:
+                        matches = sorted(
+                            (row, identifier)
+                            for identifier, rows, _ in entries
+                            for row in rows
+                        )
+                        metadata_matches.writerows([m[1]] for m in matches)
+                    elif name != last_unmatched:
+                        no_metadata.writerow([name])
+                        last_unmatched = name
+                else:
+                    identifier, rows, matched = event[1]
+                    if matched:
+                        matched_rows.extend(rows)
+                    else:
+                        no_files.writerow([identifier])
+        positions = iter(matched_rows)
+        next_position = next(positions, None)
+        with open(metadata_csv) as csvfile:
+            reader = csv.DictReader(csvfile)
+            upd_md_file_name = f"updated-{os.path.basename(metadata_csv)}"
+            with open(f"{output_directory}{upd_md_file_name}", "w") as updated_csv:
+                writer = csv.DictWriter(updated_csv, fieldnames=reader.fieldnames)
+                writer.writeheader()
+                for position, row in enumerate(reader):
+                    if position == next_position:
+                        writer.writerow(row)
+                        next_position = next(positions, None)
+
+
+def write_records(records, output_file, output_format, fieldnames):
+    """Write records to an open file as they arrive, either as JSON lines or as CSV
+    rows with the given columns, and return the number of records written. Nested
+    values are written to CSV cells as JSON."""
+    count = 0
+    if output_format == "csv":
+        writer = csv.DictWriter(output_file, fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(
+                {
+                    key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                    for key, value in record.items()
+                }
+            )
+            count += 1
+    else:
+        for record in records:
+            output_file.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+@profiling.spanned
 def update_metadata_csv(metadata_csv, output_directory, metadata_matches):
     """Create an updated CSV of only metadata records that have matching files."""
+    metadata_matches = set(metadata_matches)
     with open(metadata_csv) as csvfile:
         reader = csv.DictReader(csvfile)
         upd_md_file_name = f"updated-{os.path.basename(metadata_csv)}"
@@ -0,0 +1,130 @@
+import sqlite3
+import threading
+
+import structlog
+
+logger = structlog.get_logger()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    source_system_identifier TEXT PRIMARY KEY NOT NULL,
+    collection_uuid TEXT,
+    uuid TEXT NOT NULL,
+    handle TEXT,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS bitstreams (
+    source_system_identifier TEXT NOT NULL,
+    name TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    PRIMARY KEY (source_system_identifier, name)
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    md5 TEXT NOT NULL
+);
+"""
+
+
+class Journal:
+    """SQLite record of the items and bitstreams posted by additems, written as each
+    one is posted so that an interrupted run can be resumed without duplicating
+    work, and of the checksums of local files. Safe to share between worker
+    threads."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        logger.info(f"Journal opened: {path}")
+
+    def item_count(self):
+        """Return the number of items recorded as posted."""
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def collection_uuid(self):
+        """Return the uuid of the collection items were posted to, or None if no
+        item has been posted."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT collection_uuid FROM items LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        """Close the journal's database connection."""
+        with self.lock:
+            self.connection.close()
+
+    def get_item(self, source_system_identifier):
+        """Return the uuid, handle and completed flag recorded for an item, or None
+        if it has not been posted."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT uuid, handle, completed FROM items "
+                "WHERE source_system_identifier = ?",
+                (source_system_identifier,),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], bool(row[2])
+
+    def get_bitstreams(self, source_system_identifier):
+        """Return a dict of the names and uuids of an item's posted bitstreams."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT name, uuid FROM bitstreams WHERE source_system_identifier = ?",
+                (source_system_identifier,),
+            ).fetchall()
+        return dict(rows)
+
+    def record_item(self, source_system_identifier, collection_uuid, uuid, handle):
+        """Record that an item has been posted."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, 0)",
+                (source_system_identifier, collection_uuid, uuid, handle),
+            )
+
+    def record_bitstream(self, source_system_identifier, name, uuid):
+        """Record that one of an item's bitstreams has been posted."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO bitstreams VALUES (?, ?, ?)",
+                (source_system_identifier, name, uuid),
+            )
+
+    def complete_item(self, source_system_identifier):
+        """Record that an item and all of its bitstreams have been posted."""
+        with self.lock:
+            self.connection.execute(
+                "UPDATE items SET completed = 1 WHERE source_system_identifier = ?",
+                (source_system_identifier,),
+            )
+
+    def get_file_hash(self, path, size, mtime_ns):
+        """Return the MD5 checksum recorded for a file if its size and modification
+        time have not changed since, otherwise None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT md5 FROM file_hashes WHERE path = ? AND size = ? "
+                "AND mtime_ns = ?",
+                (path, size, mtime_ns),
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_file_hash(self, path, size, mtime_ns, md5):
+        """Record the MD5 checksum of a file at its current size and modification
+        time."""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                (path, size, mtime_ns, md5),
+            )
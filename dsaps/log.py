@@ -0,0 +1,81 @@
+import itertools
+import logging
+import logging.handlers
+import queue
+import threading
+
+import structlog
+
+
+class EventSampler:
+    """structlog processor that keeps one in every N occurrences of each event named
+    in its sample rates and drops the others. Kept events record the rate they were
+    sampled at, so counts can be scaled back up."""
+
+    def __init__(self, rates=None):
+        self.rates = dict(rates or {})
+        self.counters = {event: itertools.count() for event in self.rates}
+        self.lock = threading.Lock()
+
+    def __call__(self, logger, method_name, event_dict):
+        rate = self.rates.get(event_dict.get("event"))
+        if rate is None or rate <= 1:
+            return event_dict
+        with self.lock:
+            count = next(self.counters[event_dict["event"]])
+        if count % rate:
+            raise structlog.DropEvent
+        event_dict["sampled"] = rate
+        return event_dict
+
+
+def configure_logging(
+    path, level="INFO", asynchronous=True, sample_rates=None, handler=None
+):
+    """Log JSON events to a file, or to another handler if one is given, either
+    directly or, if asynchronous, through a queue emptied by a background thread so
+    that writing never blocks the caller. Returns a function that flushes the queue
+    and closes the file."""
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            EventSampler(sample_rates),
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.JSONRenderer(),
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+    )
+    file_handler = handler or logging.FileHandler(path, "w")
+    file_handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = None
+    if asynchronous:
+        listener = logging.handlers.QueueListener(queue.SimpleQueue(), file_handler)
+        queue_handler = logging.handlers.QueueHandler(listener.queue)
+        listener.start()
+    else:
+        queue_handler = file_handler
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    def stop():
+        root.removeHandler(queue_handler)
+        if listener:
+            listener.stop()
+        file_handler.close()
+
+    return stop
+
+
+def parse_sample_rates(values):
+    """Parse EVENT=N options into a dict of event names and sample rates."""
+    rates = {}
+    for value in values:
+        event, _, rate = value.rpartition("=")
+        if not event or not rate.isdigit() or int(rate) < 1:
+            raise ValueError(f"{value} is not of the form EVENT=N")
+        rates[event] = int(rate)
+    return rates
@@ -0,0 +1,169 @@
+import json
+import math
+import random
+import threading
+import time
+
+import structlog
+
+logger = structlog.get_logger()
+
+PERCENTILES = (50, 90, 99)
+
+
+class EndpointStats:
+    """Counts, byte totals and a bounded reservoir sample of the latencies of the API
+    calls to one type of endpoint."""
+
+    def __init__(self, reservoir_size):
+        self.reservoir_size = reservoir_size
+        self.count = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latencies = []
+
+    def add(self, latency, bytes_sent, bytes_received, failed):
+        self.count += 1
+        self.errors += failed
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+        if len(self.latencies) < self.reservoir_size:
+            self.latencies.append(latency)
+        else:
+            i = random.randrange(self.count)  # nosec
+            if i < self.reservoir_size:
+                self.latencies[i] = latency
+
+    def percentile(self, p):
+        """Return the nearest-rank percentile of the sampled latencies."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+
+class RequestMetrics:
+    """Timing and byte counts of a run's API calls, tagged by endpoint type, with a
+    summary of latency percentiles and throughput that can be logged or written to
+    a JSON or Prometheus textfile."""
+
+    def __init__(self, reservoir_size=10000):
+        self.reservoir_size = reservoir_size
+        self.endpoints = {}
+        self.start_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, latency, bytes_sent=0, bytes_received=0, failed=False):
+        """Record an API call to a type of endpoint."""
+        with self.lock:
+            if endpoint not in self.endpoints:
+                self.endpoints[endpoint] = EndpointStats(self.reservoir_size)
+            self.endpoints[endpoint].add(latency, bytes_sent, bytes_received, failed)
+
+    def summary(self):
+        """Return the latency percentiles and byte totals of each endpoint type and
+        the run's overall throughput."""
+        with self.lock:
+            elapsed = max(time.monotonic() - self.start_time, 1e-9)
+            endpoints = {}
+            for endpoint, stats in sorted(self.endpoints.items()):
+                endpoints[endpoint] = {
+                    "requests": stats.count,
+                    "errors": stats.errors,
+                    "total_seconds": stats.total_latency,
+                    "mean_seconds": stats.total_latency / stats.count,
+                    **{f"p{p}_seconds": stats.percentile(p) for p in PERCENTILES},
+                    "max_seconds": stats.max_latency,
+                    "bytes_sent": stats.bytes_sent,
+                    "bytes_received": stats.bytes_received,
+                }
+        item_posts = endpoints.get("item_post", {})
+        items = item_posts.get("requests", 0) - item_posts.get("errors", 0)
+        total_bytes = sum(
+            e["bytes_sent"] + e["bytes_received"] for e in endpoints.values()
+        )
+        return {
+            "elapsed_seconds": elapsed,
+            "requests": sum(e["requests"] for e in endpoints.values()),
+            "items_per_second": items / elapsed,
+            "megabytes_per_second": total_bytes / 1e6 / elapsed,
+            "endpoints": endpoints,
+        }
+
+    def log_summary(self):
+        """Log the summary of the run's API calls."""
+        summary = self.summary()
+        for endpoint, stats in summary["endpoints"].items():
+            logger.info(
+                f"{endpoint}: {stats['requests']} requests, {stats['errors']} errors, "
+                f"p50 {stats['p50_seconds']:.3f}s, p90 {stats['p90_seconds']:.3f}s, "
+                f"p99 {stats['p99_seconds']:.3f}s, max {stats['max_seconds']:.3f}s, "
+                f"{stats['bytes_sent']} bytes sent, "
+                f"{stats['bytes_received']} bytes received"
+            )
+        logger.info(
+            f"Throughput: {summary['items_per_second']:.2f} items/s, "
+            f"{summary['megabytes_per_second']:.2f} MB/s"
+        )
+        return summary
+
+    def write(self, path, output_format="json"):
+        """Write the summary to a JSON file or a Prometheus textfile."""
+        summary = self.summary()
+        with open(path, "w") as output_file:
+            if output_format == "prometheus":
+                output_file.write(self._prometheus(summary))
+            else:
+                json.dump(summary, output_file, indent=2)
+
+    @staticmethod
+    def _prometheus(summary):
+        lines = [
+            "# HELP dsaps_request_duration_seconds Latency of DSpace API calls.",
+            "# TYPE dsaps_request_duration_seconds summary",
+        ]
+        for endpoint, stats in summary["endpoints"].items():
+            label = f'endpoint="{endpoint}"'
+            for p in PERCENTILES:
+                lines.append(
+                    f'dsaps_request_duration_seconds{{{label},quantile="{p / 100}"}} '
+                    f"{stats[f'p{p}_seconds']}"
+                )
+            lines.append(
+                f"dsaps_request_duration_seconds_sum{{{label}}} "
+                f"{stats['total_seconds']}"
+            )
+            lines.append(
+                f"dsaps_request_duration_seconds_count{{{label}}} {stats['requests']}"
+            )
+        for name, key, help_text in [
+            ("dsaps_request_errors_total", "errors", "Failed DSpace API calls."),
+            ("dsaps_request_sent_bytes_total", "bytes_sent", "Bytes sent to DSpace."),
+            (
+                "dsaps_request_received_bytes_total",
+                "bytes_received",
+                "Bytes received from DSpace.",
+            ),
+        ]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, stats in summary["endpoints"].items():
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {stats[key]}')
+        for name, key, help_text in [
+            ("dsaps_items_per_second", "items_per_second", "Items posted per second."),
+            (
+                "dsaps_megabytes_per_second",
+                "megabytes_per_second",
+                "Megabytes sent and received per second.",
+            ),
+        ]:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {summary[key]}")
+        return "\n".join(lines) + "\n"
@@ -1,11 +1,29 @@
-import glob
+import bisect
+import hashlib
 import operator
 import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
 from functools import partial
+from urllib.parse import urlparse
 
 import attr
 import requests
 import structlog
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from dsaps import helpers, profiling
+from dsaps.metrics import RequestMetrics
+from dsaps.scheduler import (
+    RequestScheduler,
+    TokenBucket,
+    UploadScheduler,
+    backoff_delay,
+)
 
 Field = partial(attr.ib, default=None)
 Group = partial(attr.ib, default=[])
@@ -13,70 +31,369 @@ Group = partial(attr.ib, default=[])
 logger = structlog.get_logger()
 op = operator.attrgetter("name")
 
+CHUNK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 256 * 1024 * 1024
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 class Client:
-    def __init__(self, url):
+    def __init__(
+        self,
+        url,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        keep_alive=True,
+        cache=None,
+        scheduler=None,
+        retries=5,
+        backoff=0.5,
+        timeout=300,
+        metrics=None,
+    ):
         header = {"content-type": "application/json", "accept": "application/json"}
         self.url = url.rstrip("/")
         self.cookies = None
         self.header = header
+        self.cache = cache
+        self.scheduler = scheduler or RequestScheduler()
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.metrics = metrics or RequestMetrics()
+        self.email = None
+        self.password = None
+        self.auth_lock = threading.Lock()
+        self.upload_limiter = None
+        self.worker_upload_rate = None
+        self.upload_local = threading.local()
+        self.upload_lock = threading.Lock()
+        self.upload_start = None
+        self.uploaded_bytes = 0
+        self.session = self._create_session(
+            pool_connections, pool_maxsize, pool_block, keep_alive
+        )
         logger.info("Initializing client")
 
+    @staticmethod
+    def _create_session(pool_connections, pool_maxsize, pool_block, keep_alive):
+        """Create a session whose connection pool is shared by all API calls.
+
+        pool_connections is the number of per-host pools to cache, pool_maxsize the
+        number of connections kept open to each host and pool_block whether a call
+        waits for a free connection once a host's pool is exhausted.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self):
+        """Close the client's pooled connections."""
+        self.session.close()
+
+    def _request(
+        self,
+        method,
+        url,
+        endpoint="other",
+        idempotent=None,
+        track_latency=True,
+        **kwargs,
+    ):
+        """Send a request through the client's scheduler and return the response,
+        raising an HTTPError for an error status. If the response shows that the
+        session has expired, the client logs in again and the request is replayed
+        once with the new session cookie."""
+        response = self._send(
+            method, url, endpoint, idempotent, track_latency, **kwargs
+        )
+        if (
+            endpoint != "login"
+            and self.email is not None
+            and self._session_expired(response)
+        ):
+            logger.warning("Session expired", method=method, url=url)
+            self._reauthenticate(kwargs.get("cookies"))
+            if "cookies" in kwargs:
+                kwargs["cookies"] = self.cookies
+            response = self._send(
+                method, url, endpoint, idempotent, track_latency, **kwargs
+            )
+            if self._session_expired(response):
+                raise requests.HTTPError(
+                    f"Session still expired after logging in again for url: {url}",
+                    response=response,
+                )
+        response.raise_for_status()
+        return response
+
+    @profiling.spanned
+    def _send(self, method, url, endpoint, idempotent, track_latency, **kwargs):
+        """Send a request through the client's scheduler and return the response.
+        Each attempt is recorded in the client's metrics under the endpoint type.
+        Idempotent requests that fail with a connection error, a timeout or a
+        retryable status are retried with jittered exponential backoff, other
+        requests only if they could not connect."""
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        for attempt in range(self.retries + 1):
+            retry_after = 0
+            with self.scheduler.slot():
+                start = time.monotonic()
+                try:
+                    response = self.session.request(
+                        method, url, timeout=self.timeout, **kwargs
+                    )
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self.scheduler.record(None, failed=True)
+                    self.metrics.record(endpoint, time.monotonic() - start, failed=True)
+                    retryable = idempotent or self._could_not_connect(e)
+                    if not retryable or attempt == self.retries:
+                        raise
+                    error = repr(e)
+                else:
+                    latency = time.monotonic() - start
+                    failed = response.status_code in RETRY_STATUSES
+                    self.scheduler.record(latency if track_latency else None, failed)
+                    self.metrics.record(
+                        endpoint,
+                        latency,
+                        int(response.request.headers.get("Content-Length", 0)),
+                        len(response.content),
+                        failed=not response.ok,
+                    )
+                    if not failed or not idempotent or attempt == self.retries:
+                        return response
+                    error = f"{response.status_code} {response.reason}"
+                    retry_after = response.headers.get("Retry-After", "0")
+                    retry_after = float(retry_after) if retry_after.isdigit() else 0
+            delay = max(retry_after, backoff_delay(attempt, self.backoff))
+            logger.warning(
+                "Request retrying",
+                method=method,
+                url=url,
+                error=error,
+                delay=round(delay, 1),
+            )
+            time.sleep(delay)
+
+    @staticmethod
+    def _could_not_connect(error):
+        """Return whether a connection error or timeout was raised before a
+        connection was made, so that the request was never sent."""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        reason = error.args[0] if error.args else None
+        reason = getattr(reason, "reason", reason)
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+    @staticmethod
+    def _session_expired(response):
+        """Return whether a response rejected the session cookie or redirected to
+        the login page."""
+        return response.status_code in (401, 403) or bool(
+            response.history and "login" in urlparse(response.url).path
+        )
+
+    def _reauthenticate(self, expired_cookies):
+        """Log in again unless another worker already has since the expired session
+        cookie was sent, so that concurrent failures share a single login."""
+        with self.auth_lock:
+            if self.cookies is expired_cookies:
+                self.authenticate(self.email, self.password)
+
     def authenticate(self, email, password):
-        """Authenticate user to DSpace API."""
+        """Authenticate user to DSpace API. The credentials are kept so that the
+        client can log in again when its session expires."""
         header = self.header
         data = {"email": email, "password": password}
-        session = requests.post(
-            f"{self.url}/login", headers=header, params=data
+        session = self._request(
+            "POST",
+            f"{self.url}/login",
+            "login",
+            idempotent=True,
+            headers=header,
+            params=data,
         ).cookies["JSESSIONID"]
         cookies = {"JSESSIONID": session}
-        status = requests.get(
-            f"{self.url}/status", headers=header, cookies=cookies
+        status = self._request(
+            "GET", f"{self.url}/status", "login", headers=header, cookies=cookies
         ).json()
         self.user_full_name = status["fullname"]
         self.cookies = cookies
+        self.email = email
+        self.password = password
         self.header = header
         logger.info(f"Authenticated to {self.url} as " f"{self.user_full_name}")
 
     def filtered_item_search(self, key, string, query_type, selected_collections=""):
         """Perform a search against the filtered items endpoint."""
-        offset = 0
-        items = ""
-        item_links = []
-        while items != []:
-            endpoint = f"{self.url}/filtered-items?"
-            params = {
-                "query_field[]": key,
-                "query_op[]": query_type,
-                "query_val[]": string,
-                "&collSel[]": selected_collections,
-                "limit": 200,
-                "offset": offset,
-            }
-            logger.info(params)
-            response = requests.get(
-                endpoint, headers=self.header, params=params, cookies=self.cookies
-            )
-            logger.info(f"Response url: {response.url}")
-            response = response.json()
-            items = response["items"]
-            for item in items:
-                item_links.append(item["link"])
-            offset = offset + 200
-        return item_links
+        return [
+            item["link"]
+            for item in self.search_items(key, string, query_type, selected_collections)
+        ]
+
+    def search_items(
+        self,
+        key,
+        string,
+        query_type,
+        selected_collections="",
+        page_size=200,
+        prefetch=0,
+    ):
+        """Yield the items found by a search against the filtered items endpoint.
+        Pages are requested prefetch at a time ahead of the page being yielded and
+        the search stops at the first page with fewer than page_size items."""
+        params = {
+            "query_field[]": key,
+            "query_op[]": query_type,
+            "query_val[]": string,
+            "limit": page_size,
+        }
+        if selected_collections:
+            params["collSel[]"] = selected_collections
+        get_page = partial(self._get_search_page, params)
+        yield from self._paginate(get_page, page_size, prefetch)
+
+    @staticmethod
+    def _paginate(get_page, page_size, prefetch):
+        """Yield the records of the pages returned by get_page for successive
+        offsets, requesting prefetch pages ahead of the page being yielded and
+        stopping at the first page with fewer than page_size records."""
+        with ThreadPoolExecutor(max(prefetch, 1)) as executor:
+            pages = deque()
+            offset = 0
+            while True:
+                while len(pages) <= prefetch:
+                    pages.append(executor.submit(get_page, offset))
+                    offset += page_size
+                records = pages.popleft().result()
+                yield from records
+                if len(records) < page_size:
+                    for page in pages:
+                        page.cancel()
+                    return
+
+    def _get_search_page(self, params, offset):
+        """Get one page of items from the filtered items endpoint."""
+        endpoint = f"{self.url}/filtered-items?"
+        params = dict(params, offset=offset)
+        logger.debug("Search page requested", offset=offset)
+        response = self._request(
+            "GET",
+            endpoint,
+            "search_page",
+            headers=self.header,
+            params=params,
+            cookies=self.cookies,
+        )
+        logger.debug("Search page received", url=response.url)
+        return response.json()["items"]
 
     def get_uuid_from_handle(self, handle):
         """Get UUID for an object based on its handle."""
+        return self.resolve_handle(handle)[0]
+
+    def resolve_handle(self, handle):
+        """Get the UUID and type of an object based on its handle."""
         hdl_endpoint = f"{self.url}/handle/{handle}"
-        rec_obj = requests.get(
-            hdl_endpoint, headers=self.header, cookies=self.cookies
-        ).json()
-        return rec_obj["uuid"]
+        rec_obj = self._get_cached_json(hdl_endpoint, "handle")
+        return rec_obj["uuid"], rec_obj.get("type")
+
+    def get_collection_uuids(self, uuid, record_type="collections", workers=4):
+        """Get the UUIDs of a collection, or of every collection in a community and
+        its subcommunities, fetching each level of subcommunities concurrently."""
+        if record_type.startswith("collection"):
+            return [uuid]
+        collection_uuids = []
+        with ThreadPoolExecutor(workers) as executor:
+            level = [uuid]
+            while level:
+                communities = executor.map(self._get_community, level)
+                level = []
+                for community in communities:
+                    collection_uuids.extend(c["uuid"] for c in community["collections"])
+                    level.extend(c["uuid"] for c in community["subcommunities"])
+        return collection_uuids
+
+    def _get_community(self, uuid):
+        """Get a community with its collections and subcommunities."""
+        response = self._request(
+            "GET",
+            f"{self.url}/communities/{uuid}",
+            "community",
+            headers=self.header,
+            params={"expand": "collections,subCommunities"},
+            cookies=self.cookies,
+        )
+        return response.json()
+
+    def export_items(
+        self, uuid, record_type="collections", page_size=100, prefetch=2, workers=4
+    ):
+        """Yield the metadata and bitstream listing of each item in a collection, or
+        in every collection of a community, as the pages of items arrive."""
+        for collection_uuid in self.get_collection_uuids(uuid, record_type, workers):
+            get_page = partial(
+                self._get_collection_items_page, collection_uuid, page_size
+            )
+            for item in self._paginate(get_page, page_size, prefetch):
+                yield export_record(item, collection_uuid)
+
+    def _get_collection_items_page(self, collection_uuid, page_size, offset):
+        """Get one page of a collection's items with their metadata and bitstreams."""
+        response = self._request(
+            "GET",
+            f"{self.url}/collections/{collection_uuid}/items",
+            "collection_items_page",
+            headers=self.header,
+            params={
+                "expand": "metadata,bitstreams",
+                "limit": page_size,
+                "offset": offset,
+            },
+            cookies=self.cookies,
+        )
+        return response.json()
+
+    @profiling.spanned
+    def get_bitstream_checksums(self, item_uuid, page_size=100):
+        """Get a dict of the MD5 checksums and uuids of an item's bitstreams."""
+        endpoint = f"{self.url}/items/{item_uuid}/bitstreams"
+        checksums = {}
+        offset = 0
+        while True:
+            response = self._request(
+                "GET",
+                endpoint,
+                "bitstream_list",
+                headers=self.header,
+                params={"limit": page_size, "offset": offset},
+                cookies=self.cookies,
+            )
+            bitstreams = response.json()
+            for bitstream in bitstreams:
+                checksum = bitstream.get("checkSum") or {}
+                if checksum.get("checkSumAlgorithm") == "MD5":
+                    checksums[checksum["value"]] = bitstream["uuid"]
+            if len(bitstreams) < page_size:
+                return checksums
+            offset += page_size
 
     def get_record(self, uuid, record_type):
         """Get an individual record of a specified type."""
         url = f"{self.url}/{record_type}/{uuid}?expand=all"
-        record = requests.get(url, headers=self.header, cookies=self.cookies).json()
+        record = self._get_cached_json(url, "record")
         if record_type == "items":
             rec_obj = self._populate_class_instance(Item, record)
         elif record_type == "communities":
@@ -88,28 +405,106 @@ class Client:
             exit()
         return rec_obj
 
+    @profiling.spanned
     def post_bitstream(self, item_uuid, bitstream):
         """Post a bitstream to a specified item and return the bitstream
         ID."""
         endpoint = f"{self.url}/items/{item_uuid}" f"/bitstreams?name={bitstream.name}"
         header_upload = {"accept": "application/json"}
-        data = open(bitstream.file_path, "rb")
-        response = requests.post(
-            endpoint, headers=header_upload, cookies=self.cookies, data=data
+        data = UploadStream(
+            bitstream.file_path,
+            bitstream.name,
+            session=self.session,
+            limiters=self._upload_limiters(),
+        )
+        response = self._request(
+            "POST",
+            endpoint,
+            "bitstream_post",
+            track_latency=False,
+            headers=header_upload,
+            cookies=self.cookies,
+            data=data if data.size is not None else UnsizedBody(data),
         ).json()
+        checksum = response.get("checkSum") or {}
+        if (
+            data.md5 is not None
+            and checksum.get("checkSumAlgorithm") == "MD5"
+            and checksum.get("value") != data.md5
+        ):
+            raise ChecksumMismatchError(
+                f"{bitstream.file_path} has MD5 {data.md5} but DSpace stored "
+                f"{checksum.get('value')} for bitstream {response['uuid']}"
+            )
+        self._log_upload(data)
         bitstream_uuid = response["uuid"]
         return bitstream_uuid
 
+    @profiling.spanned
+    def replace_bitstream(self, bitstream_uuid, bitstream):
+        """Replace the content of a bitstream with a file and return the bitstream
+        ID."""
+        data = UploadStream(
+            bitstream.file_path,
+            bitstream.name,
+            session=self.session,
+            limiters=self._upload_limiters(),
+        )
+        self._request(
+            "PUT",
+            f"{self.url}/bitstreams/{bitstream_uuid}/data",
+            "bitstream_put",
+            track_latency=False,
+            cookies=self.cookies,
+            data=data if data.size is not None else UnsizedBody(data),
+        )
+        self._log_upload(data)
+        logger.info("Bitstream replaced", uuid=bitstream_uuid, name=bitstream.name)
+        return bitstream_uuid
+
+    def set_upload_limits(self, rate=None, worker_rate=None):
+        """Cap the bytes per second sent by all uploads together and by each
+        uploading thread."""
+        self.upload_limiter = TokenBucket(rate) if rate else None
+        self.worker_upload_rate = worker_rate
+        self.upload_local = threading.local()
+
+    def _upload_limiters(self):
+        """Return the token buckets limiting an upload from the current thread."""
+        limiters = [self.upload_limiter] if self.upload_limiter else []
+        if self.worker_upload_rate:
+            if not hasattr(self.upload_local, "limiter"):
+                self.upload_local.limiter = TokenBucket(self.worker_upload_rate)
+            limiters.append(self.upload_local.limiter)
+        return limiters
+
+    def _log_upload(self, data):
+        """Log the transfer rate of an upload and of all uploads so far."""
+        if data.start_time is None:
+            return
+        with self.upload_lock:
+            if self.upload_start is None:
+                self.upload_start = data.start_time
+            self.uploaded_bytes += data.bytes_read
+            total_rate = self.uploaded_bytes / max(
+                time.monotonic() - self.upload_start, 1e-9
+            )
+        logger.info(
+            "Bitstream uploaded",
+            name=data.name,
+            bytes=data.bytes_read,
+            mb_per_second=round(data.rate / 1e6, 2),
+            overall_mb_per_second=round(total_rate / 1e6, 2),
+        )
+
     def post_coll_to_comm(self, comm_handle, coll_name):
         """Post a collection to a specified community."""
-        hdl_endpoint = f"{self.url}/handle/{comm_handle}"
-        community = requests.get(
-            hdl_endpoint, headers=self.header, cookies=self.cookies
-        ).json()
-        comm_uuid = community["uuid"]
+        comm_uuid = self.get_uuid_from_handle(comm_handle)
         uuid_endpoint = f"{self.url}/communities/{comm_uuid}/collections"
-        coll_uuid = requests.post(
+        coll_uuid = self._request(
+            "POST",
             uuid_endpoint,
+            "collection_post",
             headers=self.header,
             cookies=self.cookies,
             json={"name": coll_name},
@@ -118,19 +513,99 @@ class Client:
         logger.info(f"Collection posted: {coll_uuid}")
         return coll_uuid
 
+    @profiling.spanned
     def post_item_to_collection(self, collection_uuid, item):
         """Post item to a specified collection and return the item ID."""
         endpoint = f"{self.url}/collections/{collection_uuid}/items"
-        post_response = requests.post(
+        post_response = self._request(
+            "POST",
             endpoint,
+            "item_post",
             headers=self.header,
             cookies=self.cookies,
-            json={"metadata": attr.asdict(item)["metadata"]},
+            json={"metadata": [attr.asdict(entry) for entry in item.metadata]},
         ).json()
         item_uuid = post_response["uuid"]
         item_handle = post_response["handle"]
         return item_uuid, item_handle
 
+    def get_item_metadata(self, item_uuid):
+        """Get the metadata entries of an item."""
+        endpoint = f"{self.url}/items/{item_uuid}/metadata"
+        return self._request(
+            "GET", endpoint, "metadata_get", headers=self.header, cookies=self.cookies
+        ).json()
+
+    @profiling.spanned
+    def update_item_metadata(self, item_uuid, entries):
+        """Replace the values of an item's metadata fields with the given entries,
+        leaving its other fields unchanged."""
+        endpoint = f"{self.url}/items/{item_uuid}/metadata"
+        self._request(
+            "PUT",
+            endpoint,
+            "metadata_put",
+            headers=self.header,
+            cookies=self.cookies,
+            json=entries,
+        )
+
+    def update_items(self, items, workers=1, failures=None):
+        """Update the metadata of existing items, identified by uuid or handle, and
+        yield each item with the list of fields that changed, in the items' order.
+        Only changed fields are sent and items that need no change are not updated.
+        Items that fail to update are logged and left out of the results, and are
+        appended to the failures list, if one is given, with their errors."""
+        with ThreadPoolExecutor(workers) as executor:
+            pending = deque()
+            for item in items:
+                pending.append((item, executor.submit(self._update_item, item)))
+                if len(pending) >= workers * 2:
+                    yield from self._completed_update(*pending.popleft(), failures)
+            while pending:
+                yield from self._completed_update(*pending.popleft(), failures)
+
+    def _update_item(self, item):
+        """Update the fields of an item whose values differ from its metadata in
+        DSpace and return the list of changed fields."""
+        if item.uuid is None:
+            item.uuid = self.get_uuid_from_handle(item.handle)
+        changes = metadata_changes(item.metadata, self.get_item_metadata(item.uuid))
+        if changes:
+            self.update_item_metadata(item.uuid, changes)
+            logger.info("Item updated", uuid=item.uuid)
+        else:
+            logger.info("Item unchanged", uuid=item.uuid)
+        return item, sorted({entry["key"] for entry in changes})
+
+    @staticmethod
+    def _completed_update(item, future, failures=None):
+        """Yield the updated item and its changed fields unless updating it raised
+        an exception, in which case the item and its error are added to the
+        failures."""
+        try:
+            yield future.result()
+        except Exception as e:
+            logger.error(
+                "Item update failed", uuid=item.uuid, handle=item.handle, error=repr(e)
+            )
+            if failures is not None:
+                failures.append((item, e))
+
+    def _get_cached_json(self, url, endpoint):
+        """Get a JSON record, serving it from the client's cache if one is set and
+        it holds the record."""
+        if self.cache is not None:
+            record = self.cache.get(url)
+            if record is not None:
+                return record
+        record = self._request(
+            "GET", url, endpoint, headers=self.header, cookies=self.cookies
+        ).json()
+        if self.cache is not None:
+            self.cache.set(url, record)
+        return record
+
     def _populate_class_instance(self, class_type, rec_obj):
         """Populate class instance with data from record."""
         fields = [op(field) for field in attr.fields(class_type)]
@@ -153,7 +628,147 @@ class Client:
         return child_list
 
 
-@attr.s
+def metadata_changes(metadata, current):
+    """Return the entries of the fields whose values and languages in metadata
+    differ from the current metadata entries of an item. Empty values are ignored,
+    so an empty CSV cell leaves a field unchanged."""
+    wanted = {}
+    for entry in metadata:
+        if entry.value:
+            wanted.setdefault(entry.key, []).append(
+                (entry.value, entry.language or None)
+            )
+    existing = {}
+    for entry in current:
+        existing.setdefault(entry["key"], []).append(
+            (entry["value"], entry.get("language") or None)
+        )
+    return [
+        {"key": key, "value": value, "language": language}
+        for key, values in wanted.items()
+        if values != existing.get(key)
+        for value, language in values
+    ]
+
+
+def export_record(item, collection_uuid):
+    """Return the fields of an item record to export."""
+    return {
+        "uuid": item["uuid"],
+        "handle": item.get("handle"),
+        "name": item.get("name"),
+        "collection_uuid": collection_uuid,
+        "metadata": [
+            {
+                "key": entry["key"],
+                "value": entry["value"],
+                "language": entry.get("language"),
+            }
+            for entry in item.get("metadata") or []
+        ],
+        "bitstreams": [
+            {
+                "uuid": bitstream["uuid"],
+                "name": bitstream.get("name"),
+                "bundle": bitstream.get("bundleName"),
+                "size": bitstream.get("sizeBytes"),
+                "md5": (bitstream.get("checkSum") or {}).get("value"),
+            }
+            for bitstream in item.get("bitstreams") or []
+        ],
+    }
+
+
+class ChecksumMismatchError(Exception):
+    """Raised when DSpace reports a different checksum for an uploaded bitstream
+    than the one computed while uploading it."""
+
+
+class UploadStream:
+    """Request body that streams a file, or a remote file at an HTTP(S) URL, in
+    fixed-size chunks, computing its MD5 checksum and logging progress in the same
+    pass. The source is opened when the body is iterated and closed as soon as it
+    has been read, so only one chunk is held in memory, and the body can be
+    iterated again if the request has to be replayed. The size of a remote file is
+    not known in advance and is None. Each chunk is taken from the given token
+    buckets before it is sent, to cap the upload's rate."""
+
+    def __init__(
+        self,
+        file_path,
+        name=None,
+        chunk_size=CHUNK_SIZE,
+        session=None,
+        timeout=300,
+        limiters=(),
+    ):
+        self.file_path = file_path
+        self.name = name or os.path.basename(file_path)
+        self.chunk_size = chunk_size
+        self.remote = helpers.is_url(file_path)
+        self.session = session or (requests.Session() if self.remote else None)
+        self.timeout = timeout
+        self.limiters = limiters
+        self.size = None if self.remote else os.path.getsize(file_path)
+        self.bytes_read = 0
+        self.md5 = None
+        self.start_time = None
+        self.rate = 0.0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        md5 = hashlib.md5()  # nosec
+        self.bytes_read = 0
+        self.md5 = None
+        self.start_time = time.monotonic()
+        next_progress = PROGRESS_INTERVAL
+        for chunk in self._chunks():
+            for limiter in self.limiters:
+                limiter.consume(len(chunk))
+            md5.update(chunk)
+            self.bytes_read += len(chunk)
+            if self.bytes_read >= next_progress:
+                next_progress += PROGRESS_INTERVAL
+                logger.info(
+                    "Bitstream uploading",
+                    name=self.name,
+                    bytes=self.bytes_read,
+                    size=self.size,
+                    mb_per_second=round(self._rate() / 1e6, 2),
+                )
+            yield chunk
+        self.md5 = md5.hexdigest()
+        self.rate = self._rate()
+
+    def _chunks(self):
+        if self.remote:
+            with self.session.get(
+                self.file_path, stream=True, timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                yield from response.iter_content(self.chunk_size)
+        else:
+            with open(self.file_path, "rb") as f:
+                yield from iter(partial(f.read, self.chunk_size), b"")
+
+    def _rate(self):
+        return self.bytes_read / max(time.monotonic() - self.start_time, 1e-9)
+
+
+class UnsizedBody:
+    """Request body wrapping an upload of unknown size, which requests sends with
+    chunked transfer encoding."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def __iter__(self):
+        return iter(self.stream)
+
+
+@attr.s(slots=True)
 class BaseRecord:
     uuid = Field()
     name = Field()
@@ -162,37 +777,202 @@ class BaseRecord:
     objtype = Field()
 
 
-@attr.s
+@attr.s(slots=True)
 class Collection(BaseRecord):
     items = Group()
 
-    def post_items(self, client):
-        """Post items to collection."""
+    def post_items(
+        self,
+        client,
+        workers=1,
+        journal=None,
+        hasher=None,
+        lookahead=None,
+        failures=None,
+    ):
+        """Post items to collection. If a journal is given, each posted item and
+        bitstream is recorded in it and work it already records is skipped. If a
+        hasher is also given, the bitstreams of items the journal records are
+        compared by checksum with those in DSpace instead, and only new or changed
+        files are uploaded. When posting concurrently, lookahead items, by default
+        twice the number of workers, are posted ahead of the item being yielded and
+        their waiting bitstreams are uploaded largest first. Items without a
+        source_system_identifier, which the journal is keyed on, are logged and
+        skipped when journaling rather than posted again on every resume. Items
+        that fail to post concurrently are appended to the failures list, if one is
+        given, with their errors, keeping the uuid and handle of an item that was
+        posted without all of its bitstreams."""
+        if workers > 1:
+            yield from self._post_items_concurrently(
+                client, workers, journal, hasher, lookahead, failures
+            )
+            return
+        for item in self._journaled_items(journal):
+            yield self._post_item(client, item, journal=journal, hasher=hasher)
+
+    def _journaled_items(self, journal):
+        """Yield the collection's items, leaving out those a journal cannot record."""
         for item in self.items:
-            item_uuid, item_handle = client.post_item_to_collection(self.uuid, item)
-            item.uuid = item_uuid
-            item.handle = item_handle
-            logger.info(f"Item posted: {item_uuid}")
-            for bitstream in item.bitstreams:
-                bitstream_uuid = client.post_bitstream(item_uuid, bitstream)
-                bitstream.uuid = bitstream_uuid
-                logger.info(f"Bitstream posted: {bitstream_uuid}")
+            if journal and not item.source_system_identifier:
+                logger.error(
+                    "Item skipped",
+                    reason="no source_system_identifier to journal",
+                    file_identifier=item.file_identifier,
+                )
+                continue
             yield item
 
+    def _post_items_concurrently(
+        self, client, workers, journal=None, hasher=None, lookahead=None, failures=None
+    ):
+        """Post items with a bounded pool of workers and their bitstreams with a pool
+        of upload workers taking the largest waiting bitstream first, and yield the
+        posted items in their original order. Items that fail to post are logged
+        and left out of the results instead of stopping the batch. The item pool
+        is shut down first, so items still posting when the generator is closed
+        can finish their uploads."""
+        lookahead = lookahead or workers * 2
+        with UploadScheduler(workers) as bitstream_pool, ThreadPoolExecutor(
+            workers
+        ) as item_pool:
+            pending = deque()
+            for item in self._journaled_items(journal):
+                future = item_pool.submit(
+                    self._post_item, client, item, bitstream_pool, journal, hasher
+                )
+                pending.append((item, future))
+                if len(pending) >= lookahead:
+                    yield from self._completed_item(*pending.popleft(), failures)
+            while pending:
+                yield from self._completed_item(*pending.popleft(), failures)
+
+    @profiling.spanned
+    def _post_item(self, client, item, bitstream_pool=None, journal=None, hasher=None):
+        """Post an item and upload its bitstreams, in parallel if given a pool."""
+        identifier = item.source_system_identifier
+        posted = journal.get_item(identifier) if journal else None
+        if posted:
+            item.uuid, item.handle, completed = posted
+            logger.info("Item already posted", uuid=item.uuid)
+        else:
+            completed = False
+            item.uuid, item.handle = client.post_item_to_collection(self.uuid, item)
+            if journal:
+                journal.record_item(identifier, self.uuid, item.uuid, item.handle)
+            logger.info("Item posted", uuid=item.uuid)
+        posted_bitstreams = journal.get_bitstreams(identifier) if journal else {}
+        replacements = {}
+        if posted and hasher:
+            replacements = self._match_unchanged_bitstreams(
+                client, item, hasher, posted_bitstreams
+            )
+        else:
+            for bitstream in item.bitstreams:
+                bitstream.uuid = posted_bitstreams.get(bitstream.name)
+        pending = [b for b in item.bitstreams if b.uuid is None]
+        upload = partial(self._upload_bitstream, client, item.uuid, replacements)
+        if bitstream_pool:
+            bitstream_uuids = bitstream_pool.map(upload, pending)
+        else:
+            bitstream_uuids = map(upload, pending)
+        for bitstream, bitstream_uuid in zip(pending, bitstream_uuids):
+            bitstream.uuid = bitstream_uuid
+            if journal:
+                journal.record_bitstream(identifier, bitstream.name, bitstream.uuid)
+            logger.info("Bitstream posted", uuid=bitstream.uuid, name=bitstream.name)
+        if journal and not completed:
+            journal.complete_item(identifier)
+        return item
+
+    @staticmethod
+    def _match_unchanged_bitstreams(client, item, hasher, posted_bitstreams):
+        """Set the uuid of each of an item's bitstreams whose content DSpace already
+        has, leaving only new or changed files to upload. Return the uuids, by
+        name, of the bitstreams the journal records for changed files that are
+        still in DSpace, whose content is to be replaced rather than posted
+        again."""
+        existing = client.get_bitstream_checksums(item.uuid)
+        existing_uuids = set(existing.values())
+        checksums = hasher.md5([b.file_path for b in item.bitstreams])
+        replacements = {}
+        for bitstream in item.bitstreams:
+            bitstream.uuid = existing.get(checksums[bitstream.file_path])
+            if bitstream.uuid:
+                logger.info(
+                    "Bitstream unchanged", uuid=bitstream.uuid, name=bitstream.name
+                )
+            elif posted_bitstreams.get(bitstream.name) in existing_uuids:
+                replacements[bitstream.name] = posted_bitstreams[bitstream.name]
+        return replacements
+
+    @staticmethod
+    def _upload_bitstream(client, item_uuid, replacements, bitstream):
+        """Replace the content of a changed bitstream that is already in DSpace, or
+        post a new one, and return its uuid."""
+        if bitstream.name in replacements:
+            return client.replace_bitstream(replacements[bitstream.name], bitstream)
+        return client.post_bitstream(item_uuid, bitstream)
+
+    @staticmethod
+    def _completed_item(item, future, failures=None):
+        """Yield the posted item unless posting it raised an exception, in which
+        case the item and its error are added to the failures."""
+        try:
+            yield future.result()
+        except Exception as e:
+            logger.error(
+                "Item post failed",
+                source_system_identifier=item.source_system_identifier,
+                uuid=item.uuid,
+                handle=item.handle,
+                error=repr(e),
+            )
+            if failures is not None:
+                failures.append((item, e))
+
     @classmethod
     def create_metadata_for_items_from_csv(cls, csv_reader, field_map):
         """Create metadata for the collection's items based on a CSV and a JSON mapping
         field map."""
-        items = [Item.metadata_from_csv_row(row, field_map) for row in csv_reader]
+        return cls(items=list(map(Item.compile_field_map(field_map), csv_reader)))
+
+    @classmethod
+    def stream_items_from_csv(
+        cls, csv_reader, field_map, content_directory, file_type="*", queue_size=100
+    ):
+        """Create a collection whose items are lazily created from a CSV and a JSON
+        mapping field map and matched to their bitstreams in a content directory.
+        Parsing and bitstream resolution run as background stages joined by queues
+        of queue_size items, so they overlap with posting and memory stays bounded
+        however long the CSV is."""
+        items = helpers.buffered(
+            profiling.iterate(
+                "dsaps.models.Collection.csv_rows",
+                map(Item.compile_field_map(field_map), csv_reader),
+            ),
+            queue_size,
+        )
+        items = helpers.buffered(
+            cls._resolve_bitstreams(items, content_directory, file_type), queue_size
+        )
         return cls(items=items)
 
+    @staticmethod
+    def _resolve_bitstreams(items, content_directory, file_type):
+        """Add their bitstreams to items as they arrive, indexing the content
+        directory while the first items are parsed."""
+        index = ContentIndex.from_location(content_directory)
+        for item in items:
+            item.bitstreams_from_index(index, file_type)
+            yield item
 
-@attr.s
+
+@attr.s(slots=True)
 class Community(BaseRecord):
     collections = Field()
 
 
-@attr.s
+@attr.s(slots=True)
 class Item(BaseRecord):
     metadata = Group()
     bitstreams = Group()
@@ -200,53 +980,122 @@ class Item(BaseRecord):
     source_system_identifier = Field()
 
     def bitstreams_in_directory(self, directory, file_type="*"):
-        """Create a list of bitstreams from the specified directory and sort the list."""
-        files = glob.iglob(
-            f"{directory}/**/{self.file_identifier}*.{file_type}", recursive=True
-        )
+        """Create a sorted list of bitstreams from the specified directory or from
+        the manifest or index page at a content URL."""
+        self.bitstreams_from_index(ContentIndex.from_location(directory), file_type)
+
+    @profiling.spanned
+    def bitstreams_from_index(self, index, file_type="*"):
+        """Create a sorted list of bitstreams from a content index."""
         self.bitstreams = [
-            Bitstream(name=os.path.basename(f), file_path=f) for f in files
+            Bitstream(
+                name=name,
+                file_path=path,
+                size=None if helpers.is_url(path) else os.path.getsize(path),
+            )
+            for name, path in index.find(self.file_identifier, file_type)
         ]
-        self.bitstreams.sort(key=lambda x: x.name)
 
     @classmethod
     def metadata_from_csv_row(cls, row, field_map):
         """Create metadata for an item based on a CSV row and a JSON mapping field map."""
-        metadata = []
-        for f in field_map:
-            field = row[field_map[f]["csv_field_name"]]
-            if f == "file_identifier":
-                file_identifier = field
-                continue  # file_identifier is not included in DSpace metadata
-            if f == "source_system_identifier":
-                source_system_identifier = field
-                continue  # source_system_identifier is not included in DSpace
-                # metadata
-            delimiter = field_map[f]["delimiter"]
-            language = field_map[f]["language"]
-            if delimiter:
-                metadata.extend(
-                    [
-                        MetadataEntry(key=f, value=v, language=language)
-                        for v in field.split(delimiter)
-                    ]
-                )
-            else:
-                metadata.append(MetadataEntry(key=f, value=field, language=language))
-        return cls(
-            metadata=metadata,
-            file_identifier=file_identifier,
-            source_system_identifier=source_system_identifier,
+        return cls.compile_field_map(field_map)(row)
+
+    @classmethod
+    def compile_field_map(cls, field_map):
+        """Return a function creating an item from a CSV row, with the field map's
+        CSV columns, delimiters and languages looked up once rather than per row."""
+        file_identifier_column = field_map.get("file_identifier", {}).get(
+            "csv_field_name"
         )
+        source_system_identifier_column = field_map.get(
+            "source_system_identifier", {}
+        ).get("csv_field_name")
+        # file_identifier and source_system_identifier are not included in DSpace
+        # metadata
+        fields = [
+            (key, mapping["csv_field_name"], mapping["delimiter"], mapping["language"])
+            for key, mapping in field_map.items()
+            if key not in ("file_identifier", "source_system_identifier")
+        ]
+
+        def transform(row):
+            metadata = []
+            for key, column, delimiter, language in fields:
+                value = row[column]
+                if delimiter:
+                    metadata.extend(
+                        MetadataEntry(key, v, language) for v in value.split(delimiter)
+                    )
+                else:
+                    metadata.append(MetadataEntry(key, value, language))
+            return cls(
+                metadata=metadata,
+                file_identifier=(
+                    row[file_identifier_column] if file_identifier_column else None
+                ),
+                source_system_identifier=(
+                    row[source_system_identifier_column]
+                    if source_system_identifier_column
+                    else None
+                ),
+            )
+
+        return transform
 
 
 @attr.s
+class ContentIndex:
+    """Sorted index of the files in a content directory, used to look up the files
+    whose names start with a file identifier without rescanning the directory."""
+
+    names = Group()
+    paths = Group()
+
+    @classmethod
+    def from_directory(cls, directory, workers=None):
+        """Index every file in a directory tree with a single parallel walk."""
+        files = sorted(helpers.scan_directory(directory, workers))
+        return cls(names=[f[0] for f in files], paths=[f[1] for f in files])
+
+    @classmethod
+    def from_url(cls, url, session=None):
+        """Index every file listed by a manifest or index page at a URL."""
+        files = sorted(helpers.scan_url(url, session))
+        return cls(names=[f[0] for f in files], paths=[f[1] for f in files])
+
+    @classmethod
+    @profiling.spanned
+    def from_location(cls, location, session=None):
+        """Index a local content directory or a remote content URL."""
+        if helpers.is_url(location):
+            return cls.from_url(location, session)
+        return cls.from_directory(location)
+
+    def find(self, file_identifier, file_type="*"):
+        """Return the sorted (name, path) tuples of the files matching
+        {file_identifier}*.{file_type}."""
+        matches = []
+        suffix_pattern = f"*.{file_type}"
+        start = bisect.bisect_left(self.names, file_identifier)
+        for i in range(start, len(self.names)):
+            name = self.names[i]
+            if not name.startswith(file_identifier):
+                break
+            if fnmatchcase(name[len(file_identifier) :], suffix_pattern):
+                matches.append((name, self.paths[i]))
+        return matches
+
+
+@attr.s(slots=True)
 class Bitstream:
     name = Field()
     file_path = Field()
+    uuid = Field()
+    size = Field()
 
 
-@attr.s
+@attr.s(slots=True)
 class MetadataEntry:
     key = Field()
     value = Field()
@@ -0,0 +1,279 @@
+import csv
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import structlog
+
+from dsaps import helpers, profiling
+from dsaps.models import Bitstream, ContentIndex, Item, MetadataEntry
+
+logger = structlog.get_logger()
+
+PLAN_FORMAT = "dsaps-plan"
+PLAN_VERSION = 1
+MAPPING_KEYS = ("csv_field_name", "delimiter", "language")
+
+
+class PlanError(Exception):
+    """Raised when an ingest plan cannot be read."""
+
+
+def check_field_map(field_map, fieldnames):
+    """Return the problems of a field map, on its own and against the columns of a
+    metadata CSV."""
+    problems = []
+    if "file_identifier" not in field_map:
+        problems.append("The field map has no file_identifier mapping.")
+    for key, mapping in field_map.items():
+        if not isinstance(mapping, dict):
+            problems.append(f"The field map entry {key} is not a mapping.")
+            continue
+        missing = [k for k in MAPPING_KEYS if k not in mapping]
+        if missing:
+            problems.append(f"The field map entry {key} has no {', '.join(missing)}.")
+            continue
+        if mapping["csv_field_name"] not in fieldnames:
+            problems.append(
+                f"The field map entry {key} names the column "
+                f"{mapping['csv_field_name']}, which the CSV does not have."
+            )
+        if not isinstance(mapping["delimiter"], str):
+            problems.append(
+                f"The field map entry {key} has the delimiter "
+                f"{mapping['delimiter']!r}, which is not a string."
+            )
+    return problems
+
+
+def _check_item(index, file_type, item):
+    """Resolve an item's bitstreams from the future of a content index and return
+    the item with the problems found. Local files are opened to check that they
+    are readable."""
+    problems = []
+    bitstreams = []
+    for name, path in index.result().find(item.file_identifier, file_type):
+        size = None
+        if not helpers.is_url(path):
+            path = os.path.abspath(path)
+            try:
+                with open(path, "rb"):
+                    size = os.path.getsize(path)
+            except OSError as e:
+                problems.append(f"The file {path} cannot be read: {e.strerror}.")
+                continue
+        bitstreams.append(Bitstream(name=name, file_path=path, size=size))
+    if not bitstreams and not problems:
+        problems.append(f"No {file_type} files match {item.file_identifier}.")
+    item.bitstreams = bitstreams
+    return item, problems
+
+
+def _check_rows(csv_reader, field_map, delimited_columns):
+    """Yield the line number, item and problems of each row of a metadata CSV."""
+    transform = Item.compile_field_map(field_map)
+    identifiers = set()
+    for line, row in enumerate(csv_reader, start=2):
+        problems = []
+        if None in row:
+            problems.append("The row has more cells than the CSV has columns.")
+        if None in row.values():
+            yield line, None, problems + [
+                "The row has fewer cells than the CSV has columns."
+            ]
+            continue
+        item = transform(row)
+        if not item.file_identifier:
+            problems.append("The row has no file_identifier.")
+        identifier = item.source_system_identifier
+        if identifier in identifiers:
+            problems.append(f"The source_system_identifier {identifier} is repeated.")
+        elif identifier:
+            identifiers.add(identifier)
+        for column, delimiter in delimited_columns:
+            if "" in row[column].split(delimiter) and row[column]:
+                logger.warning(
+                    "Plan empty delimited value",
+                    line=line,
+                    column=column,
+                    delimiter=delimiter,
+                )
+        yield line, item, problems
+
+
+@profiling.spanned
+def create_plan(
+    metadata_csv,
+    field_map_path,
+    content_directory,
+    plan_path,
+    file_type="*",
+    workers=None,
+):
+    """Check a metadata CSV, field map and content directory without calling the
+    DSpace API and, if no problems are found, write a plan of the items, their
+    metadata and their files, with sizes. The content directory is indexed while
+    the CSV is parsed in a background thread, and the files of each item are
+    checked by a pool of workers. Content that cannot be indexed is reported as a
+    single problem.
+    Every problem is logged and the list of problems is returned."""
+    with open(field_map_path) as field_map_file:
+        try:
+            field_map = json.load(field_map_file)
+        except json.JSONDecodeError as e:
+            return [f"The field map is not valid JSON: {e}."]
+    with open(metadata_csv, newline="") as csvfile, ThreadPoolExecutor(
+        workers
+    ) as executor:
+        reader = csv.DictReader(csvfile)
+        problems = check_field_map(field_map, reader.fieldnames or [])
+        if problems:
+            for problem in problems:
+                logger.error("Plan problem", problem=problem)
+            return problems
+        index = executor.submit(ContentIndex.from_location, content_directory)
+        delimited_columns = [
+            (mapping["csv_field_name"], mapping["delimiter"])
+            for mapping in field_map.values()
+            if mapping["delimiter"]
+        ]
+        directory = os.path.dirname(os.path.abspath(plan_path))
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, suffix=".jsonl", delete=False
+        ) as items_file:
+            try:
+                totals = _write_items(
+                    items_file,
+                    helpers.buffered(
+                        _check_rows(reader, field_map, delimited_columns), 1000
+                    ),
+                    executor,
+                    index,
+                    file_type,
+                    problems,
+                    window=(workers or os.cpu_count() or 1) * 4,
+                )
+            except Exception as e:
+                if not index.done() or index.exception() is not e:
+                    os.remove(items_file.name)
+                    raise
+            except BaseException:
+                os.remove(items_file.name)
+                raise
+    if index.exception() is not None:
+        problem = (
+            f"The content {content_directory} cannot be indexed: {index.exception()}."
+        )
+        logger.error("Plan problem", problem=problem)
+        os.remove(items_file.name)
+        return [problem]
+    if problems:
+        os.remove(items_file.name)
+        return problems
+    header = {
+        "format": PLAN_FORMAT,
+        "version": PLAN_VERSION,
+        "created": datetime.datetime.utcnow().isoformat(timespec="seconds"),
+        "metadata_csv": os.path.abspath(metadata_csv),
+        "field_map": os.path.abspath(field_map_path),
+        "content_directory": content_directory,
+        "file_type": file_type,
+        **totals,
+    }
+    with open(plan_path, "w") as plan_file, open(items_file.name) as items:
+        plan_file.write(json.dumps(header) + "\n")
+        shutil.copyfileobj(items, plan_file)
+    os.remove(items_file.name)
+    logger.info("Plan written", path=plan_path, **totals)
+    return problems
+
+
+def _write_items(items_file, rows, executor, index, file_type, problems, window):
+    """Check the files of each parsed row in the executor, a window of rows at a
+    time, and write the items in CSV order as compact JSON lines. Returns the
+    plan's totals."""
+    totals = {"items": 0, "bitstreams": 0, "total_bytes": 0, "unsized_bitstreams": 0}
+    pending = deque()
+
+    def complete(line, row_problems, future):
+        if future is not None:
+            item, file_problems = future.result()
+            row_problems = row_problems + file_problems
+        for problem in row_problems:
+            logger.error("Plan problem", line=line, problem=problem)
+            problems.append(f"Line {line}: {problem}")
+        if row_problems:
+            return
+        totals["items"] += 1
+        totals["bitstreams"] += len(item.bitstreams)
+        for bitstream in item.bitstreams:
+            if bitstream.size is None:
+                totals["unsized_bitstreams"] += 1
+            else:
+                totals["total_bytes"] += bitstream.size
+        items_file.write(json.dumps(plan_record(line, item), separators=(",", ":")))
+        items_file.write("\n")
+
+    for line, item, row_problems in rows:
+        future = None
+        if item is not None and item.file_identifier:
+            future = executor.submit(_check_item, index, file_type, item)
+        pending.append((line, row_problems, future))
+        if len(pending) >= window:
+            complete(*pending.popleft())
+    while pending:
+        complete(*pending.popleft())
+    return totals
+
+
+def plan_record(line, item):
+    """Return the compact plan record of an item and its bitstreams."""
+    return [
+        line,
+        item.source_system_identifier,
+        item.file_identifier,
+        [[m.key, m.value, m.language] for m in item.metadata],
+        [[b.name, b.file_path, b.size] for b in item.bitstreams],
+    ]
+
+
+def read_plan_header(plan_path):
+    """Return the header of a plan file, raising a PlanError if it is not one."""
+    with open(plan_path) as plan_file:
+        try:
+            header = json.loads(plan_file.readline())
+        except json.JSONDecodeError:
+            header = None
+    if not isinstance(header, dict) or header.get("format") != PLAN_FORMAT:
+        raise PlanError(f"{plan_path} is not an ingest plan.")
+    if header.get("version") != PLAN_VERSION:
+        raise PlanError(
+            f"{plan_path} is a version {header.get('version')} plan, "
+            f"version {PLAN_VERSION} is supported."
+        )
+    return header
+
+
+def read_plan_items(plan_path):
+    """Yield the items of a plan, with their metadata and bitstreams, as the plan
+    is read."""
+    read_plan_header(plan_path)
+    with open(plan_path) as plan_file:
+        plan_file.readline()
+        for line in plan_file:
+            _, source_system_identifier, file_identifier, metadata, bitstreams = (
+                json.loads(line)
+            )
+            yield Item(
+                metadata=[MetadataEntry(*entry) for entry in metadata],
+                bitstreams=[
+                    Bitstream(name=name, file_path=path, size=size)
+                    for name, path, size in bitstreams
+                ],
+                file_identifier=file_identifier,
+                source_system_identifier=source_system_identifier,
+            )
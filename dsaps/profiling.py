@@ -0,0 +1,247 @@
+import inspect
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import structlog
+
+logger = structlog.get_logger()
+
+# The call counts and durations of each span while spans are being recorded,
+# otherwise None so that spans cost a single check.
+_spans = None
+_spans_lock = threading.Lock()
+
+
+def record_spans():
+    """Start recording the spans of the run."""
+    global _spans
+    with _spans_lock:
+        _spans = {}
+
+
+def stop_spans():
+    """Stop recording spans and return the calls, total seconds and longest call
+    of each span. A span's time is summed across threads, so spans running in
+    parallel may add up to more than the run's duration."""
+    global _spans
+    with _spans_lock:
+        spans, _spans = _spans or {}, None
+    return {
+        name: {"calls": calls, "seconds": seconds, "max_seconds": longest}
+        for name, (calls, seconds, longest) in sorted(spans.items())
+    }
+
+
+def _add(name, seconds):
+    with _spans_lock:
+        if _spans is None:
+            return
+        calls, total, longest = _spans.get(name, (0, 0.0, 0.0))
+        _spans[name] = (calls + 1, total + seconds, max(longest, seconds))
+
+
+@contextmanager
+def span(name):
+    """Time a block under a span name while spans are being recorded."""
+    if _spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(name, time.perf_counter() - start)
+
+
+def iterate(name, iterable):
+    """Time each step of an iterable under a span name while spans are being
+    recorded, leaving out the time its consumer spends between steps."""
+    if _spans is None:
+        return iterable
+    return _iterate(name, iterable)
+
+
+def _iterate(name, iterable):
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            value = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _add(name, time.perf_counter() - start)
+        yield value
+
+
+def spanned(function):
+    """Time each call of a function under its module and qualified name. The steps
+    of a generator function are timed rather than the call creating it."""
+    name = f"{function.__module__}.{function.__qualname__}"
+    if inspect.isgeneratorfunction(function):
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return iterate(name, function(*args, **kwargs))
+
+    else:
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _spans is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+
+    return wrapper
+
+
+class Profiler:
+    """cProfile and tracemalloc sampling of a run, writing a profile and a report
+    of the top allocation sites to files starting with a path prefix. Threads
+    started while the profiler runs are profiled as well as the calling thread.
+    Traced memory is sampled every interval seconds and the allocation report
+    describes the largest sample, so that it shows what was held at the peak
+    rather than what is left at the end."""
+
+    def __init__(
+        self, path_prefix, profile=True, trace_memory=False, top=25, interval=1.0
+    ):
+        self.path_prefix = path_prefix
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.top = top
+        self.interval = interval
+        self.profiles = []
+        self.profiles_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.sampler = None
+        self.sample = None
+        self.sample_size = 0
+        self.sample_time = 0.0
+        self.start_time = None
+
+    def start(self):
+        """Start profiling, tracing memory and recording spans."""
+        self.start_time = time.monotonic()
+        record_spans()
+        if self.trace_memory:
+            import tracemalloc
+
+            tracemalloc.start()
+            self.sampler = threading.Thread(target=self._sample_memory, daemon=True)
+            self.sampler.start()
+        if self.profile:
+            import cProfile
+
+            threading.setprofile(self._profile_thread)
+            profile = cProfile.Profile()
+            self.profiles.append(profile)
+            profile.enable()
+
+    def _profile_thread(self, frame, event, arg):
+        """Start a profile for a new thread on its first profiling event."""
+        import cProfile
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12 and later allow one active profiler, which sees every
+            # thread, so the hook is removed rather than called on every event.
+            sys.setprofile(None)
+            return
+        with self.profiles_lock:
+            self.profiles.append(profile)
+
+    def _sample_memory(self):
+        while not self.stopped.wait(self.interval):
+            self._take_sample()
+
+    def _take_sample(self):
+        import tracemalloc
+
+        size = tracemalloc.get_traced_memory()[0]
+        if self.sample is None or size > self.sample_size:
+            self.sample = tracemalloc.take_snapshot()
+            self.sample_size = size
+            self.sample_time = time.monotonic() - self.start_time
+
+    def stop(self):
+        """Stop profiling, write the profile, allocation report and span summary,
+        and return their paths."""
+        paths = []
+        if self.profile:
+            threading.setprofile(None)
+            self.profiles[0].disable()
+            paths.extend(self._write_profile())
+        if self.trace_memory:
+            import tracemalloc
+
+            self.stopped.set()
+            self.sampler.join()
+            self._take_sample()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            paths.append(self._write_memory_report(peak))
+        spans = stop_spans()
+        for name, stats in spans.items():
+            logger.info(
+                "Span",
+                span=name,
+                calls=stats["calls"],
+                seconds=round(stats["seconds"], 3),
+                max_seconds=round(stats["max_seconds"], 3),
+            )
+        spans_path = f"{self.path_prefix}-spans.json"
+        with open(spans_path, "w") as spans_file:
+            json.dump(spans, spans_file, indent=2)
+        paths.append(spans_path)
+        logger.info("Profile written", paths=paths)
+        return paths
+
+    def _write_profile(self):
+        import pstats
+
+        with self.profiles_lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        profile_path = f"{self.path_prefix}.prof"
+        stats.dump_stats(profile_path)
+        report_path = f"{self.path_prefix}-profile.txt"
+        with open(report_path, "w") as report_file:
+            stats.stream = report_file
+            report_file.write(f"Profiled threads: {len(profiles)}\n")
+            stats.sort_stats("cumulative").print_stats(self.top)
+            stats.sort_stats("tottime").print_stats(self.top)
+        return [profile_path, report_path]
+
+    def _write_memory_report(self, peak):
+        import tracemalloc
+
+        report_path = f"{self.path_prefix}-memory.txt"
+        snapshot = self.sample.filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "*/cProfile.py"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ]
+        )
+        with open(report_path, "w") as report_file:
+            report_file.write(
+                f"Peak traced memory: {peak / 2**20:.1f} MiB\n"
+                f"Largest sample: {self.sample_size / 2**20:.1f} MiB at "
+                f"{self.sample_time:.1f}s\n\n"
+                f"Top {self.top} allocation sites in the largest sample:\n"
+            )
+            for stat in snapshot.statistics("lineno")[: self.top]:
+                report_file.write(f"{stat}\n")
+        return report_path
@@ -0,0 +1,213 @@
+import itertools
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class RequestScheduler:
+    """Limit the number of API requests in flight and the rate at which they start,
+    adjusting both AIMD-style: the limits grow additively while requests succeed
+    within the target latency and are cut multiplicatively, at most once per
+    cooldown, when a request is slower than the target or when the share of failed
+    requests among the most recent ones reaches the error threshold. Once the rate
+    limit is well above the rate requests are actually made at, it is lifted."""
+
+    def __init__(
+        self,
+        max_concurrency=32,
+        min_concurrency=1,
+        max_rate=None,
+        min_rate=1.0,
+        target_latency=5.0,
+        decrease_factor=0.5,
+        rate_increase=1.0,
+        cooldown=None,
+        error_threshold=0.1,
+        error_window=20,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(max_concurrency)
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate = max_rate
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.rate_increase = rate_increase
+        self.cooldown = target_latency if cooldown is None else cooldown
+        self.error_threshold = error_threshold
+        self.outcomes = deque(maxlen=error_window)
+        self.active = 0
+        self.next_start = 0.0
+        self.last_decrease = float("-inf")
+        self.recent_starts = deque()
+        self.condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Wait until a request may start within the current limits and hold its
+        place until it completes."""
+        with self.condition:
+            while self.active >= int(self.concurrency):
+                self.condition.wait()
+            self.active += 1
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            if self.rate:
+                self.next_start = start + 1 / self.rate
+        try:
+            if start > now:
+                time.sleep(start - now)
+            with self.condition:
+                self.recent_starts.append(time.monotonic())
+                self._observed_rate(self.recent_starts[-1])
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify()
+
+    def record(self, latency, failed):
+        """Adjust the limits after a request completes. A latency of None means the
+        request's duration says nothing about the server's load."""
+        with self.condition:
+            self.outcomes.append(failed)
+            error_share = sum(self.outcomes) / len(self.outcomes)
+            now = time.monotonic()
+            if (failed and error_share >= self.error_threshold) or (
+                latency is not None and latency > self.target_latency
+            ):
+                if now - self.last_decrease >= self.cooldown:
+                    self._decrease(now)
+            elif not failed:
+                self._increase(now)
+            self.condition.notify_all()
+
+    def _increase(self, now):
+        self.concurrency = min(
+            self.max_concurrency, self.concurrency + 1 / self.concurrency
+        )
+        if self.rate is not None:
+            self.rate += self.rate_increase / self.concurrency
+            if self.max_rate is not None:
+                self.rate = min(self.max_rate, self.rate)
+            elif self.rate > 2 * max(self._observed_rate(now), self.min_rate):
+                self.rate = None
+
+    def _decrease(self, now):
+        self.last_decrease = now
+        self.concurrency = max(
+            self.min_concurrency, self.concurrency * self.decrease_factor
+        )
+        rate = self.rate if self.rate is not None else self._observed_rate(now)
+        self.rate = max(self.min_rate, rate * self.decrease_factor)
+        logger.warning(
+            f"Request limits reduced to {int(self.concurrency)} concurrent, "
+            f"{self.rate:.1f}/s"
+        )
+
+    def _observed_rate(self, now, window=1.0):
+        """Return the number of requests started per second over the last window."""
+        while self.recent_starts and self.recent_starts[0] < now - window:
+            self.recent_starts.popleft()
+        return len(self.recent_starts) / window
+
+
+def backoff_delay(attempt, base=0.5, cap=60.0):
+    """Return a full-jitter exponential backoff delay for a retry attempt."""
+    return random.uniform(0, min(cap, base * 2**attempt))  # nosec
+
+
+class TokenBucket:
+    """Limit the rate at which bytes, or any other unit, are consumed. Consuming
+    more than is available borrows against future refills and waits for the debt
+    to be paid, so chunks larger than the burst size are still let through."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        """Take an amount from the bucket, waiting until it has been refilled."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class UploadScheduler:
+    """Pool of upload workers that always take the largest waiting upload next, so
+    that large files start early and small ones fill the gaps around them instead
+    of one large file holding up the end of a batch."""
+
+    def __init__(self, workers):
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.shutdown_lock = threading.Lock()
+        self.closed = False
+        self.threads = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def submit(self, size, function, *args):
+        """Schedule a call for an upload of a size in bytes, or None if unknown, and
+        return its future. Raises a RuntimeError once shutdown has started, as no
+        worker would be left to run the upload."""
+        future = Future()
+        with self.shutdown_lock:
+            if self.closed:
+                raise RuntimeError("Cannot schedule an upload after shutdown.")
+            self.queue.put((-(size or 0), next(self.counter), future, function, args))
+        return future
+
+    def map(self, function, bitstreams):
+        """Upload bitstreams by size and return an iterator of the results in the
+        bitstreams' order."""
+        futures = [self.submit(b.size, function, b) for b in bitstreams]
+        return (future.result() for future in futures)
+
+    def shutdown(self):
+        """Wait for the scheduled uploads to finish and stop the workers."""
+        with self.shutdown_lock:
+            self.closed = True
+        for _ in self.threads:
+            self.queue.put((float("inf"), next(self.counter), None, None, None))
+        for thread in self.threads:
+            thread.join()
+
+    def _work(self):
+        while True:
+            _, _, future, function, args = self.queue.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
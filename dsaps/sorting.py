@@ -0,0 +1,98 @@
+import heapq
+import json
+import os
+import tempfile
+
+# A rough allowance for the Python objects and list slot behind each buffered
+# value, on top of the length of its text.
+ENTRY_OVERHEAD = 120
+
+
+class ExternalSorter:
+    """Sort more values than fit in memory. Values are buffered until their
+    estimated size reaches the memory budget, then sorted and written to a run file
+    in a temporary directory, and the runs are merged lazily when the sorter is
+    iterated. Values must survive a round trip through JSON, with tuples read back
+    as tuples. If every value fits within the budget nothing is written to disk."""
+
+    def __init__(self, memory_budget, directory=None, fan_in=64):
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self.fan_in = fan_in
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.runs = []
+        self.temporary_directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, value):
+        """Add a value, spilling the buffer to a run file once it is over budget."""
+        self.buffer.append(value)
+        if isinstance(value, tuple):
+            self.buffered_bytes += sum(map(len, map(str, value))) + ENTRY_OVERHEAD
+        else:
+            self.buffered_bytes += len(str(value)) + ENTRY_OVERHEAD
+        if self.buffered_bytes >= self.memory_budget:
+            self.spill()
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def spill(self):
+        """Sort the buffered values and write them to a new run file."""
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        self.runs.append(self._write_run(self.buffer))
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    def __iter__(self):
+        """Yield the values added so far in sorted order."""
+        if not self.runs:
+            self.buffer.sort()
+            yield from self.buffer
+            return
+        self.spill()
+        while len(self.runs) > self.fan_in:
+            merged = self.runs[: self.fan_in]
+            self.runs = self.runs[self.fan_in :] + [
+                self._write_run(heapq.merge(*map(self._read_run, merged)))
+            ]
+            for path in merged:
+                os.remove(path)
+        yield from heapq.merge(*map(self._read_run, self.runs))
+
+    def close(self):
+        """Delete the sorter's run files."""
+        if self.temporary_directory:
+            self.temporary_directory.cleanup()
+            self.temporary_directory = None
+        self.runs = []
+        self.buffer = []
+
+    def _write_run(self, values):
+        if self.temporary_directory is None:
+            self.temporary_directory = tempfile.TemporaryDirectory(
+                prefix="dsaps-sort-", dir=self.directory
+            )
+        descriptor, path = tempfile.mkstemp(
+            suffix=".jsonl", dir=self.temporary_directory.name
+        )
+        with os.fdopen(descriptor, "w") as run_file:
+            for value in values:
+                run_file.write(json.dumps(value) + "\n")
+        return path
+
+    @staticmethod
+    def _read_run(path):
+        with open(path) as run_file:
+            for line in run_file:
+                value = json.loads(line)
+                yield tuple(value) if isinstance(value, list) else value
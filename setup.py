@@ -14,6 +14,7 @@ setup(
         "click",
         "lxml",
     ],
+    extras_require={"yaml": ["pyyaml"]},
     entry_points={
         "console_scripts": [
             "dsaps=dsaps.cli:main",
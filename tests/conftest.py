@@ -6,6 +6,7 @@ import requests_mock
 from click.testing import CliRunner
 
 from dsaps import models
+from dsaps.journal import Journal
 
 
 @pytest.fixture()
@@ -17,6 +18,13 @@ def client():
     return client
 
 
+@pytest.fixture()
+def journal(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    yield journal
+    journal.close()
+
+
 @pytest.fixture()
 def input_dir(tmp_path):
     input_dir = tmp_path / "files"
@@ -88,6 +96,23 @@ def web_mock():
         url_2 = "mock://example.com/items/e5f6/bitstreams?name=test_02.pdf"
         m.post(url_2, json=b_json_2)
         m.get("mock://remoteserver.com/files/test_01.pdf", content=b"Sample")
+        m.get("http://remoteserver.com/files/test_01.pdf", content=b"Sample")
+        m.get("http://remoteserver.com/files/more_files/test_02.pdf", content=b"More")
+        index_html = (
+            '<html><body><a href="?C=N;O=D">Name</a><a href="../">Parent</a>'
+            '<a href="test_01.pdf">test_01.pdf</a><a href="best_01.pdf">best</a>'
+            '<a href="more_files/">more_files/</a></body></html>'
+        )
+        m.get(
+            "http://remoteserver.com/files/",
+            text=index_html,
+            headers={"Content-Type": "text/html"},
+        )
+        m.get(
+            "http://remoteserver.com/files/more_files/",
+            text='<html><body><a href="test_02.pdf">test_02.pdf</a></body></html>',
+            headers={"Content-Type": "text/html"},
+        )
         coll_json = {"uuid": "k1l2"}
         m.get("mock://example.com/handle/333.3333", json=coll_json)
         item_json_2 = {"uuid": "e5f6", "handle": "222.2222"}
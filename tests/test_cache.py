@@ -0,0 +1,61 @@
+from dsaps.cache import RecordCache
+
+
+def test_record_cache_get():
+    """Test get and set methods."""
+    cache = RecordCache()
+    assert cache.get("mock://example.com/handle/111.1111") is None
+    cache.set("mock://example.com/handle/111.1111", {"uuid": "a1b2"})
+    assert cache.get("mock://example.com/handle/111.1111") == {"uuid": "a1b2"}
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_record_cache_expires_records():
+    """Test records are not served after their time to live."""
+    cache = RecordCache(ttl=0)
+    cache.set("key", {"uuid": "a1b2"})
+    assert cache.get("key") is None
+
+
+def test_record_cache_evicts_least_recently_used():
+    """Test the least recently used record is evicted from memory."""
+    cache = RecordCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert list(cache.entries) == ["a", "c"]
+
+
+def test_record_cache_file(tmp_path):
+    """Test records are kept between instances using the same file."""
+    path = str(tmp_path / "cache.db")
+    cache = RecordCache(path=path)
+    cache.set("key", {"uuid": "a1b2"})
+    cache.close()
+    cache = RecordCache(path=path)
+    assert cache.get("key") == {"uuid": "a1b2"}
+    cache.close()
+
+
+def test_record_cache_bypass():
+    """Test a bypassed cache serves no records."""
+    cache = RecordCache(bypass=True)
+    cache.set("key", {"uuid": "a1b2"})
+    assert cache.get("key") is None
+    assert cache.misses == 1
+
+
+def test_record_cache_invalidate(tmp_path):
+    """Test invalidate method."""
+    cache = RecordCache(path=str(tmp_path / "cache.db"))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.invalidate()
+    cache.entries.clear()
+    assert cache.get("b") is None
+    cache.close()
@@ -1,3 +1,7 @@
+import csv
+import json
+import os
+
 from dsaps.cli import main
 
 
@@ -54,6 +58,378 @@ def test_additems(runner, input_dir):
     assert result.exit_code == 0
 
 
+def test_additems_workers(runner, input_dir, output_dir):
+    """Test adding items to a collection with concurrent workers."""
+    metadata_csv = f"{output_dir}metadata.csv"
+    with open("tests/fixtures/aspace_metadata_delimited.csv") as source, open(
+        metadata_csv, "w"
+    ) as target:
+        target.write(source.read())
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "additems",
+            "--metadata-csv",
+            metadata_csv,
+            "--field-map",
+            "config/aspace_mapping.json",
+            "--content-directory",
+            input_dir,
+            "--file-type",
+            "pdf",
+            "--collection-handle",
+            "333.3333",
+            "--ingest-report",
+            "--workers",
+            "3",
+        ],
+    )
+    assert result.exit_code == 0
+    with open(f"{output_dir}metadata-ingest.csv") as csvfile:
+        reader = csv.DictReader(csvfile)
+        assert [row["uri"] for row in reader] == ["/repo/0/ao/456", "/repo/0/ao/123"]
+
+
+def test_additems_workers_failed_items(runner, web_mock, input_dir, output_dir):
+    """Test that items failing to post with concurrent workers are reported and
+    fail the command."""
+    web_mock.post(
+        "mock://example.com/items/e5f6/bitstreams?name=test_02.pdf", status_code=500
+    )
+    metadata_csv = f"{output_dir}metadata.csv"
+    with open("tests/fixtures/aspace_metadata_delimited.csv") as source, open(
+        metadata_csv, "w"
+    ) as target:
+        target.write(source.read())
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "additems",
+            "--metadata-csv",
+            metadata_csv,
+            "--field-map",
+            "config/aspace_mapping.json",
+            "--content-directory",
+            input_dir,
+            "--file-type",
+            "pdf",
+            "--collection-handle",
+            "333.3333",
+            "--ingest-report",
+            "--workers",
+            "3",
+        ],
+    )
+    assert result.exit_code == 1
+    assert "1 items failed to post" in result.output
+    with open(f"{output_dir}metadata-ingest.csv") as csvfile:
+        reader = csv.DictReader(csvfile)
+        assert [row["uri"] for row in reader] == ["/repo/0/ao/456"]
+    with open(f"{output_dir}metadata-ingest-failed.csv") as csvfile:
+        reader = csv.DictReader(csvfile)
+        assert [(row["uri"], row["uuid"], row["handle"]) for row in reader] == [
+            ("/repo/0/ao/123", "e5f6", "222.2222")
+        ]
+
+
+def test_additems_resume(runner, web_mock, input_dir, output_dir):
+    """Test resuming an additems run from its journal."""
+    args = [
+        "--url",
+        "mock://example.com/",
+        "--email",
+        "test@test.mock",
+        "--password",
+        "1234",
+        "additems",
+        "--metadata-csv",
+        "tests/fixtures/aspace_metadata_delimited.csv",
+        "--field-map",
+        "config/aspace_mapping.json",
+        "--content-directory",
+        input_dir,
+        "--file-type",
+        "pdf",
+        "--collection-handle",
+        "333.3333",
+    ]
+    result = runner.invoke(main, args + ["--resume"])
+    assert result.exit_code == 2
+    result = runner.invoke(main, args + ["--skip-unchanged"])
+    assert result.exit_code == 2
+    assert web_mock.call_count == 0
+    result = runner.invoke(main, args + ["--max-upload-rate", "fast"])
+    assert result.exit_code == 2
+    journal_args = ["--journal", f"{output_dir}journal.db"]
+    with open("config/aspace_mapping.json") as source:
+        mapping = json.load(source)
+    del mapping["source_system_identifier"]
+    with open(f"{output_dir}mapping.json", "w") as target:
+        json.dump(mapping, target)
+    field_map_index = args.index("config/aspace_mapping.json")
+    unjournalable_args = list(args)
+    unjournalable_args[field_map_index] = f"{output_dir}mapping.json"
+    result = runner.invoke(main, unjournalable_args + journal_args)
+    assert result.exit_code == 2
+    assert "source_system_identifier" in result.output
+    assert web_mock.call_count == 0
+    result = runner.invoke(main, args + journal_args)
+    assert result.exit_code == 0
+    result = runner.invoke(main, args + journal_args)
+    assert result.exit_code == 2
+    result = runner.invoke(
+        main,
+        args
+        + journal_args
+        + ["--resume", "--max-upload-rate", "50M", "--max-worker-upload-rate", "1e6"],
+    )
+    assert result.exit_code == 0
+
+
+def test_batch(runner, input_dir, output_dir):
+    """Test running a manifest of ingest jobs."""
+    with open("tests/fixtures/aspace_metadata_delimited.csv") as source:
+        metadata = source.read()
+    for name in ("first", "second"):
+        with open(f"{output_dir}{name}.csv", "w") as target:
+            target.write(metadata)
+    manifest = {
+        "defaults": {
+            "field_map": f"{os.getcwd()}/config/aspace_mapping.json",
+            "content_directory": input_dir,
+            "file_type": "pdf",
+        },
+        "jobs": [
+            {"metadata_csv": "first.csv", "collection_handle": "333.3333"},
+            {
+                "metadata_csv": "second.csv",
+                "community_handle": "111.1111",
+                "collection_name": "Test Collection",
+                "journal": "second.db",
+                "workers": 2,
+            },
+        ],
+    }
+    with open(f"{output_dir}manifest.json", "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    args = [
+        "--url",
+        "mock://example.com/",
+        "--email",
+        "test@test.mock",
+        "--password",
+        "1234",
+        "batch",
+        "--manifest",
+        f"{output_dir}manifest.json",
+        "--jobs",
+        "2",
+        "--max-upload-rate",
+        "50M",
+    ]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    for name in ("first", "second"):
+        with open(f"{output_dir}{name}-ingest.csv") as csvfile:
+            reader = csv.DictReader(csvfile)
+            assert [row["uri"] for row in reader] == [
+                "/repo/0/ao/456",
+                "/repo/0/ao/123",
+            ]
+    assert os.path.exists(f"{output_dir}second.db")
+    del manifest["jobs"][0]["collection_handle"]
+    with open(f"{output_dir}manifest.json", "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    result = runner.invoke(main, args)
+    assert result.exit_code == 2
+    assert "collection_handle" in result.output
+
+
+def test_batch_metadata_without_csv_extension(runner, input_dir, output_dir):
+    """Test that a batch job's default report is not written over a metadata file
+    without a .csv extension, and that a report naming it is rejected."""
+    with open("tests/fixtures/aspace_metadata_delimited.csv") as source:
+        metadata = source.read()
+    with open(f"{output_dir}items.txt", "w") as target:
+        target.write(metadata)
+    job = {
+        "metadata_csv": "items.txt",
+        "field_map": f"{os.getcwd()}/config/aspace_mapping.json",
+        "content_directory": input_dir,
+        "file_type": "pdf",
+        "collection_handle": "333.3333",
+    }
+    with open(f"{output_dir}manifest.json", "w") as manifest_file:
+        json.dump([job], manifest_file)
+    args = [
+        "--url",
+        "mock://example.com/",
+        "--email",
+        "test@test.mock",
+        "--password",
+        "1234",
+        "batch",
+        "--manifest",
+        f"{output_dir}manifest.json",
+    ]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    with open(f"{output_dir}items.txt") as metadata_file:
+        assert metadata_file.read() == metadata
+    with open(f"{output_dir}items-ingest.csv") as csvfile:
+        reader = csv.DictReader(csvfile)
+        assert [row["uri"] for row in reader] == ["/repo/0/ao/456", "/repo/0/ao/123"]
+    with open(f"{output_dir}manifest.json", "w") as manifest_file:
+        json.dump([{**job, "ingest_report": "./items.txt"}], manifest_file)
+    result = runner.invoke(main, args)
+    assert result.exit_code == 2
+    assert "would overwrite its metadata_csv" in result.output
+
+
+def test_plan_and_additems_from_plan(runner, web_mock, input_dir, output_dir):
+    """Test writing a plan offline and posting its items with additems."""
+    with open("tests/fixtures/aspace_metadata_delimited.csv") as source:
+        header, _, test_row = source.read().splitlines()
+    metadata_csv = f"{output_dir}metadata.csv"
+    with open(metadata_csv, "w") as target:
+        target.write(f"{header}\n{test_row}\n")
+    plan_args = [
+        "plan",
+        "--field-map",
+        "config/aspace_mapping.json",
+        "--content-directory",
+        input_dir,
+        "--file-type",
+        "pdf",
+    ]
+    result = runner.invoke(
+        main,
+        plan_args + ["--metadata-csv", "tests/fixtures/aspace_metadata_delimited.csv"],
+    )
+    assert result.exit_code == 1
+    assert "No pdf files match tast" in result.output
+    result = runner.invoke(main, plan_args + ["--metadata-csv", metadata_csv])
+    assert result.exit_code == 0
+    assert web_mock.request_history == []
+    args = [
+        "--url",
+        "mock://example.com/",
+        "--email",
+        "test@test.mock",
+        "--password",
+        "1234",
+        "additems",
+        "--collection-handle",
+        "333.3333",
+        "--ingest-report",
+    ]
+    result = runner.invoke(
+        main, args + ["--plan", metadata_csv, "--metadata-csv", metadata_csv]
+    )
+    assert result.exit_code == 2
+    result = runner.invoke(main, args + ["--plan", metadata_csv])
+    assert result.exit_code == 2
+    assert "is not an ingest plan" in result.output
+    result = runner.invoke(main, args)
+    assert result.exit_code == 2
+    result = runner.invoke(main, args + ["--plan", f"{output_dir}metadata-plan.jsonl"])
+    assert result.exit_code == 0
+    with open(f"{output_dir}metadata-plan-ingest.csv") as csvfile:
+        assert [row["uri"] for row in csv.DictReader(csvfile)] == ["/repo/0/ao/123"]
+
+
+def test_main_connection_pool_options(runner):
+    """Test connection pool options on the main command group."""
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "--pool-maxsize",
+            "20",
+            "--retries",
+            "2",
+            "--max-rate",
+            "100",
+            "--no-keep-alive",
+            "newcollection",
+            "--community-handle",
+            "111.1111",
+            "--collection-name",
+            "Test Collection",
+        ],
+    )
+    assert result.exit_code == 0
+
+
+def test_main_cache_file(runner, web_mock, output_dir):
+    """Test a cache file is reused by later runs."""
+    args = [
+        "--url",
+        "mock://example.com/",
+        "--email",
+        "test@test.mock",
+        "--password",
+        "1234",
+        "--cache-file",
+        f"{output_dir}cache.db",
+        "newcollection",
+        "--community-handle",
+        "111.1111",
+        "--collection-name",
+        "Test Collection",
+    ]
+    assert runner.invoke(main, args).exit_code == 0
+    assert runner.invoke(main, args).exit_code == 0
+    assert runner.invoke(main, ["--clear-cache"] + args).exit_code == 0
+    handle_lookups = [
+        r for r in web_mock.request_history if r.url.endswith("/handle/111.1111")
+    ]
+    assert len(handle_lookups) == 2
+
+
+def test_main_metrics_file(runner, output_dir):
+    """Test the metrics of the run's API calls are written to a file."""
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "--metrics-file",
+            f"{output_dir}metrics.json",
+            "newcollection",
+            "--community-handle",
+            "111.1111",
+            "--collection-name",
+            "Test Collection",
+        ],
+    )
+    assert result.exit_code == 0
+    with open(f"{output_dir}metrics.json") as jsonfile:
+        endpoints = json.load(jsonfile)["endpoints"]
+    assert list(endpoints) == ["collection_post", "handle", "login"]
+
+
 def test_newcollection(runner, input_dir):
     """Test newcoll command."""
     result = runner.invoke(
@@ -98,3 +474,317 @@ def test_reconcile(runner, input_dir, output_dir):
         ],
     )
     assert result.exit_code == 0
+
+
+def test_reconcile_rejects_content_url(runner, output_dir):
+    """Test reconcile command requires a local content directory."""
+    result = runner.invoke(
+        main,
+        [
+            "reconcile",
+            "--metadata-csv",
+            "tests/fixtures/aspace_metadata_delimited.csv",
+            "--output-directory",
+            output_dir,
+            "--content-directory",
+            "http://remoteserver.com/files/",
+        ],
+    )
+    assert result.exit_code == 2
+    assert "local content directory" in result.output
+    assert not os.path.exists(f"{output_dir}no_files.csv")
+
+
+def test_reconcile_offline(runner, web_mock, input_dir, output_dir):
+    """Test reconcile command runs without credentials or API calls."""
+    result = runner.invoke(
+        main,
+        [
+            "reconcile",
+            "--metadata-csv",
+            "tests/fixtures/aspace_metadata_delimited.csv",
+            "--output-directory",
+            output_dir,
+            "--content-directory",
+            input_dir,
+            "--file-type",
+            "pdf",
+        ],
+    )
+    assert result.exit_code == 0
+    assert web_mock.request_history == []
+    result = runner.invoke(
+        main,
+        [
+            "reconcile",
+            "--metadata-csv",
+            "tests/fixtures/aspace_metadata_delimited.csv",
+            "--output-directory",
+            output_dir,
+            "--content-directory",
+            input_dir,
+            "--file-type",
+            "pdf",
+            "--memory-budget",
+            "1M",
+        ],
+    )
+    assert result.exit_code == 0
+    with open(f"{output_dir}no_files.csv") as csvfile:
+        assert [row["id"] for row in csv.DictReader(csvfile)] == ["tast"]
+
+
+def test_search_without_credentials(runner, web_mock):
+    """Test that commands calling the API require credentials."""
+    result = runner.invoke(
+        main,
+        ["--url", "mock://example.com/", "search", "--field", "dc.title"],
+    )
+    assert result.exit_code == 2
+    assert "--email" in result.output
+    assert web_mock.request_history == []
+
+
+def test_search(runner, output_dir):
+    """Test search command."""
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "search",
+            "--field",
+            "dc.title",
+            "--string",
+            "test",
+            "--output",
+            f"{output_dir}results.csv",
+            "--output-format",
+            "csv",
+            "--prefetch",
+            "0",
+            "--collection-uuid",
+            "c3d4",
+        ],
+    )
+    assert result.exit_code == 0
+    with open(f"{output_dir}results.csv") as csvfile:
+        assert [row["link"] for row in csv.DictReader(csvfile)] == ["1234"]
+
+
+def test_export(runner, web_mock, output_dir):
+    """Test export command."""
+    web_mock.get(
+        "mock://example.com/handle/444.4444", json={"uuid": "m3n4", "type": "community"}
+    )
+    web_mock.get(
+        "mock://example.com/communities/m3n4",
+        json={"collections": [{"uuid": "k1l2"}], "subcommunities": []},
+    )
+    web_mock.get(
+        "mock://example.com/collections/k1l2/items",
+        json=[{"uuid": "e5f6", "handle": "222.2222", "name": "Test Item"}],
+    )
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "export",
+            "--handle",
+            "444.4444",
+            "--output",
+            f"{output_dir}export.jsonl",
+        ],
+    )
+    assert result.exit_code == 0
+    with open(f"{output_dir}export.jsonl") as jsonlfile:
+        assert [json.loads(line)["uuid"] for line in jsonlfile] == ["e5f6"]
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "export",
+            "--handle",
+            "111.1111",
+        ],
+    )
+    assert result.exit_code == 2
+
+
+def test_updateitems(runner, web_mock, tmp_path):
+    """Test updateitems command."""
+    metadata_csv = tmp_path / "updates.csv"
+    metadata_csv.write_text("handle,title\n111.1111,New Title\n")
+    field_map = tmp_path / "field_map.json"
+    field_map.write_text(
+        json.dumps(
+            {
+                "dc.title": {
+                    "csv_field_name": "title",
+                    "language": "en_US",
+                    "delimiter": "",
+                }
+            }
+        )
+    )
+    web_mock.get(
+        "mock://example.com/items/a1b2/metadata",
+        json=[{"key": "dc.title", "value": "Old Title", "language": "en_US"}],
+    )
+    web_mock.put("mock://example.com/items/a1b2/metadata")
+    args = [
+        "--url",
+        "mock://example.com/",
+        "--email",
+        "test@test.mock",
+        "--password",
+        "1234",
+        "updateitems",
+        "--metadata-csv",
+        str(metadata_csv),
+        "--field-map",
+        str(field_map),
+    ]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    assert web_mock.request_history[-1].method == "PUT"
+    requests_sent = web_mock.call_count
+    result = runner.invoke(main, args + ["--key-column", "uuid"])
+    assert result.exit_code == 2
+    assert web_mock.call_count == requests_sent
+
+
+def test_updateitems_with_additems_field_map(runner, web_mock, tmp_path):
+    """Test updateitems with the additems field map and a CSV of some of its
+    columns, failing if any item fails to update."""
+    metadata_csv = tmp_path / "updates.csv"
+    metadata_csv.write_text("handle,title\n111.1111,New Title\n")
+    web_mock.get(
+        "mock://example.com/items/a1b2/metadata",
+        json=[
+            {"key": "dc.title", "value": "Old Title", "language": "en_US"},
+            {"key": "dc.contributor.author", "value": "Smith, Jane"},
+        ],
+    )
+    web_mock.put("mock://example.com/items/a1b2/metadata")
+    args = [
+        "--url",
+        "mock://example.com/",
+        "--email",
+        "test@test.mock",
+        "--password",
+        "1234",
+        "updateitems",
+        "--metadata-csv",
+        str(metadata_csv),
+        "--field-map",
+        "config/aspace_mapping.json",
+    ]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0
+    assert web_mock.request_history[-1].method == "PUT"
+    assert [entry["key"] for entry in web_mock.request_history[-1].json()] == [
+        "dc.title"
+    ]
+    web_mock.put("mock://example.com/items/a1b2/metadata", status_code=400)
+    result = runner.invoke(main, args)
+    assert result.exit_code == 1
+    assert "1 items failed to update" in result.output
+    metadata_csv.write_text("handle,notes\n111.1111,New Title\n")
+    requests_sent = web_mock.call_count
+    result = runner.invoke(main, args)
+    assert result.exit_code == 2
+    assert web_mock.call_count == requests_sent
+
+
+def test_additems_remote_content(runner, web_mock):
+    """Test adding items with their content listed by a remote index page."""
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "additems",
+            "--metadata-csv",
+            "tests/fixtures/aspace_metadata_delimited.csv",
+            "--field-map",
+            "config/aspace_mapping.json",
+            "--content-directory",
+            "http://remoteserver.com/files/",
+            "--file-type",
+            "pdf",
+            "--collection-handle",
+            "333.3333",
+        ],
+    )
+    assert result.exit_code == 0
+    assert "mock://example.com/items/e5f6/bitstreams?name=test_01.pdf" in [
+        r.url for r in web_mock.request_history
+    ]
+
+
+def test_main_log_sample_option(runner):
+    """Test that malformed log sampling options are rejected."""
+    result = runner.invoke(
+        main,
+        [
+            "--url",
+            "mock://example.com/",
+            "--email",
+            "test@test.mock",
+            "--password",
+            "1234",
+            "--log-sample",
+            "Item posted",
+            "search",
+            "--field",
+            "dc.title",
+        ],
+    )
+    assert result.exit_code == 2
+
+
+def test_main_profile_options(runner, input_dir, output_dir, tmp_path, monkeypatch):
+    """Test profiling a command and tracing its memory."""
+    metadata_csv = os.path.abspath("tests/fixtures/aspace_metadata_delimited.csv")
+    monkeypatch.chdir(tmp_path)
+    result = runner.invoke(
+        main,
+        [
+            "--profile",
+            "--trace-memory",
+            "--profile-top",
+            "10",
+            "reconcile",
+            "--metadata-csv",
+            metadata_csv,
+            "--output-directory",
+            output_dir,
+            "--content-directory",
+            input_dir,
+            "--file-type",
+            "pdf",
+        ],
+    )
+    assert result.exit_code == 0
+    names = os.listdir(tmp_path / "logs")
+    for suffix in (".prof", "-profile.txt", "-memory.txt", "-spans.json"):
+        assert any(n.startswith("profile-") and n.endswith(suffix) for n in names)
@@ -0,0 +1,35 @@
+import hashlib
+import os
+
+from dsaps.hashing import FileHasher, hash_file
+
+
+def test_hash_file(tmp_path):
+    path = tmp_path / "test_01.pdf"
+    path.write_bytes(b"Sample")
+    assert hash_file(str(path)) == hashlib.md5(b"Sample").hexdigest()
+    path.write_bytes(b"")
+    assert hash_file(str(path)) == hashlib.md5(b"").hexdigest()
+
+
+def test_file_hasher_reuses_journaled_hashes(journal, tmp_path):
+    path = tmp_path / "test_01.pdf"
+    path.write_bytes(b"Sample")
+    stat = os.stat(path)
+    journal.record_file_hash(str(path), stat.st_size, stat.st_mtime_ns, "a1b2")
+    new_path = tmp_path / "test_02.pdf"
+    new_path.write_bytes(b"Other")
+    hasher = FileHasher(journal, workers=1)
+    try:
+        checksums = hasher.md5([str(path), str(new_path)])
+    finally:
+        hasher.close()
+    assert checksums == {
+        str(path): "a1b2",
+        str(new_path): hashlib.md5(b"Other").hexdigest(),
+    }
+    new_stat = os.stat(new_path)
+    assert (
+        journal.get_file_hash(str(new_path), new_stat.st_size, new_stat.st_mtime_ns)
+        == hashlib.md5(b"Other").hexdigest()
+    )
@@ -1,9 +1,30 @@
 import csv
+import json
+
+import pytest
 
 from dsaps import helpers
 from dsaps.models import Item
 
 
+def test_buffered():
+    """Test buffered function."""
+    assert list(helpers.buffered(iter(range(50)), 4)) == list(range(50))
+
+
+def test_buffered_raises_producer_error():
+    """Test buffered function re-raises errors from the background thread."""
+
+    def failing():
+        yield 1
+        raise ValueError("bad row")
+
+    values = helpers.buffered(failing(), 4)
+    assert next(values) == 1
+    with pytest.raises(ValueError, match="bad row"):
+        next(values)
+
+
 def test_create_csv_from_list(output_dir):
     """Test create_csv_from_list function."""
     list_name = ["123"]
@@ -21,11 +42,51 @@ def test_create_file_list(input_dir):
         assert file_id in file_list
 
 
+def test_scan_directory(input_dir):
+    """Test scan_directory function."""
+    files = sorted(helpers.scan_directory(input_dir, workers=2))
+    assert files == [
+        ("best_01.pdf", f"{input_dir}best_01.pdf"),
+        ("test_01.jpg", f"{input_dir}test_01.jpg"),
+        ("test_01.pdf", f"{input_dir}test_01.pdf"),
+        ("test_02.pdf", f"{input_dir}more_files/test_02.pdf"),
+    ]
+
+
+def test_scan_url_index_page():
+    """Test scan_url function follows an index page's subdirectory links."""
+    files = sorted(helpers.scan_url("http://remoteserver.com/files/"))
+    assert files == [
+        ("best_01.pdf", "http://remoteserver.com/files/best_01.pdf"),
+        ("test_01.pdf", "http://remoteserver.com/files/test_01.pdf"),
+        ("test_02.pdf", "http://remoteserver.com/files/more_files/test_02.pdf"),
+    ]
+
+
+def test_scan_url_manifest(web_mock):
+    """Test scan_url function reads JSON and text manifests."""
+    web_mock.get(
+        "http://remoteserver.com/manifest.json",
+        json=["files/test_01.pdf", {"url": "http://cdn.com/a1", "name": "test_02.pdf"}],
+    )
+    web_mock.get(
+        "http://remoteserver.com/manifest.txt",
+        text="# files\nfiles/test%2001.pdf\n\n",
+    )
+    assert list(helpers.scan_url("http://remoteserver.com/manifest.json")) == [
+        ("test_01.pdf", "http://remoteserver.com/files/test_01.pdf"),
+        ("test_02.pdf", "http://cdn.com/a1"),
+    ]
+    assert list(helpers.scan_url("http://remoteserver.com/manifest.txt")) == [
+        ("test 01.pdf", "http://remoteserver.com/files/test%2001.pdf")
+    ]
+
+
 def test_create_ingest_report(runner, output_dir):
     """Test create_ingest_report function."""
     file_name = "ingest_report.csv"
     items = [Item(source_system_identifier="/repo/0/ao/123", handle="111.1111")]
-    helpers.create_ingest_report(items, f"{output_dir}{file_name}")
+    assert helpers.create_ingest_report(items, f"{output_dir}{file_name}") == 1
     with open(f"{output_dir}{file_name}") as csvfile:
         reader = csv.DictReader(csvfile)
         for row in reader:
@@ -33,6 +94,54 @@ def test_create_ingest_report(runner, output_dir):
             assert row["link"] == "https://hdl.handle.net/111.1111"
 
 
+def test_create_failure_report(output_dir):
+    """Test create_failure_report function."""
+    file_name = f"{output_dir}failed.csv"
+    items = [
+        Item(source_system_identifier="/repo/0/ao/123", uuid="e5f6", handle="222.2222"),
+        Item(source_system_identifier="/repo/0/ao/456"),
+    ]
+    helpers.create_failure_report(
+        [(items[0], ValueError("upload")), (items[1], ValueError("post"))], file_name
+    )
+    with open(file_name) as csvfile:
+        rows = list(csv.DictReader(csvfile))
+    assert [(row["uri"], row["uuid"], row["handle"]) for row in rows] == [
+        ("/repo/0/ao/123", "e5f6", "222.2222"),
+        ("/repo/0/ao/456", "", ""),
+    ]
+    assert rows[0]["error"] == "ValueError('upload')"
+
+
+def test_load_batch_manifest(tmp_path):
+    """Test load_batch_manifest function."""
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(
+        json.dumps(
+            {
+                "defaults": {"field_map": "map.json", "workers": 2},
+                "jobs": [
+                    {"metadata_csv": "a.csv", "content_directory": "/files/"},
+                    {
+                        "metadata_csv": "b.csv",
+                        "content_directory": "http://remoteserver.com/",
+                        "workers": 4,
+                    },
+                ],
+            }
+        )
+    )
+    jobs = helpers.load_batch_manifest(str(manifest_path))
+    assert jobs[0] == {
+        "field_map": f"{tmp_path}/map.json",
+        "workers": 2,
+        "metadata_csv": f"{tmp_path}/a.csv",
+        "content_directory": "/files/",
+    }
+    assert jobs[1]["content_directory"] == "http://remoteserver.com/"
+    assert jobs[1]["workers"] == 4
+
+
 def test_create_metadata_id_list(input_dir):
     """Test create_metadata_id_list function."""
     metadata_path = "tests/fixtures/aspace_metadata_delimited.csv"
@@ -50,6 +159,20 @@ def test_match_files_to_metadata():
     assert "test_01.pdf" in file_matches
 
 
+def test_match_files_to_metadata_nested_prefixes():
+    """Test match_files_to_metadata keeps the order of the nested-loop matching."""
+    file_list = ["test_02.pdf", "tast_01.pdf", "test_01.pdf", "test_011.pdf"]
+    metadata_ids = ["test_01", "test", "best"]
+    file_matches = helpers.match_files_to_metadata(file_list, metadata_ids)
+    assert file_matches == [
+        "test_01.pdf",
+        "test_011.pdf",
+        "test_02.pdf",
+        "test_01.pdf",
+        "test_011.pdf",
+    ]
+
+
 def test_match_metadata_to_files():
     """Test match_metadata_to_files function."""
     file_list = ["test_01.pdf", "tast_01.pdf"]
@@ -59,6 +182,82 @@ def test_match_metadata_to_files():
     assert "test" in file_matches
 
 
+def test_match_metadata_to_files_nested_prefixes():
+    """Test match_metadata_to_files keeps the order of the nested-loop matching."""
+    file_list = ["test_01.pdf", "tast_01.pdf", "test_02.pdf"]
+    metadata_ids = ["test_01", "tast", "test"]
+    metadata_matches = helpers.match_metadata_to_files(file_list, metadata_ids)
+    assert metadata_matches == ["test_01", "test", "tast", "test"]
+
+
+def test_prefix_merge_join():
+    """Test prefix_merge_join function."""
+    files = ["best_01.pdf", "test_01.pdf", "test_02.pdf"]
+    metadata = [("tast", 0), ("test", 1), ("test", 3), ("test_01", 2)]
+    events = [
+        (
+            (e[0], e[1], [entry[0] for entry in e[2]])
+            if e[0] == "file"
+            else (e[0], list(e[1]))
+        )
+        for e in helpers.prefix_merge_join(files, metadata)
+    ]
+    assert events == [
+        ("file", "best_01.pdf", []),
+        ("metadata", ["tast", [0], False]),
+        ("file", "test_01.pdf", ["test", "test_01"]),
+        ("metadata", ["test_01", [2], True]),
+        ("file", "test_02.pdf", ["test"]),
+        ("metadata", ["test", [1, 3], True]),
+    ]
+
+
+def test_reconcile_sorted(input_dir, output_dir):
+    """Test reconcile_sorted function with a budget small enough to spill runs."""
+    helpers.reconcile_sorted(
+        "tests/fixtures/aspace_metadata_delimited.csv",
+        output_dir,
+        input_dir,
+        "pdf",
+        memory_budget=300,
+    )
+    reports = {}
+    for name in ("no_metadata", "no_files", "metadata_matches"):
+        with open(f"{output_dir}{name}.csv") as csvfile:
+            reports[name] = [row["id"] for row in csv.DictReader(csvfile)]
+    assert reports == {
+        "no_metadata": ["best_01.pdf"],
+        "no_files": ["tast"],
+        "metadata_matches": ["test", "test"],
+    }
+    with open(f"{output_dir}updated-aspace_metadata_delimited.csv") as csvfile:
+        assert [row["uri"] for row in csv.DictReader(csvfile)] == ["/repo/0/ao/123"]
+
+
+def test_write_records_jsonl(output_dir):
+    """Test write_records function with JSON lines output."""
+    records = [{"uuid": "a1", "metadata": [{"key": "dc.title"}]}, {"uuid": "b2"}]
+    with open(f"{output_dir}records.jsonl", "w") as output_file:
+        count = helpers.write_records(records, output_file, "jsonl", ["uuid"])
+    assert count == 2
+    with open(f"{output_dir}records.jsonl") as jsonlfile:
+        assert [json.loads(line) for line in jsonlfile] == records
+
+
+def test_write_records_csv(output_dir):
+    """Test write_records function with CSV output."""
+    records = [{"uuid": "a1", "handle": "111.1111", "type": "item", "bitstreams": [{}]}]
+    with open(f"{output_dir}records.csv", "w") as output_file:
+        count = helpers.write_records(
+            records, output_file, "csv", ["uuid", "handle", "bitstreams"]
+        )
+    assert count == 1
+    with open(f"{output_dir}records.csv") as csvfile:
+        assert list(csv.DictReader(csvfile)) == [
+            {"uuid": "a1", "handle": "111.1111", "bitstreams": "[{}]"}
+        ]
+
+
 def test_update_metadata_csv(input_dir, output_dir):
     """Test update_metadata_csv function."""
     metadata_matches = ["test"]
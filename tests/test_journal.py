@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+
+
+def test_journal_record_item(journal):
+    """Test record_item and get_item methods."""
+    assert journal.get_item("/repo/0/ao/123") is None
+    assert journal.collection_uuid() is None
+    journal.record_item("/repo/0/ao/123", "c3d4", "e5f6", "222.2222")
+    assert journal.get_item("/repo/0/ao/123") == ("e5f6", "222.2222", False)
+    assert journal.item_count() == 1
+    assert journal.collection_uuid() == "c3d4"
+
+
+def test_journal_record_bitstream(journal):
+    """Test record_bitstream and get_bitstreams methods."""
+    journal.record_item("/repo/0/ao/123", "c3d4", "e5f6", "222.2222")
+    journal.record_bitstream("/repo/0/ao/123", "test_01.pdf", "g7h8")
+    assert journal.get_bitstreams("/repo/0/ao/123") == {"test_01.pdf": "g7h8"}
+    assert journal.get_bitstreams("/repo/0/ao/456") == {}
+
+
+def test_journal_complete_item(journal):
+    """Test complete_item method."""
+    journal.record_item("/repo/0/ao/123", "c3d4", "e5f6", "222.2222")
+    journal.complete_item("/repo/0/ao/123")
+    assert journal.get_item("/repo/0/ao/123") == ("e5f6", "222.2222", True)
+
+
+def test_journal_record_file_hash(journal):
+    """Test record_file_hash and get_file_hash methods."""
+    journal.record_file_hash("/files/test_01.pdf", 6, 1000, "a1b2")
+    assert journal.get_file_hash("/files/test_01.pdf", 6, 1000) == "a1b2"
+    assert journal.get_file_hash("/files/test_01.pdf", 6, 2000) is None
+    assert journal.get_file_hash("/files/test_01.pdf", 7, 1000) is None
+
+
+def test_journal_requires_source_system_identifier(journal):
+    """Test an item without a source_system_identifier cannot be recorded."""
+    with pytest.raises(sqlite3.IntegrityError):
+        journal.record_item(None, "c3d4", "e5f6", "222.2222")
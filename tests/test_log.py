@@ -0,0 +1,55 @@
+import json
+import logging
+
+import pytest
+import structlog
+
+from dsaps.log import EventSampler, configure_logging, parse_sample_rates
+
+
+def test_event_sampler():
+    sampler = EventSampler({"Item posted": 3})
+    kept = []
+    for i in range(7):
+        try:
+            kept.append(sampler(None, "info", {"event": "Item posted", "uuid": i}))
+        except structlog.DropEvent:
+            pass
+    assert [e["uuid"] for e in kept] == [0, 3, 6]
+    assert kept[0]["sampled"] == 3
+    assert sampler(None, "info", {"event": "Other"}) == {"event": "Other"}
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates(["Item posted=10", "a=b=2"]) == {
+        "Item posted": 10,
+        "a=b": 2,
+    }
+    with pytest.raises(ValueError):
+        parse_sample_rates(["Item posted"])
+    with pytest.raises(ValueError):
+        parse_sample_rates(["Item posted=0"])
+
+
+@pytest.mark.parametrize("asynchronous", [True, False])
+def test_configure_logging(tmp_path, asynchronous):
+    path = tmp_path / "log.json"
+    stop = configure_logging(
+        str(path),
+        level="WARNING",
+        asynchronous=asynchronous,
+        sample_rates={"Request retrying": 2},
+    )
+    logger = structlog.get_logger("dsaps.test")
+    try:
+        logger.info("Item posted", uuid="a1b2")
+        for i in range(3):
+            logger.warning("Request retrying", attempt=i)
+    finally:
+        stop()
+        logging.getLogger().setLevel(logging.WARNING)
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(e["event"], e["attempt"]) for e in events] == [
+        ("Request retrying", 0),
+        ("Request retrying", 2),
+    ]
@@ -0,0 +1,60 @@
+import json
+
+from dsaps.metrics import EndpointStats, RequestMetrics
+
+
+def test_endpoint_stats_percentile():
+    """Test percentile method."""
+    stats = EndpointStats(reservoir_size=100)
+    for latency in range(1, 11):
+        stats.add(latency / 10, 0, 0, False)
+    assert stats.percentile(50) == 0.5
+    assert stats.percentile(90) == 0.9
+    assert stats.percentile(99) == 1.0
+
+
+def test_endpoint_stats_bounds_sample():
+    """Test the latency sample does not grow past the reservoir size."""
+    stats = EndpointStats(reservoir_size=10)
+    for latency in range(1000):
+        stats.add(latency, 0, 0, False)
+    assert len(stats.latencies) == 10
+    assert stats.count == 1000
+    assert stats.max_latency == 999
+
+
+def test_request_metrics_summary():
+    """Test summary method."""
+    metrics = RequestMetrics()
+    metrics.record("item_post", 0.2, bytes_sent=100, bytes_received=50)
+    metrics.record("item_post", 0.4, bytes_sent=100, bytes_received=50, failed=True)
+    metrics.record("bitstream_post", 1.0, bytes_sent=1000)
+    summary = metrics.summary()
+    assert summary["requests"] == 3
+    assert summary["endpoints"]["item_post"]["errors"] == 1
+    assert summary["endpoints"]["item_post"]["p90_seconds"] == 0.4
+    assert summary["endpoints"]["bitstream_post"]["bytes_sent"] == 1000
+    assert summary["items_per_second"] > 0
+
+
+def test_request_metrics_write_json(tmp_path):
+    """Test write method with JSON output."""
+    metrics = RequestMetrics()
+    metrics.record("login", 0.1)
+    metrics.write(tmp_path / "metrics.json")
+    with open(tmp_path / "metrics.json") as jsonfile:
+        assert json.load(jsonfile)["endpoints"]["login"]["requests"] == 1
+
+
+def test_request_metrics_write_prometheus(tmp_path):
+    """Test write method with Prometheus textfile output."""
+    metrics = RequestMetrics()
+    metrics.record("handle", 0.1, bytes_received=20)
+    metrics.write(tmp_path / "metrics.prom", "prometheus")
+    with open(tmp_path / "metrics.prom") as textfile:
+        lines = textfile.read().splitlines()
+    assert (
+        'dsaps_request_duration_seconds{endpoint="handle",quantile="0.5"} 0.1' in lines
+    )
+    assert 'dsaps_request_received_bytes_total{endpoint="handle"} 20' in lines
+    assert 'dsaps_request_duration_seconds_count{endpoint="handle"} 1' in lines
@@ -1,6 +1,94 @@
+import hashlib
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
 import attr
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
 
 from dsaps import models
+from dsaps.cache import RecordCache
+from dsaps.hashing import FileHasher
+from dsaps.scheduler import RequestScheduler, TokenBucket
+
+
+def test_client_connection_pool():
+    """Test that the client's calls share a configured connection pool."""
+    client = models.Client(
+        "mock://example.com/", pool_connections=2, pool_maxsize=4, keep_alive=False
+    )
+    adapter = client.session.get_adapter("https://example.com")
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 4
+    assert client.session.headers["Connection"] == "close"
+
+
+def test_request_retries_idempotent_request(client, web_mock):
+    """Test _request method retries a failed idempotent request."""
+    client.backoff = 0
+    client.scheduler = RequestScheduler(min_rate=1000)
+    web_mock.get(
+        "mock://example.com/handle/111.1111",
+        [
+            {"status_code": 503},
+            {"exc": requests.ConnectionError},
+            {"json": {"uuid": "a1b2"}},
+        ],
+    )
+    response = client._request("GET", "mock://example.com/handle/111.1111")
+    assert response.json() == {"uuid": "a1b2"}
+    assert web_mock.call_count == 3
+
+
+def test_request_raises_after_retries(client, web_mock):
+    """Test _request method raises once its retries are used up."""
+    client.backoff = 0
+    client.retries = 2
+    client.scheduler = RequestScheduler(min_rate=1000)
+    web_mock.get("mock://example.com/handle/111.1111", status_code=502)
+    with pytest.raises(requests.HTTPError):
+        client._request("GET", "mock://example.com/handle/111.1111")
+    assert web_mock.call_count == 3
+
+
+def test_request_does_not_retry_post(client, web_mock):
+    """Test _request method does not retry a request that is not idempotent."""
+    client.backoff = 0
+    web_mock.post("mock://example.com/collections/c3d4/items", status_code=503)
+    with pytest.raises(requests.HTTPError):
+        client._request("POST", "mock://example.com/collections/c3d4/items")
+    assert web_mock.call_count == 1
+
+
+def test_request_retries_post_that_could_not_connect(client, web_mock):
+    """Test _request method retries a request that is not idempotent if it could
+    not connect."""
+    client.backoff = 0
+    client.scheduler = RequestScheduler(min_rate=1000)
+    refused = requests.ConnectionError(
+        MaxRetryError(None, "/", NewConnectionError(None, "Connection refused"))
+    )
+    web_mock.post(
+        "mock://example.com/collections/c3d4/items",
+        [{"exc": refused}, {"json": {"uuid": "e5f6"}}],
+    )
+    response = client._request("POST", "mock://example.com/collections/c3d4/items")
+    assert response.json() == {"uuid": "e5f6"}
+    assert web_mock.call_count == 2
+
+
+def test_request_does_not_retry_post_after_connecting(client, web_mock):
+    """Test _request method does not retry a request that is not idempotent once it
+    has connected."""
+    client.backoff = 0
+    web_mock.post(
+        "mock://example.com/collections/c3d4/items", exc=requests.ConnectionError
+    )
+    with pytest.raises(requests.ConnectionError):
+        client._request("POST", "mock://example.com/collections/c3d4/items")
+    assert web_mock.call_count == 1
 
 
 def test_authenticate(client):
@@ -10,6 +98,67 @@ def test_authenticate(client):
     client.authenticate(email, password)
     assert client.user_full_name == "User Name"
     assert client.cookies == {"JSESSIONID": "11111111"}
+    assert client.metrics.summary()["endpoints"]["login"]["requests"] == 2
+
+
+def test_client_reauthenticates_expired_session(client, web_mock):
+    """Test that an expired session is renewed and the request replayed."""
+    web_mock.post(
+        "mock://example.com/login",
+        [{"cookies": {"JSESSIONID": "11111111"}}, {"cookies": {"JSESSIONID": "2222"}}],
+    )
+    client.authenticate("test@test.mock", "1234")
+    web_mock.get(
+        "mock://example.com/items/123?expand=all",
+        [
+            {"status_code": 401},
+            {"json": {"metadata": {"title": "Sample title"}, "type": "item"}},
+        ],
+    )
+    rec_obj = client.get_record("123", "items")
+    assert attr.asdict(rec_obj)["metadata"] == {"title": "Sample title"}
+    assert client.cookies == {"JSESSIONID": "2222"}
+    assert web_mock.last_request.headers["Cookie"] == "JSESSIONID=2222"
+    assert client.metrics.summary()["endpoints"]["login"]["requests"] == 4
+
+
+def test_client_reauthenticates_on_login_redirect(client, web_mock):
+    """Test that a redirect to the login page renews the session."""
+    client.authenticate("test@test.mock", "1234")
+    web_mock.get("mock://example.com/login-page", text="<html>Log in</html>")
+    web_mock.post(
+        "mock://example.com/items/e5f6/bitstreams?name=test_01.pdf",
+        [
+            {
+                "status_code": 302,
+                "headers": {"Location": "mock://example.com/login-page"},
+            },
+            {"json": {"uuid": "g7h8"}},
+        ],
+    )
+    bitstream = models.Bitstream(
+        name="test_01.pdf", file_path="tests/fixtures/metadata_num_col.csv"
+    )
+    assert client.post_bitstream("e5f6", bitstream) == "g7h8"
+    with open("tests/fixtures/metadata_num_col.csv", "rb") as f:
+        assert b"".join(web_mock.last_request.body) == f.read()
+
+
+def test_client_reauthenticates_once(client, web_mock):
+    """Test that workers holding the same expired session log in only once."""
+    client.authenticate("test@test.mock", "1234")
+    expired = client.cookies
+    client._reauthenticate(expired)
+    client._reauthenticate(expired)
+    assert client.metrics.summary()["endpoints"]["login"]["requests"] == 4
+
+
+def test_client_raises_if_session_stays_expired(client, web_mock):
+    """Test that a request rejected after logging in again raises."""
+    client.authenticate("test@test.mock", "1234")
+    web_mock.get("mock://example.com/items/123?expand=all", status_code=403)
+    with pytest.raises(requests.HTTPError):
+        client.get_record("123", "items")
 
 
 def test_filtered_item_search(client):
@@ -23,12 +172,162 @@ def test_filtered_item_search(client):
     assert "1234" in item_links
 
 
+def test_search_items(web_mock):
+    """Test search_items method."""
+    client = models.Client("http://example.com")
+    for offset, links in [(0, ["1", "2"]), (2, ["3", "4"]), (4, ["5"])]:
+        web_mock.get(
+            f"http://example.com/filtered-items?offset={offset}",
+            json={"items": [{"link": link} for link in links]},
+        )
+    items = client.search_items("dc.title", "test", "contains", page_size=2, prefetch=2)
+    assert [item["link"] for item in items] == ["1", "2", "3", "4", "5"]
+
+
+def test_search_items_in_collection(web_mock):
+    """Test search_items method limits a search to a collection only if one is
+    selected."""
+    client = models.Client("http://example.com")
+    web_mock.get("http://example.com/filtered-items", json={"items": []})
+    list(client.search_items("dc.title", "test", "contains", "c3d4"))
+    query = parse_qs(urlparse(web_mock.last_request.url).query)
+    assert query["collSel[]"] == ["c3d4"]
+    assert query["query_field[]"] == ["dc.title"]
+    list(client.search_items("dc.title", "test", "contains"))
+    query = parse_qs(urlparse(web_mock.last_request.url).query)
+    assert "collSel[]" not in query
+
+
+def test_search_items_stops_at_empty_page(web_mock):
+    """Test search_items method stops at an empty page."""
+    client = models.Client("http://example.com")
+    web_mock.get("http://example.com/filtered-items", json={"items": []})
+    items = client.search_items("dc.title", "test", "contains", page_size=2)
+    assert list(items) == []
+    assert web_mock.call_count == 1
+
+
+def test_export_items(client, web_mock):
+    """Test export_items method walks a community's subcommunities."""
+    web_mock.get(
+        "mock://example.com/communities/a1b2",
+        json={"collections": [{"uuid": "c3d4"}], "subcommunities": [{"uuid": "e5f6"}]},
+    )
+    web_mock.get(
+        "mock://example.com/communities/e5f6",
+        json={"collections": [{"uuid": "g7h8"}], "subcommunities": []},
+    )
+    item_json = {
+        "uuid": "i9j0",
+        "handle": "222.2222",
+        "name": "Test Item",
+        "metadata": [{"key": "dc.title", "value": "Test Item", "language": "en_US"}],
+        "bitstreams": [
+            {
+                "uuid": "k1l2",
+                "name": "test_01.pdf",
+                "bundleName": "ORIGINAL",
+                "sizeBytes": 6,
+                "checkSum": {"value": "a1b2", "checkSumAlgorithm": "MD5"},
+            }
+        ],
+    }
+    web_mock.get("mock://example.com/collections/c3d4/items", json=[item_json])
+    web_mock.get("mock://example.com/collections/g7h8/items", json=[])
+    items = list(client.export_items("a1b2", "community", page_size=2))
+    assert items == [
+        {
+            "uuid": "i9j0",
+            "handle": "222.2222",
+            "name": "Test Item",
+            "collection_uuid": "c3d4",
+            "metadata": [
+                {"key": "dc.title", "value": "Test Item", "language": "en_US"}
+            ],
+            "bitstreams": [
+                {
+                    "uuid": "k1l2",
+                    "name": "test_01.pdf",
+                    "bundle": "ORIGINAL",
+                    "size": 6,
+                    "md5": "a1b2",
+                }
+            ],
+        }
+    ]
+
+
+def test_metadata_changes():
+    """Test metadata_changes function returns only the changed fields."""
+    metadata = [
+        models.MetadataEntry("dc.title", "New Title", "en_US"),
+        models.MetadataEntry("dc.contributor.author", "Smith, John"),
+        models.MetadataEntry("dc.contributor.author", "Smith, Jane"),
+        models.MetadataEntry("dc.description", ""),
+        models.MetadataEntry("dc.rights", "Totally Free", "en_US"),
+    ]
+    current = [
+        {"key": "dc.title", "value": "Old Title", "language": "en_US"},
+        {"key": "dc.contributor.author", "value": "Smith, John", "language": ""},
+        {"key": "dc.contributor.author", "value": "Smith, Jane", "language": None},
+        {"key": "dc.description", "value": "More info", "language": None},
+        {"key": "dc.rights", "value": "Totally Free", "language": "en_US"},
+    ]
+    assert models.metadata_changes(metadata, current) == [
+        {"key": "dc.title", "value": "New Title", "language": "en_US"}
+    ]
+    assert models.metadata_changes(metadata[1:], current) == []
+
+
+def test_update_items(client, web_mock):
+    """Test update_items method sends only changed fields."""
+    web_mock.get(
+        "mock://example.com/items/a1b2/metadata",
+        json=[{"key": "dc.title", "value": "Old Title", "language": "en_US"}],
+    )
+    web_mock.put("mock://example.com/items/a1b2/metadata")
+    web_mock.get(
+        "mock://example.com/items/e5f6/metadata",
+        json=[{"key": "dc.title", "value": "Same Title", "language": "en_US"}],
+    )
+    web_mock.get("mock://example.com/handle/333.3333", status_code=404)
+    items = [
+        models.Item(
+            handle="111.1111",
+            metadata=[models.MetadataEntry("dc.title", "New Title", "en_US")],
+        ),
+        models.Item(handle="333.3333"),
+        models.Item(
+            uuid="e5f6",
+            metadata=[models.MetadataEntry("dc.title", "Same Title", "en_US")],
+        ),
+    ]
+    results = list(client.update_items(items, workers=2))
+    assert [(item.uuid, changed) for item, changed in results] == [
+        ("a1b2", ["dc.title"]),
+        ("e5f6", []),
+    ]
+    puts = [r for r in web_mock.request_history if r.method == "PUT"]
+    assert [r.json() for r in puts] == [
+        [{"key": "dc.title", "value": "New Title", "language": "en_US"}]
+    ]
+
+
 def test_get_uuid_from_handle(client):
     """Test get_uuid_from_handle method."""
     id = client.get_uuid_from_handle("111.1111")
     assert id == "a1b2"
 
 
+def test_get_uuid_from_handle_cached(client, web_mock):
+    """Test get_uuid_from_handle method uses the client's cache."""
+    client.cache = RecordCache()
+    assert client.get_uuid_from_handle("111.1111") == "a1b2"
+    assert client.get_uuid_from_handle("111.1111") == "a1b2"
+    assert web_mock.call_count == 1
+    assert client.cache.hits == 1
+
+
 def test_get_record(client):
     """Test get_record method."""
     rec_obj = client.get_record("123", "items")
@@ -45,6 +344,107 @@ def test_post_bitstream(client, input_dir):
     assert bit_uuid == "g7h8"
 
 
+def test_post_bitstream_verifies_checksum(client, web_mock, input_dir):
+    """Test post_bitstream method checks the checksum DSpace stores."""
+    with open(f"{input_dir}test_01.pdf", "wb") as f:
+        f.write(b"Sample")
+
+    def bitstream_json(request, context):
+        body = b"".join(request.body)
+        return {
+            "uuid": "g7h8",
+            "checkSum": {
+                "value": hashlib.md5(body).hexdigest(),
+                "checkSumAlgorithm": "MD5",
+            },
+        }
+
+    url = "mock://example.com/items/e5f6/bitstreams?name=test_01.pdf"
+    web_mock.post(url, json=bitstream_json)
+    bitstream = models.Bitstream(
+        name="test_01.pdf", file_path=f"{input_dir}test_01.pdf"
+    )
+    assert client.post_bitstream("e5f6", bitstream) == "g7h8"
+    assert client.uploaded_bytes == 6
+    web_mock.post(
+        url,
+        json=lambda request, context: {
+            "uuid": "g7h8",
+            "checkSum": {
+                "value": b"".join(request.body).hex(),
+                "checkSumAlgorithm": "MD5",
+            },
+        },
+    )
+    with pytest.raises(models.ChecksumMismatchError):
+        client.post_bitstream("e5f6", bitstream)
+
+
+def test_upload_stream(input_dir):
+    """Test UploadStream reads a file in chunks and computes its checksum."""
+    with open(f"{input_dir}test_01.pdf", "wb") as f:
+        f.write(b"0123456789")
+    stream = models.UploadStream(f"{input_dir}test_01.pdf", chunk_size=4)
+    assert len(stream) == 10
+    assert list(stream) == [b"0123", b"4567", b"89"]
+    assert stream.bytes_read == 10
+    assert stream.md5 == hashlib.md5(b"0123456789").hexdigest()
+    assert stream.name == "test_01.pdf"
+    assert b"".join(stream) == b"0123456789"
+
+
+def test_upload_stream_remote():
+    """Test UploadStream streams a remote file of unknown size."""
+    stream = models.UploadStream(
+        "http://remoteserver.com/files/test_01.pdf", chunk_size=4
+    )
+    assert stream.size is None
+    assert list(stream) == [b"Samp", b"le"]
+    assert stream.md5 == hashlib.md5(b"Sample").hexdigest()
+
+
+def test_post_bitstream_remote(client, web_mock):
+    """Test post_bitstream streams a remote file with chunked encoding."""
+    item = models.Item(file_identifier="test")
+    item.bitstreams_in_directory("http://remoteserver.com/files/", "pdf")
+    assert [b.file_path for b in item.bitstreams] == [
+        "http://remoteserver.com/files/test_01.pdf",
+        "http://remoteserver.com/files/more_files/test_02.pdf",
+    ]
+    bitstream_uuid = client.post_bitstream("e5f6", item.bitstreams[0])
+    assert bitstream_uuid == "g7h8"
+    body = web_mock.last_request.body
+    assert isinstance(body, models.UnsizedBody)
+    assert b"".join(body) == b"Sample"
+
+
+def test_upload_stream_limiters(input_dir):
+    """Test UploadStream takes each chunk from its token buckets."""
+    with open(f"{input_dir}test_01.pdf", "wb") as f:
+        f.write(b"0123456789")
+    bucket = TokenBucket(rate=1, burst=1000)
+    stream = models.UploadStream(
+        f"{input_dir}test_01.pdf", chunk_size=4, limiters=[bucket]
+    )
+    assert list(stream) == [b"0123", b"4567", b"89"]
+    assert bucket.tokens < 991
+
+
+def test_client_upload_limiters(client):
+    """Test each uploading thread gets its own per-worker token bucket."""
+    assert client._upload_limiters() == []
+    client.set_upload_limits(rate=1000, worker_rate=100)
+    limiters = client._upload_limiters()
+    assert [limiter.rate for limiter in limiters] == [1000, 100]
+    assert client._upload_limiters()[1] is limiters[1]
+    other = []
+    thread = threading.Thread(target=lambda: other.extend(client._upload_limiters()))
+    thread.start()
+    thread.join()
+    assert other[0] is limiters[0]
+    assert other[1] is not limiters[1]
+
+
 def test_post_coll_to_comm(client):
     """Test post_coll_to_comm method."""
     comm_handle = "111.1111"
@@ -98,6 +498,18 @@ def test_collection_create_metadata_for_items_from_csv(
     assert 2 == len(collection.items)
 
 
+def test_collection_stream_items_from_csv(
+    input_dir, aspace_delimited_csv, aspace_mapping
+):
+    collection = models.Collection.stream_items_from_csv(
+        aspace_delimited_csv, aspace_mapping, input_dir, "pdf", queue_size=1
+    )
+    items = list(collection.items)
+    assert [item.file_identifier for item in items] == ["tast", "test"]
+    assert items[0].bitstreams == []
+    assert [b.name for b in items[1].bitstreams] == ["test_01.pdf", "test_02.pdf"]
+
+
 def test_collection_post_items(client, input_dir, aspace_delimited_csv, aspace_mapping):
     collection = models.Collection.create_metadata_for_items_from_csv(
         aspace_delimited_csv, aspace_mapping
@@ -109,6 +521,226 @@ def test_collection_post_items(client, input_dir, aspace_delimited_csv, aspace_m
         assert item.uuid == "e5f6"
 
 
+def test_collection_post_items_concurrently(
+    client, input_dir, aspace_delimited_csv, aspace_mapping
+):
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        aspace_delimited_csv, aspace_mapping
+    )
+    for item in collection.items:
+        item.bitstreams_in_directory(input_dir, "pdf")
+    collection.uuid = "c3d4"
+    items = list(collection.post_items(client, workers=4))
+    assert [item.source_system_identifier for item in items] == [
+        "/repo/0/ao/456",
+        "/repo/0/ao/123",
+    ]
+    assert [b.uuid for b in items[1].bitstreams] == ["g7h8", "i9j0"]
+
+
+def test_collection_post_items_concurrently_closed_early(
+    client, input_dir, aspace_delimited_csv, aspace_mapping
+):
+    post_item_to_collection = client.post_item_to_collection
+
+    def slow_post_item_to_collection(*args):
+        time.sleep(0.05)
+        return post_item_to_collection(*args)
+
+    client.post_item_to_collection = slow_post_item_to_collection
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        list(aspace_delimited_csv) * 4, aspace_mapping
+    )
+    for item in collection.items:
+        item.bitstreams_in_directory(input_dir, "pdf")
+    collection.uuid = "c3d4"
+    posted = collection.post_items(client, workers=4, lookahead=8)
+    next(posted)
+    closer = threading.Thread(target=posted.close, daemon=True)
+    closer.start()
+    closer.join(5)
+    assert not closer.is_alive()
+
+
+def test_collection_post_items_concurrently_skips_failed_item(
+    client, web_mock, aspace_delimited_csv, aspace_mapping
+):
+    web_mock.post(
+        "mock://example.com/collections/c3d4/items",
+        [
+            {"status_code": 500, "text": "Internal Server Error"},
+            {"json": {"uuid": "e5f6", "handle": "222.2222"}},
+        ],
+    )
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        aspace_delimited_csv, aspace_mapping
+    )
+    collection.uuid = "c3d4"
+    failures = []
+    items = list(collection.post_items(client, workers=2, failures=failures))
+    assert len(items) == 1
+    assert items[0].handle == "222.2222"
+    assert [item.source_system_identifier for item, error in failures] == [
+        "/repo/0/ao/456"
+    ]
+    assert isinstance(failures[0][1], requests.HTTPError)
+
+
+def test_collection_post_items_concurrently_reports_partly_posted_item(
+    client, web_mock, input_dir, aspace_delimited_csv, aspace_mapping
+):
+    web_mock.post(
+        "mock://example.com/items/e5f6/bitstreams?name=test_02.pdf", status_code=500
+    )
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        aspace_delimited_csv, aspace_mapping
+    )
+    for item in collection.items:
+        item.bitstreams_in_directory(input_dir, "pdf")
+    collection.uuid = "c3d4"
+    failures = []
+    items = list(collection.post_items(client, workers=2, failures=failures))
+    assert [item.source_system_identifier for item in items] == ["/repo/0/ao/456"]
+    assert [(item.uuid, item.handle) for item, error in failures] == [
+        ("e5f6", "222.2222")
+    ]
+
+
+def test_collection_post_items_resumes_from_journal(
+    client, web_mock, journal, input_dir, aspace_delimited_csv, aspace_mapping
+):
+    journal.record_item("/repo/0/ao/456", "c3d4", "a1a1", "222.1111")
+    journal.complete_item("/repo/0/ao/456")
+    journal.record_item("/repo/0/ao/123", "c3d4", "e5f6", "222.2222")
+    journal.record_bitstream("/repo/0/ao/123", "test_01.pdf", "g7h8")
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        aspace_delimited_csv, aspace_mapping
+    )
+    for item in collection.items:
+        item.bitstreams_in_directory(input_dir, "pdf")
+    collection.uuid = "c3d4"
+    items = list(collection.post_items(client, journal=journal))
+    assert [item.uuid for item in items] == ["a1a1", "e5f6"]
+    assert [b.uuid for b in items[1].bitstreams] == ["g7h8", "i9j0"]
+    assert [r.url for r in web_mock.request_history] == [
+        "mock://example.com/items/e5f6/bitstreams?name=test_02.pdf"
+    ]
+    assert journal.get_bitstreams("/repo/0/ao/123") == {
+        "test_01.pdf": "g7h8",
+        "test_02.pdf": "i9j0",
+    }
+    assert journal.get_item("/repo/0/ao/123") == ("e5f6", "222.2222", True)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_collection_post_items_skips_unjournalable_items(
+    client, web_mock, journal, aspace_delimited_csv, aspace_mapping, workers
+):
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        aspace_delimited_csv, aspace_mapping
+    )
+    collection.items[0].source_system_identifier = ""
+    collection.uuid = "c3d4"
+    items = list(collection.post_items(client, workers=workers, journal=journal))
+    assert [item.source_system_identifier for item in items] == ["/repo/0/ao/123"]
+    assert journal.item_count() == 1
+
+
+def test_collection_post_items_skips_unchanged_bitstreams(
+    client, web_mock, journal, input_dir, aspace_delimited_csv, aspace_mapping
+):
+    journal.record_item("/repo/0/ao/456", "c3d4", "a1a1", "222.1111")
+    journal.complete_item("/repo/0/ao/456")
+    journal.record_item("/repo/0/ao/123", "c3d4", "e5f6", "222.2222")
+    journal.complete_item("/repo/0/ao/123")
+    with open(f"{input_dir}/more_files/test_02.pdf", "w") as f:
+        f.write("Changed")
+    web_mock.get(
+        "mock://example.com/items/a1a1/bitstreams",
+        json=[],
+    )
+    web_mock.get(
+        "mock://example.com/items/e5f6/bitstreams",
+        json=[
+            {
+                "uuid": "g7h8",
+                "checkSum": {
+                    "value": "d41d8cd98f00b204e9800998ecf8427e",
+                    "checkSumAlgorithm": "MD5",
+                },
+            }
+        ],
+    )
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        aspace_delimited_csv, aspace_mapping
+    )
+    for item in collection.items:
+        item.bitstreams_in_directory(input_dir, "pdf")
+    collection.uuid = "c3d4"
+    hasher = FileHasher(journal, workers=1)
+    try:
+        items = list(collection.post_items(client, journal=journal, hasher=hasher))
+    finally:
+        hasher.close()
+    assert [b.uuid for b in items[1].bitstreams] == ["g7h8", "i9j0"]
+    assert [r.method for r in web_mock.request_history] == ["GET", "GET", "POST"]
+    assert web_mock.request_history[-1].url == (
+        "mock://example.com/items/e5f6/bitstreams?name=test_02.pdf"
+    )
+
+
+def test_collection_post_items_replaces_changed_bitstreams(
+    client, web_mock, journal, input_dir, aspace_delimited_csv, aspace_mapping
+):
+    journal.record_item("/repo/0/ao/123", "c3d4", "e5f6", "222.2222")
+    journal.record_bitstream("/repo/0/ao/123", "test_01.pdf", "g7h8")
+    journal.record_bitstream("/repo/0/ao/123", "test_02.pdf", "k1k1")
+    journal.complete_item("/repo/0/ao/123")
+    with open(f"{input_dir}/more_files/test_02.pdf", "w") as f:
+        f.write("Changed")
+    web_mock.get(
+        "mock://example.com/items/e5f6/bitstreams",
+        json=[
+            {
+                "uuid": "g7h8",
+                "checkSum": {
+                    "value": "d41d8cd98f00b204e9800998ecf8427e",
+                    "checkSumAlgorithm": "MD5",
+                },
+            },
+            {
+                "uuid": "k1k1",
+                "checkSum": {
+                    "value": "0cc175b9c0f1b6a831c399e269772661",
+                    "checkSumAlgorithm": "MD5",
+                },
+            },
+        ],
+    )
+    web_mock.put("mock://example.com/bitstreams/k1k1/data", status_code=200)
+    collection = models.Collection.create_metadata_for_items_from_csv(
+        aspace_delimited_csv, aspace_mapping
+    )
+    collection.items = collection.items[1:]
+    for item in collection.items:
+        item.bitstreams_in_directory(input_dir, "pdf")
+    collection.uuid = "c3d4"
+    hasher = FileHasher(journal, workers=1)
+    try:
+        items = list(collection.post_items(client, journal=journal, hasher=hasher))
+    finally:
+        hasher.close()
+    assert [b.uuid for b in items[0].bitstreams] == ["g7h8", "k1k1"]
+    assert [(r.method, r.url) for r in web_mock.request_history] == [
+        ("GET", "mock://example.com/items/e5f6/bitstreams"),
+        ("PUT", "mock://example.com/bitstreams/k1k1/data"),
+    ]
+    assert journal.get_bitstreams("/repo/0/ao/123") == {
+        "test_01.pdf": "g7h8",
+        "test_02.pdf": "k1k1",
+    }
+
+
 def test_item_bitstreams_in_directory(input_dir):
     item = models.Item(file_identifier="test")
     item.bitstreams_in_directory(input_dir)
@@ -116,12 +748,37 @@ def test_item_bitstreams_in_directory(input_dir):
     assert item.bitstreams[0].name == "test_01.jpg"
     assert item.bitstreams[1].name == "test_01.pdf"
     assert item.bitstreams[2].name == "test_02.pdf"
+    assert [b.size for b in item.bitstreams] == [0, 0, 0]
     item.bitstreams_in_directory(input_dir, "pdf")
     assert 2 == len(item.bitstreams)
     assert item.bitstreams[0].name == "test_01.pdf"
     assert item.bitstreams[1].name == "test_02.pdf"
 
 
+def test_item_bitstreams_from_index(input_dir):
+    index = models.ContentIndex.from_directory(input_dir)
+    item = models.Item(file_identifier="test")
+    item.bitstreams_from_index(index, "pdf")
+    assert [b.name for b in item.bitstreams] == ["test_01.pdf", "test_02.pdf"]
+    assert item.bitstreams[1].file_path == f"{input_dir}more_files/test_02.pdf"
+
+
+def test_content_index_from_directory(input_dir):
+    index = models.ContentIndex.from_directory(input_dir)
+    assert index.names == ["best_01.pdf", "test_01.jpg", "test_01.pdf", "test_02.pdf"]
+
+
+def test_content_index_find(input_dir):
+    index = models.ContentIndex.from_directory(input_dir)
+    assert [name for name, path in index.find("test")] == [
+        "test_01.jpg",
+        "test_01.pdf",
+        "test_02.pdf",
+    ]
+    assert [name for name, path in index.find("test_01", "jpg")] == ["test_01.jpg"]
+    assert index.find("tast") == []
+
+
 def test_item_metadata_from_csv_row(aspace_delimited_csv, aspace_mapping):
     row = next(aspace_delimited_csv)
     item = models.Item.metadata_from_csv_row(row, aspace_mapping)
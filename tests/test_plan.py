@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from dsaps.plan import (
+    PlanError,
+    check_field_map,
+    create_plan,
+    read_plan_header,
+    read_plan_items,
+)
+
+
+@pytest.fixture()
+def test_metadata_csv(tmp_path):
+    with open("tests/fixtures/aspace_metadata_delimited.csv") as source:
+        header, tast_row, test_row = source.read().splitlines()
+    path = tmp_path / "metadata.csv"
+    path.write_text(f"{header}\n{test_row}\n")
+    return str(path)
+
+
+def test_check_field_map(aspace_mapping):
+    aspace_mapping["dc.title"]["delimiter"] = None
+    del aspace_mapping["dc.description"]["language"]
+    problems = check_field_map(aspace_mapping, ["uri", "file_identifier", "author"])
+    assert problems == [
+        "The field map entry dc.title names the column title, which the CSV does "
+        "not have.",
+        "The field map entry dc.title has the delimiter None, which is not a string.",
+        "The field map entry dc.description has no language.",
+        "The field map entry dc.rights names the column rights_statement, which "
+        "the CSV does not have.",
+        "The field map entry dc.rights.uri names the column rights_uri, which the "
+        "CSV does not have.",
+    ]
+
+
+def test_create_plan(input_dir, output_dir, test_metadata_csv):
+    plan_path = f"{output_dir}plan.jsonl"
+    problems = create_plan(
+        test_metadata_csv, "config/aspace_mapping.json", input_dir, plan_path, "pdf"
+    )
+    assert problems == []
+    header = read_plan_header(plan_path)
+    assert header["items"] == 1
+    assert header["bitstreams"] == 2
+    assert header["total_bytes"] == 0
+    items = list(read_plan_items(plan_path))
+    assert [item.source_system_identifier for item in items] == ["/repo/0/ao/123"]
+    assert [(b.name, b.file_path, b.size) for b in items[0].bitstreams] == [
+        ("test_01.pdf", f"{input_dir}test_01.pdf", 0),
+        ("test_02.pdf", f"{input_dir}more_files/test_02.pdf", 0),
+    ]
+    assert items[0].metadata[0].key == "dc.title"
+    assert items[0].metadata[0].value == "Test Item"
+
+
+def test_create_plan_problems(input_dir, output_dir):
+    plan_path = f"{output_dir}plan.jsonl"
+    problems = create_plan(
+        "tests/fixtures/aspace_metadata_delimited.csv",
+        "config/aspace_mapping.json",
+        input_dir,
+        plan_path,
+        "pdf",
+    )
+    assert problems == ["Line 2: No pdf files match tast."]
+    with pytest.raises(FileNotFoundError):
+        read_plan_header(plan_path)
+
+
+def test_create_plan_content_cannot_be_indexed(output_dir, test_metadata_csv):
+    plan_path = f"{output_dir}plan.jsonl"
+    problems = create_plan(
+        test_metadata_csv,
+        "config/aspace_mapping.json",
+        f"{output_dir}missing",
+        plan_path,
+        "pdf",
+    )
+    assert len(problems) == 1
+    assert problems[0].startswith(f"The content {output_dir}missing cannot be indexed")
+    assert os.listdir(output_dir) == []
+
+
+def test_create_plan_checks_field_map_before_indexing(
+    output_dir, test_metadata_csv, monkeypatch
+):
+    indexed = []
+    monkeypatch.setattr(
+        "dsaps.models.ContentIndex.from_location", staticmethod(indexed.append)
+    )
+    with open("config/aspace_mapping.json") as source:
+        mapping = json.load(source)
+    del mapping["file_identifier"]
+    with open(f"{output_dir}mapping.json", "w") as target:
+        json.dump(mapping, target)
+    problems = create_plan(
+        test_metadata_csv,
+        f"{output_dir}mapping.json",
+        f"{output_dir}missing",
+        f"{output_dir}plan.jsonl",
+    )
+    assert problems == ["The field map has no file_identifier mapping."]
+    assert indexed == []
+
+
+def test_read_plan_header_rejects_other_files(tmp_path):
+    path = tmp_path / "plan.jsonl"
+    path.write_text(json.dumps({"format": "other"}) + "\n")
+    with pytest.raises(PlanError):
+        read_plan_header(str(path))
+    path.write_text(json.dumps({"format": "dsaps-plan", "version": 2}) + "\n")
+    with pytest.raises(PlanError):
+        read_plan_header(str(path))
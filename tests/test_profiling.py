@@ -0,0 +1,81 @@
+import json
+import sys
+import threading
+
+from dsaps import profiling
+
+
+@profiling.spanned
+def double(value):
+    return value * 2
+
+
+@profiling.spanned
+def count(limit):
+    yield from range(limit)
+
+
+def test_spans_recorded_only_while_enabled():
+    assert double(1) == 2
+    profiling.record_spans()
+    try:
+        assert double(2) == 4
+        assert list(count(3)) == [0, 1, 2]
+        with profiling.span("block"):
+            pass
+        assert list(profiling.iterate("steps", "ab")) == ["a", "b"]
+    finally:
+        spans = profiling.stop_spans()
+    assert {name: stats["calls"] for name, stats in spans.items()} == {
+        "block": 1,
+        "steps": 3,
+        "tests.test_profiling.count": 4,
+        "tests.test_profiling.double": 1,
+    }
+    assert profiling.iterate("steps", "ab") == "ab"
+
+
+def test_profiler_writes_reports(tmp_path):
+    profiler = profiling.Profiler(
+        f"{tmp_path}/profile", trace_memory=True, top=5, interval=0.01
+    )
+    profiler.start()
+    thread = threading.Thread(target=double, args=(3,))
+    thread.start()
+    thread.join()
+    data = [list(range(100)) for _ in range(100)]
+    paths = profiler.stop()
+    assert data
+    assert paths == [
+        f"{tmp_path}/profile.prof",
+        f"{tmp_path}/profile-profile.txt",
+        f"{tmp_path}/profile-memory.txt",
+        f"{tmp_path}/profile-spans.json",
+    ]
+    with open(f"{tmp_path}/profile-profile.txt") as report:
+        assert report.readline() == "Profiled threads: 2\n"
+    with open(f"{tmp_path}/profile-memory.txt") as report:
+        assert report.readline().startswith("Peak traced memory: ")
+    with open(f"{tmp_path}/profile-spans.json") as spans:
+        assert json.load(spans)["tests.test_profiling.double"]["calls"] == 1
+
+
+def test_profiler_thread_hook_removed_when_profile_cannot_start(monkeypatch, tmp_path):
+    class ActiveProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr("cProfile.Profile", ActiveProfile)
+    profiler = profiling.Profiler(f"{tmp_path}/profile")
+    hooks = []
+
+    def run():
+        sys.setprofile(profiler._profile_thread)
+        profiler._profile_thread(sys._getframe(), "call", None)
+        hooks.append(sys.getprofile())
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    assert hooks == [None]
+    assert profiler.profiles == []
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+
+from dsaps.models import Bitstream
+from dsaps.scheduler import (
+    RequestScheduler,
+    TokenBucket,
+    UploadScheduler,
+    backoff_delay,
+)
+
+
+def test_request_scheduler_decreases_on_failure():
+    """Test limits are cut multiplicatively after a failed request."""
+    scheduler = RequestScheduler(max_concurrency=8, cooldown=0)
+    with scheduler.slot():
+        pass
+    scheduler.record(0.1, failed=True)
+    assert scheduler.concurrency == 4
+    assert scheduler.rate is not None
+
+
+def test_request_scheduler_decreases_on_slow_response():
+    """Test limits are cut after a response slower than the target latency."""
+    scheduler = RequestScheduler(max_concurrency=8, target_latency=1, cooldown=0)
+    scheduler.record(2, failed=False)
+    assert scheduler.concurrency == 4
+
+
+def test_request_scheduler_decreases_once_per_cooldown():
+    """Test a burst of failures only cuts the limits once."""
+    scheduler = RequestScheduler(max_concurrency=8, cooldown=60)
+    for _ in range(3):
+        scheduler.record(None, failed=True)
+    assert scheduler.concurrency == 4
+
+
+def test_request_scheduler_ignores_isolated_failure():
+    """Test a failure among mostly successful requests does not cut the limits."""
+    scheduler = RequestScheduler(max_concurrency=8, cooldown=0)
+    for _ in range(19):
+        scheduler.record(0.1, failed=False)
+    scheduler.record(0.1, failed=True)
+    assert scheduler.concurrency == 8
+    assert scheduler.rate is None
+
+
+def test_request_scheduler_lifts_unused_rate_limit():
+    """Test the rate limit is lifted once it is far above the observed rate."""
+    scheduler = RequestScheduler(max_concurrency=2, min_rate=1, cooldown=0)
+    scheduler.record(None, failed=True)
+    assert scheduler.rate == 1
+    for _ in range(3):
+        scheduler.record(0.1, failed=False)
+    assert scheduler.rate is None
+
+
+def test_request_scheduler_increases_on_success():
+    """Test limits grow additively after successful requests."""
+    scheduler = RequestScheduler(max_concurrency=8, max_rate=10, cooldown=0)
+    scheduler.record(None, failed=True)
+    scheduler.record(0.1, failed=False)
+    assert scheduler.concurrency == 4.25
+    assert scheduler.rate == 5 + 1 / 4.25
+    for _ in range(100):
+        scheduler.record(0.1, failed=False)
+    assert scheduler.concurrency == 8
+    assert scheduler.rate == 10
+
+
+def test_request_scheduler_slot_limits_concurrency():
+    """Test no more requests than the concurrency limit are in flight."""
+    scheduler = RequestScheduler(max_concurrency=2)
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        with scheduler.slot():
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            time.sleep(0.01)
+            with lock:
+                in_flight.pop()
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_request_scheduler_slot_limits_rate():
+    """Test requests start no faster than the rate limit."""
+    scheduler = RequestScheduler(max_rate=50)
+    start = time.monotonic()
+    for _ in range(5):
+        with scheduler.slot():
+            pass
+    assert time.monotonic() - start >= 0.08
+
+
+def test_backoff_delay():
+    """Test backoff_delay function."""
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.5, cap=4) <= min(4, 0.5 * 2**attempt)
+
+
+def test_token_bucket_limits_rate():
+    """Test consumption beyond the burst waits for the bucket to refill."""
+    bucket = TokenBucket(rate=1000, burst=100)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.consume(100)
+    assert time.monotonic() - start >= 0.25
+
+
+def test_upload_scheduler_takes_largest_first():
+    """Test waiting uploads are run largest first."""
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def blocker():
+        started.set()
+        release.wait()
+
+    with UploadScheduler(1) as scheduler:
+        scheduler.submit(0, blocker)
+        started.wait()
+        futures = [scheduler.submit(size, order.append, size) for size in (1, 100, 10)]
+        release.set()
+    assert order == [100, 10, 1]
+    assert all(future.done() for future in futures)
+
+
+def test_upload_scheduler_map_keeps_order():
+    """Test map returns results in the bitstreams' order."""
+    bitstreams = [Bitstream(name=str(size), size=size) for size in (5, None, 50)]
+    with UploadScheduler(2) as scheduler:
+        assert list(scheduler.map(lambda b: b.name, bitstreams)) == ["5", "None", "50"]
+
+
+def test_upload_scheduler_rejects_submit_after_shutdown():
+    """Test uploads cannot be scheduled once the workers are stopping."""
+    scheduler = UploadScheduler(1)
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(0, print)
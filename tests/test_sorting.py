@@ -0,0 +1,19 @@
+import random
+
+from dsaps.sorting import ExternalSorter
+
+
+def test_external_sorter_in_memory(tmp_path):
+    with ExternalSorter(1e6, str(tmp_path)) as sorter:
+        sorter.extend(["test_02.pdf", "best_01.pdf", "test_01.pdf"])
+        assert list(sorter) == ["best_01.pdf", "test_01.pdf", "test_02.pdf"]
+        assert sorter.runs == []
+
+
+def test_external_sorter_merges_runs(tmp_path):
+    values = [(f"{random.randrange(1000):03}", i) for i in range(500)]
+    with ExternalSorter(2000, str(tmp_path), fan_in=4) as sorter:
+        sorter.extend(values)
+        assert len(sorter.runs) > 4
+        assert list(sorter) == sorted(values)
+    assert list(tmp_path.iterdir()) == []